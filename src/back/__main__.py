@@ -0,0 +1,540 @@
+"""Interface de linha de comando do backend, sem interface gráfica.
+
+Uso (a partir de src/); as opções globais (-s, --all, --json, --adb) vêm antes do subcomando:
+    python -m back devices
+    python -m back --json list-apps -3
+    python -m back --all install app.apk
+    python -m back -s SERIAL1 -s SERIAL2 run-script provisionamento.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from back.back import (
+    AppManager, ConfigManager, DeviceMonitor, localizar_adb, listar_dispositivos, instalar_apk,
+    executar_comando_adb_simples, comando_adb, tirar_screenshot, processar_script_json,
+    gerar_relatorio_execucao, formatar_progresso, formatar_nucleos, formatar_termico, formatar_taxa, MonitorRecorder, MonitorHistory,
+    carregar_gravacao, formatar_intervalo_gravacao, METRICAS_MONITOR, FleetMonitor, FROTA_MAX_PARALELO, FROTA_INTERVALO, AlertEngine, formatar_alerta,
+    abrir_logcat, erro_logcat, ler_entradas_binarias, LogEntry, LogcatFiltro, LOGCAT_BUFFERS, LogcatCapture, ler_captura, indice_captura,
+    LogQuery, MultiLogcatSession, LogVolumeStats, formatar_offset_relogio,
+)
+
+def resolver_adb(args):
+    if args.adb:
+        return args.adb
+    if os.environ.get("ADB"):
+        return os.environ["ADB"]
+    no_path = shutil.which("adb")
+    if no_path:
+        return no_path
+    adb_path, erro = localizar_adb(incluir_scrcpy=False)
+    if not adb_path:
+        sys.exit(f"ADB não encontrado: {erro}")
+    return adb_path
+
+def resolver_dispositivos(args, adb_path):
+    if args.all:
+        dispositivos = listar_dispositivos(adb_path)
+        if not dispositivos:
+            sys.exit("Nenhum dispositivo conectado.")
+        return dispositivos
+    return args.serial or [None]
+
+def em_cada_dispositivo(dispositivos, funcao):
+    """Executa 'funcao(serial)' em paralelo e retorna {serial: resultado}"""
+    with ThreadPoolExecutor(max_workers=min(len(dispositivos), 16)) as executor:
+        futures = {serial: executor.submit(funcao, serial) for serial in dispositivos}
+    resultados = {}
+    for serial, future in futures.items():
+        try:
+            resultados[serial or "default"] = future.result()
+        except Exception as e:
+            resultados[serial or "default"] = {"sucesso": False, "erro": str(e)}
+    return resultados
+
+def cmd_devices(args, adb_path):
+    return {"dispositivos": listar_dispositivos(adb_path)}
+
+def cmd_list_apps(args, adb_path, serial):
+    params = ["-3"] if args.terceiros else []
+    ok, stdout, stderr = executar_comando_adb_simples(adb_path, comando_adb(adb_path, serial)[1:] + ["shell", "pm", "list", "packages"] + params)
+    if not ok:
+        return {"sucesso": False, "erro": stderr.strip()}
+    pacotes = sorted(line.replace("package:", "").strip() for line in stdout.splitlines() if line.strip())
+    if args.detalhes:
+        return {"sucesso": True, "apps": sorted(AppManager(adb_path, serial).get_app_info_batch_no_icons(pacotes), key=lambda a: a["package"])}
+    return {"sucesso": True, "apps": pacotes}
+
+def cmd_install(args, adb_path, serial):
+    def progresso(dados):
+        if not args.json:
+            print(f"\r[{serial or 'default'}] {formatar_progresso(dados)}".ljust(80), end="", file=sys.stderr, flush=True)
+
+    resultados = []
+    app_manager = AppManager(adb_path, serial)
+    for apk in args.apks:
+        sucesso, saida, erro, pulado, estatisticas = instalar_apk(
+            adb_path, apk, app_manager, pular_se_instalado=not args.force, progresso=progresso
+        )
+        if not args.json:
+            print(file=sys.stderr)
+        resultados.append({"arquivo": apk, "sucesso": sucesso, "pulado": pulado, "estatisticas": estatisticas,
+                           "saida": saida.strip(), "erro": erro.strip()})
+    return {"sucesso": all(r["sucesso"] for r in resultados), "instalacoes": resultados}
+
+def cmd_uninstall(args, adb_path, serial):
+    resultados = []
+    for pacote in args.packages:
+        ok, stdout, stderr = executar_comando_adb_simples(adb_path, comando_adb(adb_path, serial)[1:] + ["shell", "pm", "uninstall", "--user", "0", pacote])
+        ok = ok and "Failure" not in stdout
+        resultados.append({"pacote": pacote, "sucesso": ok, "saida": stdout.strip(), "erro": stderr.strip()})
+    return {"sucesso": all(r["sucesso"] for r in resultados), "desinstalacoes": resultados}
+
+def cmd_device_info(args, adb_path, serial):
+    info = ConfigManager(adb_path, serial).get_full_device_info()
+    return {"sucesso": info is not None, "info": info}
+
+def criar_alertas(args):
+    if not args.alert:
+        return None
+    try:
+        return AlertEngine(args.alert, args.webhook, callback=lambda alerta: print(formatar_alerta(alerta), file=sys.stderr))
+    except ValueError as e:
+        sys.exit(str(e))
+
+def cmd_monitor(args, adb_path, serial):
+    monitor = DeviceMonitor(adb_path, serial)
+    monitor.alertas = criar_alertas(args)
+    amostras = []
+    recorder = None
+    if args.record:
+        recorder = MonitorRecorder(args.record.replace("{serial}", serial or "default"), metadados={"serial": serial, "intervalo": args.interval})
+    try:
+        for amostra in monitor.stream(args.interval):
+            amostras.append(amostra.as_dict())
+            if recorder:
+                recorder.append(amostra)
+            if not args.json:
+                print(f"[{serial or 'default'}] CPU {amostra.cpu:.1f}% | RAM {amostra.ram:.1f}% | "
+                      f"Armazenamento {amostra.storage:.1f}% | Bateria {amostra.battery}%", file=sys.stderr)
+                if amostra.cpu_cores or amostra.cpu_freq_khz:
+                    print(f"    {formatar_nucleos(amostra)}", file=sys.stderr)
+                if formatar_termico(amostra):
+                    print(f"    {formatar_termico(amostra)}", file=sys.stderr)
+                print(f"    Rede ↓ {formatar_taxa(amostra.net_rx_kbs)} ↑ {formatar_taxa(amostra.net_tx_kbs)} | "
+                      f"Disco L {formatar_taxa(amostra.disk_read_kbs)} E {formatar_taxa(amostra.disk_write_kbs)}", file=sys.stderr)
+            if len(amostras) >= args.count:
+                break
+    finally:
+        if recorder:
+            recorder.close()
+    if len(amostras) < args.count:
+        return {"sucesso": False, "erro": "O dispositivo parou de enviar amostras", "amostras": amostras}
+    return {"sucesso": True, "amostras": amostras}
+
+def cmd_fleet(args, adb_path):
+    frota = FleetMonitor(adb_path, max_workers=args.workers, interval=args.interval, seriais=args.serial, alertas=criar_alertas(args))
+    parar = threading.Event()
+    ticks = 0
+
+    def ao_fim_do_tick(ultimas):
+        nonlocal ticks
+        ticks += 1
+        if not args.json:
+            linha = " | ".join(f"{serial} CPU {a.cpu:4.1f}% RAM {a.ram:4.1f}%" for serial, a in sorted(ultimas.items()))
+            print(f"[{ticks}] {linha}", file=sys.stderr)
+        if ticks >= args.count:
+            parar.set()
+
+    frota.run(parar, ao_fim_do_tick)
+    return {
+        "sucesso": bool(frota.historicos),
+        "amostras_puladas": frota.pulos,
+        "dispositivos": {serial: frota.resumo(serial) for serial in frota.historicos},
+    }
+
+def cmd_replay(args, adb_path):
+    try:
+        metadados, colunas = carregar_gravacao(args.arquivo)
+    except (OSError, ValueError, KeyError, struct.error, zlib.error) as e:
+        # Arquivo ausente, truncado no cabeçalho ou que não é uma gravação
+        return {"sucesso": False, "erro": f"Não foi possível ler a gravação {args.arquivo}: {e}"}
+    if not metadados["amostras"]:
+        return {"sucesso": True, "metadados": metadados, "metricas": {}}
+    historico = MonitorHistory.from_columns(colunas)
+    duracao = colunas["timestamp"][-1] - colunas["timestamp"][0]
+    return {
+        "sucesso": True,
+        "metadados": metadados,
+        "duracao": duracao,
+        "metricas": {metrica: historico[metrica].stats() for metrica in args.metricas},
+    }
+
+def cmd_top(args, adb_path, serial):
+    monitor = DeviceMonitor(adb_path, serial)
+    # A CPU de cada processo é o delta entre duas leituras
+    if monitor.get_process_stats() is None:
+        return {"sucesso": False, "erro": "Falha ao ler /proc"}
+    time.sleep(args.interval)
+    processos = monitor.get_process_stats(top_n=args.count, ordenar=args.sort)
+    return {"sucesso": processos is not None, "processos": processos or []}
+
+def cmd_logcat(args, adb_path, serial):
+    adb_cmd = comando_adb(adb_path, serial)
+    filtro = LogcatFiltro(args.buffer or [], args.filtros, args.pid, args.package or "", args.regex or "")
+    try:
+        opcoes = filtro.opcoes(adb_cmd)
+    except ValueError as e:
+        return {"sucesso": False, "erro": str(e)}
+    # Captura, estatísticas e --seconds rodam até o tempo acabar (ou Ctrl+C); a listagem simples para em 100
+    limite = args.count
+    if limite is None and not (args.capture or args.stats or args.export or args.seconds):
+        limite = 100
+    # Com --dump, '-t N' devolve as N entradas mais recentes e encerra (sem limite, '-d' devolve o buffer todo);
+    # sem ele, '-T 1' pula o histórico do buffer circular e acompanha as novas até juntar N.
+    # Filtros de tag/prioridade/regex valem só no host: no dump o buffer vem inteiro e ficam as N últimas que passam
+    if args.dump:
+        inicio = ["-t", str(limite)] if limite and not filtro.no_host else ["-d"]
+    else:
+        inicio = ["-T", "1"]
+    process = abrir_logcat(adb_cmd, inicio + opcoes)
+    captura = LogcatCapture(args.capture.replace("{serial}", serial or "default")) if args.capture else None
+    volume = LogVolumeStats() if args.stats or args.export else None
+    # --seconds encerra o adb depois do tempo pedido, mesmo que o log esteja parado
+    interrompido = threading.Event()
+
+    def interromper():
+        interrompido.set()
+        process.terminate()
+
+    temporizador = threading.Timer(args.seconds, interromper) if args.seconds else None
+    if temporizador:
+        temporizador.start()
+    entradas, total = deque(maxlen=limite) if args.dump else [], 0
+    try:
+        for entrada in ler_entradas_binarias(process.stdout):
+            if not filtro.aceita(entrada):
+                continue
+            total += 1
+            if volume:
+                volume.append(entrada)
+            if captura:
+                captura.append(entrada)
+            elif not volume:
+                entradas.append(entrada.as_dict())
+            if limite and total >= limite and not args.dump:
+                interrompido.set()
+                break
+    finally:
+        if temporizador:
+            temporizador.cancel()
+        # Se o logcat saiu sozinho (buffer não suportado, regex inválida), o motivo está no stderr
+        erro = None if interrompido.is_set() else erro_logcat(process)
+        DeviceMonitor._encerrar_processo(process)
+        if captura:
+            captura.close()
+    if erro:
+        return {"sucesso": False, "erro": erro}
+    if volume:
+        if args.export:
+            volume.exportar(args.export.replace("{serial}", serial or "default"))
+        return {"sucesso": True, "volume": volume.resumo(args.top)}
+    if captura:
+        return {"sucesso": True, "capturadas": total, "diretorio": str(captura.diretorio)}
+    return {"sucesso": bool(entradas) or args.dump, "entradas": list(entradas)}
+
+def cmd_logcat_merge(args, adb_path):
+    seriais = listar_dispositivos(adb_path) if args.all or not args.serial else args.serial
+    if len(seriais) < 2:
+        return {"sucesso": False, "erro": "São necessários pelo menos dois dispositivos (-s A -s B ou --all)"}
+    filtro = LogcatFiltro(args.buffer or [], args.filtros)
+    try:
+        filtro.validar()
+    except ValueError as e:
+        return {"sucesso": False, "erro": str(e)}
+    sessao = MultiLogcatSession(adb_path, seriais, filtro=filtro)
+    sessao.start()
+    entradas = []
+    limite = time.monotonic() + args.seconds
+    try:
+        while sessao.ativo and time.monotonic() < limite and len(entradas) < args.count:
+            time.sleep(0.2)
+            for entrada, n in sessao.buffer.drenar():
+                entradas += [entrada.as_dict()] * n
+    finally:
+        sessao.stop()
+    entradas += [entrada.as_dict() for entrada, n in sessao.buffer.drenar() for _ in range(n)]
+    return {"sucesso": True, "offsets": sessao.offsets, "entradas": entradas[:args.count]}
+
+def instante_captura(valor, inicio):
+    """Epoch em segundos ou '+N', N segundos depois do início da captura"""
+    if valor is None:
+        return None
+    try:
+        return inicio + float(valor[1:]) if valor.startswith("+") else float(valor)
+    except ValueError:
+        raise ValueError(f"Instante inválido: {valor} (use epoch em segundos ou +N)")
+
+def cmd_logcat_read(args, adb_path):
+    try:
+        blocos = indice_captura(args.diretorio)
+        if not blocos:
+            return {"sucesso": False, "erro": f"Nenhuma captura de logcat em {args.diretorio}"}
+        inicio = blocos[0][0]
+        desde, ate = instante_captura(args.desde, inicio), instante_captura(args.ate, inicio)
+        if args.query:
+            consulta = LogQuery.parse(args.query)
+            # Uma passada pela captura com a consulta como filtro: memória só para as N últimas que casam
+            entradas = deque((e for e in ler_captura(args.diretorio, desde, ate, blocos=blocos) if consulta.aceita(e)), maxlen=args.count)
+        else:
+            entradas = ler_captura(args.diretorio, desde, ate, args.count, blocos)
+        return {"sucesso": True, "inicio": inicio, "fim": blocos[-1][0], "entradas": [e.as_dict() for e in entradas]}
+    except ValueError as e:
+        # Consulta ou instante inválido
+        return {"sucesso": False, "erro": str(e)}
+    except (OSError, TypeError, zlib.error) as e:
+        # Segmento ou índice ilegível, ou linha que não é um LogEntry
+        return {"sucesso": False, "erro": f"Captura ilegível em {args.diretorio}: {e}"}
+
+def cmd_screenshot(args, adb_path, serial):
+    arquivo = args.output.replace("{serial}", serial or "default")
+    if os.path.dirname(arquivo):
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+    return {"sucesso": tirar_screenshot(adb_path, arquivo, serial), "arquivo": arquivo}
+
+def cmd_run_script(args, adb_path):
+    def progresso(arquivo, dados):
+        if not args.json:
+            print(f"{os.path.basename(arquivo)}: {formatar_progresso(dados)}", file=sys.stderr)
+
+    dispositivos = listar_dispositivos(adb_path) if args.all else args.serial
+    sucesso, resultados = processar_script_json(
+        args.script, adb_path, progresso=progresso, dry_run=args.dry_run or None,
+        retomar=not args.fresh, dispositivos=dispositivos or None
+    )
+    if not sucesso:
+        return {"sucesso": False, "erro": resultados}
+    return {
+        "sucesso": all(r["sucesso"] for r in resultados),
+        "relatorio": gerar_relatorio_execucao(resultados),
+        "resultados": resultados,
+    }
+
+COMANDOS_POR_DISPOSITIVO = {
+    "list-apps": cmd_list_apps,
+    "install": cmd_install,
+    "uninstall": cmd_uninstall,
+    "device-info": cmd_device_info,
+    "monitor": cmd_monitor,
+    "top": cmd_top,
+    "logcat": cmd_logcat,
+    "screenshot": cmd_screenshot,
+}
+
+COMANDOS_GLOBAIS = {
+    "devices": cmd_devices,
+    "run-script": cmd_run_script,
+    "replay": cmd_replay,
+    "fleet": cmd_fleet,
+    "logcat-read": cmd_logcat_read,
+    "logcat-merge": cmd_logcat_merge,
+}
+
+# Comandos que só leem arquivos locais e não precisam do adb
+COMANDOS_SEM_ADB = {"replay", "logcat-read"}
+
+def adicionar_opcoes_alerta(p):
+    p.add_argument("--alert", action="append", metavar="REGRA", help="Regra de alerta, ex.: 'battery < 20' ou 'ram > 90 for 30s' (repetível)")
+    p.add_argument("--webhook", metavar="URL", help="Envia os alertas disparados via POST JSON")
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog="python -m back", description="Operações ADB sem interface gráfica")
+    parser.add_argument("--adb", help="Caminho do executável adb (padrão: $ADB, PATH ou download automático)")
+    parser.add_argument("-s", "--serial", action="append", help="Serial do dispositivo (pode repetir)")
+    parser.add_argument("--all", action="store_true", help="Executar em todos os dispositivos conectados")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    sub.add_parser("devices", help="Lista os dispositivos conectados")
+
+    p = sub.add_parser("list-apps", help="Lista os pacotes instalados")
+    p.add_argument("-3", dest="terceiros", action="store_true", help="Apenas apps de terceiros")
+    p.add_argument("--detalhes", action="store_true", help="Inclui nome e versão de cada app")
+
+    p = sub.add_parser("install", help="Instala um ou mais APKs")
+    p.add_argument("apks", nargs="+")
+    p.add_argument("--force", action="store_true", help="Instala mesmo se a mesma versão já estiver no dispositivo")
+
+    p = sub.add_parser("uninstall", help="Desinstala pacotes")
+    p.add_argument("packages", nargs="+")
+
+    sub.add_parser("device-info", help="Informações completas do dispositivo")
+
+    p = sub.add_parser("monitor", help="Coleta amostras de CPU, RAM, armazenamento, bateria, temperatura e GPU")
+    p.add_argument("-n", "--count", type=int, default=1)
+    p.add_argument("-i", "--interval", type=float, default=2.0, help="Segundos entre amostras (mínimo 0.1)")
+    p.add_argument("--record", metavar="ARQUIVO", help="Grava as amostras em um arquivo .admon ({serial} é substituído)")
+    adicionar_opcoes_alerta(p)
+
+    p = sub.add_parser("fleet", help="Monitora todos os dispositivos (ou os de -s) a partir de um único agendador")
+    p.add_argument("-n", "--count", type=int, default=10, help="Número de ticks")
+    p.add_argument("-i", "--interval", type=float, default=FROTA_INTERVALO)
+    p.add_argument("-w", "--workers", type=int, default=FROTA_MAX_PARALELO, help="Chamadas adb simultâneas")
+    adicionar_opcoes_alerta(p)
+
+    p = sub.add_parser("replay", help="Resume uma gravação do monitor (.admon)")
+    p.add_argument("arquivo")
+    p.add_argument("--metricas", nargs="+", default=list(METRICAS_MONITOR))
+
+    p = sub.add_parser("top", help="Processos que mais usam CPU ou memória")
+    p.add_argument("-n", "--count", type=int, default=15)
+    p.add_argument("-i", "--interval", type=float, default=1.0, help="Segundos entre as duas leituras de CPU")
+    p.add_argument("--sort", choices=["cpu", "mem"], default="cpu")
+
+    p = sub.add_parser("logcat", help="Entradas do logcat com campos separados (leitura binária, -B)")
+    p.add_argument("-n", "--count", type=int, help="Quantas entradas: as N mais recentes com --dump, senão as N próximas a chegar "
+                   "(padrão 100; sem limite com --capture, --stats, --export ou --seconds)")
+    p.add_argument("-d", "--dump", action="store_true", help="Só as entradas mais recentes, sem esperar novas")
+    p.add_argument("-b", "--buffer", action="append", choices=LOGCAT_BUFFERS, help="Buffer de log (repetível)")
+    p.add_argument("--pid", type=int)
+    p.add_argument("--package", help="Só o processo atual deste pacote")
+    p.add_argument("-e", "--regex", help="Só mensagens que casam com a expressão (conferida no computador)")
+    p.add_argument("filtros", nargs="*", metavar="TAG:PRIORIDADE", help="Ex.: ActivityManager:I '*:S'")
+    p.add_argument("--capture", metavar="PASTA", help="Grava as entradas em segmentos comprimidos com índice de tempo ({serial} é substituído)")
+    p.add_argument("--seconds", type=float, help="Para depois de N segundos")
+    p.add_argument("--stats", action="store_true", help="Em vez das entradas, mostra quem mais escreve no log (por tag, PID e prioridade)")
+    p.add_argument("--top", type=int, default=10)
+    p.add_argument("--export", metavar="ARQUIVO", help="Salva as estatísticas de volume em .json ou .csv ({serial} é substituído)")
+
+    p = sub.add_parser("logcat-merge", help="Logcat de vários dispositivos (-s ou --all) mesclado por horário")
+    p.add_argument("-n", "--count", type=int, default=1000)
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("-b", "--buffer", action="append", choices=LOGCAT_BUFFERS)
+    p.add_argument("filtros", nargs="*", metavar="TAG:PRIORIDADE")
+
+    p = sub.add_parser("logcat-read", help="Lê uma captura de logcat a partir de um instante")
+    p.add_argument("diretorio")
+    p.add_argument("--from", dest="desde", help="Epoch em segundos ou +N segundos desde o início da captura")
+    p.add_argument("--to", dest="ate")
+    p.add_argument("-q", "--query", help="Busca, ex.: 'tag:ActivityManager level>=W \"ANR\"' (mostra as ocorrências mais recentes)")
+    p.add_argument("-n", "--count", type=int, default=100)
+
+    p = sub.add_parser("screenshot", help="Captura a tela do dispositivo")
+    p.add_argument("-o", "--output", default="screenshot-{serial}.png")
+
+    p = sub.add_parser("run-script", help="Executa um script JSON de provisionamento")
+    p.add_argument("script")
+    p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--fresh", action="store_true", help="Ignora o diário e executa todos os passos")
+    return parser
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    adb_path = None if args.comando in COMANDOS_SEM_ADB else resolver_adb(args)
+
+    # Com --json, as mensagens de progresso do backend vão para o stderr e o stdout fica só com o JSON
+    with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+        if args.comando in COMANDOS_GLOBAIS:
+            resultado = COMANDOS_GLOBAIS[args.comando](args, adb_path)
+            sucesso = resultado.get("sucesso", True)
+        else:
+            dispositivos = resolver_dispositivos(args, adb_path)
+            funcao = COMANDOS_POR_DISPOSITIVO[args.comando]
+            resultado = em_cada_dispositivo(dispositivos, lambda serial: funcao(args, adb_path, serial))
+            sucesso = all(r.get("sucesso", False) for r in resultado.values())
+
+    if args.json:
+        print(json.dumps(resultado, ensure_ascii=False, indent=2, default=str))
+    else:
+        imprimir_texto(args.comando, resultado)
+    return 0 if sucesso else 1
+
+def imprimir_texto(comando, resultado):
+    if comando == "devices":
+        print("\n".join(resultado["dispositivos"]) or "Nenhum dispositivo conectado.")
+        return
+    if comando == "fleet":
+        print(f"{len(resultado['dispositivos'])} dispositivos, {resultado['amostras_puladas']} amostras puladas")
+        for serial, metricas in resultado["dispositivos"].items():
+            partes = [f"{m} {v['media']:.1f} (máx {v['max']:.1f})" for m, v in metricas.items() if v]
+            print(f"{serial}: " + (" | ".join(partes) or "sem amostras"))
+        return
+    if comando == "replay":
+        if "erro" in resultado:
+            print(resultado["erro"])
+            return
+        print(f"{resultado['metadados']['amostras']} amostras em {resultado.get('duracao', 0) / 60:.1f} min, intervalo {formatar_intervalo_gravacao(resultado['metadados'])}")
+        for metrica, stats in resultado["metricas"].items():
+            print(f"{metrica:10} min {stats['min']:8.1f}  média {stats['media']:8.1f}  máx {stats['max']:8.1f}")
+        return
+    if comando == "logcat-merge":
+        if "erro" in resultado:
+            print(resultado["erro"])
+            return
+        print("Diferença de relógio: " + ", ".join(formatar_offset_relogio(s, o, 3) for s, o in resultado["offsets"].items()))
+        for e in resultado["entradas"]:
+            print(f"[{e['serial']}] {LogEntry(**e).formatar()}")
+        return
+    if comando == "logcat-read":
+        if "erro" in resultado:
+            print(resultado["erro"])
+            return
+        for e in resultado["entradas"]:
+            print(LogEntry(**e).formatar())
+        return
+    if comando == "run-script":
+        if "erro" in resultado:
+            print(resultado["erro"])
+            return
+        for r in resultado["resultados"]:
+            status = "OK" if r["sucesso"] else "BLOQUEADO" if r.get("bloqueado") else "FALHA"
+            print(f"{status:9} [{r.get('dispositivo') or 'default'}] {r['passo']} ({r['duracao']:.1f}s) {r['erro'].strip()}")
+        rel = resultado["relatorio"]
+        print(f"Tempo total {rel['duracao_total']:.1f}s, soma dos passos {rel['soma_passos']:.1f}s ({rel['ganho_paralelismo']:.1f}x)")
+        return
+
+    for serial, dados in resultado.items():
+        if not dados.get("sucesso") and "erro" in dados:
+            print(f"[{serial}] ERRO: {dados['erro']}")
+        elif comando == "list-apps":
+            for app in dados["apps"]:
+                print(f"{serial}\t" + (f"{app['package']}\t{app['name']}\t{app['version']}" if isinstance(app, dict) else app))
+        elif comando in ("install", "uninstall"):
+            for item in dados.get("instalacoes", dados.get("desinstalacoes", [])):
+                status = "PULADO" if item.get("pulado") else "OK" if item["sucesso"] else "FALHA"
+                print(f"[{serial}] {status} {item.get('arquivo', item.get('pacote'))} {item['erro'] or ''}".rstrip())
+        elif comando == "device-info":
+            for categoria, valores in (dados["info"] or {}).items():
+                print(f"[{serial}] {categoria}")
+                for chave, valor in valores.items():
+                    print(f"    {chave}: {valor}")
+        elif comando == "top":
+            for proc in dados["processos"]:
+                print(f"[{serial}] {proc['pid']:>6} {proc['cpu']:5.1f}% {proc['rss_kb'] / 1024:7.1f} MB  {proc['nome']}"
+                      + (f" ({proc['pacote']})" if proc["pacote"] and proc["pacote"] != proc["nome"] else ""))
+        elif comando == "logcat" and "volume" in dados:
+            volume = dados["volume"]
+            print(f"[{serial}] {volume['linhas']} linhas, {volume['bytes'] / 1024:.0f} KB ({volume['linhas_s']:.0f} linhas/s)")
+            for dimensao in ("prioridades", "tags", "pids"):
+                for item in volume[dimensao]:
+                    erro = f" (±{item['erro']})" if item["erro"] else ""
+                    print(f"[{serial}] {dimensao:11} {str(item['chave']):30} {item['linhas']:>9}{erro} linhas {item['linhas_s']:8.1f}/s {formatar_taxa(item['bytes_s'] / 1024):>10}")
+        elif comando == "logcat" and "capturadas" in dados:
+            print(f"[{serial}] {dados['capturadas']} entradas gravadas em {dados['diretorio']}")
+        elif comando == "logcat":
+            for e in dados["entradas"]:
+                print(f"[{serial}] {LogEntry(**e).formatar()}")
+        elif comando == "screenshot":
+            print(f"[{serial}] {'OK' if dados['sucesso'] else 'FALHA'} {dados['arquivo']}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,7 +13,20 @@ import subprocess
 import zipfile
 import base64
 import tempfile
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import gzip
+import heapq
+import csv
+import mmap
+import struct
+import zlib
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from functools import lru_cache, cached_property
+from dataclasses import dataclass, field, asdict, fields
 from pathlib import Path
 
 ESPELHAMENTO_ATIVO = False
@@ -160,9 +173,13 @@ class ADBManager:
             "scrcpy_server": str(self.scrcpy_server_path)
         }, None
 
-def localizar_adb():
+def localizar_adb(incluir_scrcpy=True):
     adb_manager = ADBManager()
-    tools, error = adb_manager.get_tools()
+    if incluir_scrcpy:
+        tools, error = adb_manager.get_tools()
+    else:
+        adb_ok, error = adb_manager.download_adb()
+        tools = {"adb": str(adb_manager.adb_path)} if adb_ok else None
     if tools and tools.get("adb"):
         return tools["adb"], None
 
@@ -177,13 +194,408 @@ def localizar_adb():
 
     return None, error or "ADB não encontrado no sistema e o download automático falhou."
 
+def comando_adb(adb_path, serial=None):
+    """Prefixo de comando ADB, direcionado a um dispositivo específico quando há serial"""
+    return [adb_path, "-s", serial] if serial else [adb_path]
+
+def serial_conectado(adb_path):
+    """Serial do dispositivo padrão do adb (o único conectado), ou None se não houver um identificável"""
+    try:
+        serial = subprocess.run([adb_path, "get-serialno"], capture_output=True, text=True, timeout=5, errors="ignore").stdout.strip()
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+    return serial if serial and serial != "unknown" else None
+
+def diretorio_dados(*partes):
+    """Pasta de dados do usuário (diários, gravações, capturas), fora da árvore do código"""
+    sistema = platform.system()
+    if sistema == "Windows":
+        base = Path(os.environ.get("APPDATA") or Path.home() / "AppData" / "Roaming")
+    elif sistema == "Darwin":
+        base = Path.home() / "Library" / "Application Support"
+    else:
+        base = Path(os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share")
+    return base.joinpath("gerenciador-adb", *partes)
+
+def listar_dispositivos(adb_path):
+    """Retorna os seriais dos dispositivos conectados e autorizados"""
+    try:
+        output = subprocess.check_output([adb_path, "devices"], text=True, timeout=5, errors="ignore")
+    except Exception as e:
+        print(f"Erro ao listar dispositivos: {e}")
+        return []
+    return [parts[0] for parts in (line.split() for line in output.splitlines()[1:]) if len(parts) >= 2 and parts[1] == "device"]
+
+# Leitura local de APKs (AndroidManifest.xml binário e certificado de assinatura)
+AXML_STRING_POOL = 0x0001
+AXML_START_ELEMENT = 0x0102
+AXML_TYPE_STRING = 0x03
+AXML_TYPE_INT_DEC = 0x10
+AXML_TYPE_INT_HEX = 0x11
+AXML_TYPE_INT_BOOLEAN = 0x12
+
+ATTR_IDS_MANIFESTO = {
+    0x0101021b: "versionCode",
+    0x0101021c: "versionName",
+    0x01010576: "versionCodeMajor",
+    0x0101020c: "minSdkVersion",
+    0x01010270: "targetSdkVersion",
+    0x0101000f: "debuggable",
+    0x01010272: "testOnly",
+}
+
+APK_SIG_BLOCK_MAGIC = b"APK Sig Block 42"
+APK_SIGNATURE_SCHEME_V2_ID = 0x7109871a
+APK_SIGNATURE_SCHEME_V3_ID = 0xf05368c0
+
+def _ler_string_pool(data, offset):
+    header_size = int.from_bytes(data[offset + 2:offset + 4], "little")
+    string_count = int.from_bytes(data[offset + 8:offset + 12], "little")
+    flags = int.from_bytes(data[offset + 16:offset + 20], "little")
+    strings_start = int.from_bytes(data[offset + 20:offset + 24], "little")
+    is_utf8 = bool(flags & 0x100)
+    offsets_base = offset + header_size
+    base = offset + strings_start
+
+    strings = []
+    for i in range(string_count):
+        pos = base + int.from_bytes(data[offsets_base + i * 4:offsets_base + i * 4 + 4], "little")
+        if is_utf8:
+            # Comprimento em caracteres seguido do comprimento em bytes (1 ou 2 bytes cada)
+            pos += 2 if data[pos] & 0x80 else 1
+            length = data[pos]
+            if length & 0x80:
+                length = ((length & 0x7F) << 8) | data[pos + 1]
+                pos += 2
+            else:
+                pos += 1
+            strings.append(data[pos:pos + length].decode("utf-8", errors="replace"))
+        else:
+            length = int.from_bytes(data[pos:pos + 2], "little")
+            if length & 0x8000:
+                length = ((length & 0x7FFF) << 16) | int.from_bytes(data[pos + 2:pos + 4], "little")
+                pos += 4
+            else:
+                pos += 2
+            strings.append(data[pos:pos + length * 2].decode("utf-16-le", errors="replace"))
+    return strings
+
+def _ler_elementos_axml(data):
+    """Percorre um XML binário do Android e retorna [(tag, {atributo: valor})]"""
+    if len(data) < 8 or int.from_bytes(data[0:2], "little") != 0x0003:
+        raise ValueError("AndroidManifest.xml não está no formato binário esperado")
+
+    strings = []
+    resource_ids = []
+    elementos = []
+    offset = int.from_bytes(data[2:4], "little")
+    while offset + 8 <= len(data):
+        chunk_type = int.from_bytes(data[offset:offset + 2], "little")
+        chunk_size = int.from_bytes(data[offset + 4:offset + 8], "little")
+        if chunk_size <= 0:
+            break
+
+        if chunk_type == AXML_STRING_POOL:
+            strings = _ler_string_pool(data, offset)
+        elif chunk_type == 0x0180:
+            header_size = int.from_bytes(data[offset + 2:offset + 4], "little")
+            resource_ids = [
+                int.from_bytes(data[pos:pos + 4], "little")
+                for pos in range(offset + header_size, offset + chunk_size, 4)
+            ]
+        elif chunk_type == AXML_START_ELEMENT:
+            name_idx = int.from_bytes(data[offset + 20:offset + 24], "little")
+            attr_start = int.from_bytes(data[offset + 24:offset + 26], "little")
+            attr_size = int.from_bytes(data[offset + 26:offset + 28], "little")
+            attr_count = int.from_bytes(data[offset + 28:offset + 30], "little")
+            tag = strings[name_idx] if name_idx < len(strings) else ""
+
+            atributos = {}
+            pos = offset + 16 + attr_start
+            for _ in range(attr_count):
+                attr_name_idx = int.from_bytes(data[pos + 4:pos + 8], "little")
+                raw_idx = int.from_bytes(data[pos + 8:pos + 12], "little")
+                data_type = data[pos + 15]
+                valor = int.from_bytes(data[pos + 16:pos + 20], "little")
+
+                # APKs ofuscados podem apagar o nome; o ID do recurso continua valendo
+                nome = strings[attr_name_idx] if attr_name_idx < len(strings) else ""
+                if attr_name_idx < len(resource_ids) and resource_ids[attr_name_idx] in ATTR_IDS_MANIFESTO:
+                    nome = ATTR_IDS_MANIFESTO[resource_ids[attr_name_idx]]
+
+                if data_type == AXML_TYPE_STRING:
+                    valor = strings[valor] if valor < len(strings) else ""
+                elif data_type == AXML_TYPE_INT_BOOLEAN:
+                    valor = valor != 0
+                elif data_type not in (AXML_TYPE_INT_DEC, AXML_TYPE_INT_HEX):
+                    valor = strings[raw_idx] if raw_idx < len(strings) else valor
+                if nome:
+                    atributos[nome] = valor
+                pos += attr_size
+            elementos.append((tag, atributos))
+        offset += chunk_size
+    return elementos
+
+def _ler_certificados_bloco_assinatura(apk_file, tamanho_arquivo):
+    """Extrai os certificados (DER) do APK Signing Block v3/v2, se existir"""
+    tail_size = min(tamanho_arquivo, 65536 + 22)
+    apk_file.seek(tamanho_arquivo - tail_size)
+    tail = apk_file.read(tail_size)
+    eocd = tail.rfind(b"PK\x05\x06")
+    if eocd == -1:
+        return []
+    cd_offset = int.from_bytes(tail[eocd + 16:eocd + 20], "little")
+    if cd_offset < 24:
+        return []
+
+    apk_file.seek(cd_offset - 24)
+    footer = apk_file.read(24)
+    if footer[8:] != APK_SIG_BLOCK_MAGIC:
+        return []
+    block_size = int.from_bytes(footer[:8], "little")
+    apk_file.seek(cd_offset - block_size - 8)
+    block = apk_file.read(block_size - 16)[8:]
+
+    pares = {}
+    pos = 0
+    while pos + 12 <= len(block):
+        length = int.from_bytes(block[pos:pos + 8], "little")
+        pair_id = int.from_bytes(block[pos + 8:pos + 12], "little")
+        pares[pair_id] = block[pos + 12:pos + 8 + length]
+        pos += 8 + length
+
+    def ler_prefixado(buf, p):
+        size = int.from_bytes(buf[p:p + 4], "little")
+        return buf[p + 4:p + 4 + size], p + 4 + size
+
+    for scheme_id in (APK_SIGNATURE_SCHEME_V3_ID, APK_SIGNATURE_SCHEME_V2_ID):
+        if scheme_id not in pares:
+            continue
+        signers, _ = ler_prefixado(pares[scheme_id], 0)
+        signer, _ = ler_prefixado(signers, 0)
+        signed_data, _ = ler_prefixado(signer, 0)
+        _, p = ler_prefixado(signed_data, 0)
+        certificates, _ = ler_prefixado(signed_data, p)
+        certs = []
+        p = 0
+        while p < len(certificates):
+            cert, p = ler_prefixado(certificates, p)
+            certs.append(cert)
+        if certs:
+            return certs
+    return []
+
+def _ler_tlv_der(data, pos):
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        num_bytes = length & 0x7F
+        length = int.from_bytes(data[pos:pos + num_bytes], "big")
+        pos += num_bytes
+    return tag, pos, pos + length
+
+def _ler_certificados_pkcs7(data):
+    """Extrai os certificados (DER) de uma assinatura v1 (META-INF/*.RSA) em PKCS#7"""
+    _, pos, _ = _ler_tlv_der(data, 0)                 # ContentInfo
+    _, _, oid_end = _ler_tlv_der(data, pos)          # contentType
+    _, pos, _ = _ler_tlv_der(data, oid_end)          # [0] EXPLICIT
+    _, pos, signed_end = _ler_tlv_der(data, pos)     # SignedData
+    while pos < signed_end:
+        tag, inner_start, inner_end = _ler_tlv_der(data, pos)
+        if tag == 0xA0:
+            certs = []
+            p = inner_start
+            while p < inner_end:
+                _, _, cert_end = _ler_tlv_der(data, p)
+                certs.append(data[p:cert_end])
+                p = cert_end
+            return certs
+        pos = inner_end
+    return []
+
+def hash_assinatura_android(cert_der):
+    """Reproduz o Signature.hashCode() do Android (Arrays.hashCode do certificado), exibido no dumpsys"""
+    result = 1
+    for b in cert_der:
+        result = (31 * result + (b - 256 if b > 127 else b)) & 0xFFFFFFFF
+    return f"{result:x}"
+
+ABIS_CONHECIDAS = ("arm64-v8a", "armeabi-v7a", "armeabi", "x86_64", "x86", "mips", "mips64", "riscv64")
+
+@lru_cache(maxsize=64)
+def _ler_info_apk_cache(apk_path, mtime_ns, tamanho):
+    with open(apk_path, "rb") as f:
+        certs = _ler_certificados_bloco_assinatura(f, tamanho)
+        # ZipFile lê só o diretório central; apenas o manifesto é descompactado
+        with zipfile.ZipFile(f, 'r') as apk:
+            nomes = apk.namelist()
+            elementos = _ler_elementos_axml(apk.read("AndroidManifest.xml"))
+            if not certs:
+                assinaturas_v1 = [n for n in nomes if re.match(r"META-INF/[^/]+\.(RSA|DSA|EC)$", n, re.IGNORECASE)]
+                certs = _ler_certificados_pkcs7(apk.read(assinaturas_v1[0])) if assinaturas_v1 else []
+
+    manifest = next((attrs for tag, attrs in elementos if tag == "manifest"), {})
+    uses_sdk = next((attrs for tag, attrs in elementos if tag == "uses-sdk"), {})
+    application = next((attrs for tag, attrs in elementos if tag == "application"), {})
+
+    version_code = manifest.get("versionCode")
+    if isinstance(version_code, int) and isinstance(manifest.get("versionCodeMajor"), int):
+        version_code |= manifest["versionCodeMajor"] << 32
+
+    abis = sorted({n.split("/")[1] for n in nomes if n.startswith("lib/") and n.endswith(".so") and n.count("/") >= 2})
+    min_sdk = uses_sdk.get("minSdkVersion", 1)
+
+    return {
+        "package": manifest.get("package"),
+        "version_code": version_code,
+        "version_name": manifest.get("versionName"),
+        "min_sdk": min_sdk if isinstance(min_sdk, int) else None,
+        "target_sdk": uses_sdk.get("targetSdkVersion") if isinstance(uses_sdk.get("targetSdkVersion"), int) else None,
+        "abis": [abi for abi in abis if abi in ABIS_CONHECIDAS],
+        "debuggable": application.get("debuggable") is True,
+        "test_only": application.get("testOnly") is True,
+        "signature_hash": hash_assinatura_android(certs[0]) if certs else None,
+        "size": tamanho,
+    }
+
+def ler_info_apk(apk_path):
+    """Lê pacote, versão, SDKs, ABIs e certificado de assinatura de um APK local sem extraí-lo"""
+    stat = os.stat(apk_path)
+    return dict(_ler_info_apk_cache(os.path.abspath(apk_path), stat.st_mtime_ns, stat.st_size))
+
+def verificar_compatibilidade_apk(info, device_sdk=None, device_abis=None, versao_instalada=None, assinaturas_instaladas=None):
+    """Lista problemas que fariam a instalação falhar, antes de enviar qualquer byte"""
+    problemas = []
+    if not info.get("package"):
+        problemas.append("Manifesto sem nome de pacote")
+    if device_sdk and info.get("min_sdk") and info["min_sdk"] > device_sdk:
+        problemas.append(f"Requer Android API {info['min_sdk']}, o dispositivo tem API {device_sdk}")
+    if device_abis and info.get("abis") and not set(info["abis"]) & set(device_abis):
+        problemas.append(f"ABIs do APK ({', '.join(info['abis'])}) incompatíveis com o dispositivo ({', '.join(device_abis)})")
+    if device_sdk and info.get("target_sdk") and device_sdk >= 34 and info["target_sdk"] < 23:
+        problemas.append(f"targetSdkVersion {info['target_sdk']} é bloqueado no Android 14+")
+    if info.get("test_only"):
+        problemas.append("APK marcado como testOnly (precisa de 'install -t')")
+    if versao_instalada is not None and info.get("version_code") is not None and info["version_code"] < versao_instalada:
+        problemas.append(f"Downgrade: instalado versionCode {versao_instalada}, APK {info['version_code']}")
+    if assinaturas_instaladas and info.get("signature_hash") and info["signature_hash"] not in assinaturas_instaladas:
+        problemas.append("Assinatura diferente da versão instalada (INSTALL_FAILED_UPDATE_INCOMPATIBLE)")
+    return problemas
+
 class AppManager:
-    def __init__(self, adb_path):
+    INVENTORY_TTL = 30
+
+    def __init__(self, adb_path, serial=None):
         self.adb_path = adb_path
+        self.serial = serial
+        self.adb_cmd = comando_adb(adb_path, serial)
         self.icon_cache_dir = Path(__file__).parent / "icon_cache"
         self.icon_cache_dir.mkdir(exist_ok=True)
         self.memory_cache = {}
         self.default_icon_b64 = self._get_default_icon()
+        self.package_inventory = None
+        self._inventory_time = 0
+        self._signature_cache = {}
+        self._inventory_lock = threading.Lock()
+        # serial -> {"sdk", "abis"}; sem serial fixo, o dispositivo padrão do adb pode mudar entre chamadas
+        self._device_compat = {}
+
+    def get_package_inventory(self, force=False):
+        with self._inventory_lock:
+            if not force and self.package_inventory is not None and time.time() - self._inventory_time < self.INVENTORY_TTL:
+                return self.package_inventory
+            try:
+                output = subprocess.check_output(
+                    self.adb_cmd + ["shell", "pm", "list", "packages", "--show-versioncode"],
+                    text=True, stderr=subprocess.DEVNULL, errors="ignore", timeout=20
+                )
+            except Exception as e:
+                print(f"Erro ao listar pacotes instalados: {e}")
+                return self.package_inventory or {}
+
+            inventory = {}
+            for line in output.splitlines():
+                match = re.match(r"package:(\S+)(?:\s+versionCode:(\d+))?", line.strip())
+                if match:
+                    inventory[match.group(1)] = int(match.group(2)) if match.group(2) else None
+            self.package_inventory = inventory
+            self._inventory_time = time.time()
+            self._signature_cache.clear()
+            return inventory
+
+    def invalidate_package_inventory(self):
+        with self._inventory_lock:
+            self.package_inventory = None
+            self._signature_cache.clear()
+
+    def get_package_signature_hashes(self, package_name):
+        if package_name in self._signature_cache:
+            return self._signature_cache[package_name]
+        hashes = set()
+        try:
+            dumpsys_output = subprocess.check_output(
+                self.adb_cmd + ["shell", "dumpsys", "package", package_name],
+                text=True, stderr=subprocess.DEVNULL, errors="ignore", timeout=10
+            )
+            match = re.search(r"signatures:\[([0-9a-f, ]*)\]", dumpsys_output)
+            if match:
+                hashes = {h.strip() for h in match.group(1).split(",") if h.strip()}
+        except Exception as e:
+            print(f"Erro ao ler assinatura de {package_name}: {e}")
+        self._signature_cache[package_name] = hashes
+        return hashes
+
+    def get_device_compat_info(self):
+        serial = self.serial or subprocess.run(self.adb_cmd + ["get-serialno"], capture_output=True, text=True, timeout=5, errors="ignore").stdout.strip()
+        if serial in self._device_compat:
+            return self._device_compat[serial]
+        sdk = subprocess.run(self.adb_cmd + ["shell", "getprop", "ro.build.version.sdk"], capture_output=True, text=True, timeout=5, errors="ignore").stdout.strip()
+        abis = subprocess.run(self.adb_cmd + ["shell", "getprop", "ro.product.cpu.abilist"], capture_output=True, text=True, timeout=5, errors="ignore").stdout.strip()
+        compat = {
+            "sdk": int(sdk) if sdk.isdigit() else None,
+            "abis": [abi for abi in abis.split(",") if abi],
+        }
+        # Sem dispositivo identificado não há o que guardar
+        if serial and serial != "unknown":
+            self._device_compat[serial] = compat
+        return compat
+
+    def check_apk_compatibility(self, apk_path, info=None):
+        """Cruza os dados locais do APK com o dispositivo e retorna a lista de problemas encontrados"""
+        info = info or ler_info_apk(apk_path)
+        try:
+            device = self.get_device_compat_info()
+        except Exception as e:
+            print(f"Erro ao ler propriedades do dispositivo: {e}")
+            device = {"sdk": None, "abis": []}
+
+        versao_instalada, assinaturas = None, None
+        inventory = self.get_package_inventory()
+        if info.get("package") in inventory:
+            versao_instalada = inventory[info["package"]]
+            assinaturas = self.get_package_signature_hashes(info["package"])
+        return verificar_compatibilidade_apk(info, device["sdk"], device["abis"], versao_instalada, assinaturas)
+
+    def is_apk_already_installed(self, apk_path):
+        """Retorna (True, motivo) quando o mesmo pacote, versionCode e certificado já estão no dispositivo"""
+        try:
+            info = ler_info_apk(apk_path)
+        except Exception as e:
+            return False, f"Não foi possível ler o APK: {e}"
+
+        package_name = info["package"]
+        if not package_name or info["version_code"] is None:
+            return False, "Manifesto sem pacote ou versionCode"
+
+        inventory = self.get_package_inventory()
+        if package_name not in inventory:
+            return False, "Pacote não instalado"
+        if inventory[package_name] != info["version_code"]:
+            return False, f"versionCode diferente (dispositivo: {inventory[package_name]}, APK: {info['version_code']})"
+        if not info["signature_hash"] or info["signature_hash"] not in self.get_package_signature_hashes(package_name):
+            return False, "Assinatura diferente ou não verificável"
+        return True, f"{package_name} {info['version_name'] or info['version_code']} já instalado com a mesma assinatura"
 
     def get_app_icon(self, package_name):
         if package_name in self.memory_cache: 
@@ -217,14 +629,14 @@ class AppManager:
     def _extract_icon_from_apk(self, package_name):
         temp_apk_path = None
         try:
-            cmd_path = [self.adb_path, "shell", "pm", "path", package_name]
+            cmd_path = self.adb_cmd + ["shell", "pm", "path", package_name]
             result = subprocess.run(cmd_path, capture_output=True, text=True, timeout=10)
             if result.returncode != 0 or not result.stdout.strip(): 
                 return None
             
             apk_path_on_device = result.stdout.strip().replace("package:", "")
             temp_apk_path = self.icon_cache_dir / f"{package_name}_temp.apk"
-            cmd_pull = [self.adb_path, "pull", apk_path_on_device, str(temp_apk_path)]
+            cmd_pull = self.adb_cmd + ["pull", apk_path_on_device, str(temp_apk_path)]
             subprocess.run(cmd_pull, capture_output=True, timeout=60)
 
             if not temp_apk_path.exists(): 
@@ -288,7 +700,7 @@ class AppManager:
         version = "N/A"
         try:
             dump_output = subprocess.check_output(
-                [self.adb_path, "shell", "pm", "dump", package_name], 
+                self.adb_cmd + ["shell", "pm", "dump", package_name], 
                 text=True, stderr=subprocess.DEVNULL, errors="ignore", timeout=10
             )
             label_re = re.compile(r"label=(.+)")
@@ -300,7 +712,7 @@ class AppManager:
                         app_name = found_name
                         break
             dumpsys_output = subprocess.check_output(
-                [self.adb_path, "shell", "dumpsys", "package", package_name], 
+                self.adb_cmd + ["shell", "dumpsys", "package", package_name], 
                 text=True, stderr=subprocess.DEVNULL, errors="ignore", timeout=10
             )
             version_re = re.compile(r"versionName=(.+)")
@@ -314,13 +726,15 @@ class AppManager:
         return {"name": app_name, "package": package_name, "version": version}
 
 class ConfigManager:
-    def __init__(self, adb_path): 
+    def __init__(self, adb_path, serial=None): 
         self.adb_path = adb_path
+        self.serial = serial
+        self.adb_cmd = comando_adb(adb_path, serial)
     
     def _run_adb_command(self, command, timeout=10):
         try:
             result = subprocess.run(
-                [self.adb_path, "shell"] + command, 
+                self.adb_cmd + ["shell"] + command, 
                 capture_output=True, text=True, timeout=timeout, errors='ignore'
             )
             if result.returncode != 0: 
@@ -510,15 +924,344 @@ class ConfigManager:
         }
         return info
 
+@dataclass
+class MonitorSample:
+    timestamp: float
+    uptime: float = 0.0
+    cpu: float = 0.0
+    ram: float = 0.0
+    ram_used_kb: int = 0
+    ram_total_kb: int = 0
+    storage: float = 0.0
+    storage_used_kb: int = 0
+    storage_total_kb: int = 0
+    battery: int = 0
+    temp_max: float = 0.0
+    gpu_load: float = 0.0
+    battery_current_ma: float = 0.0
+    battery_voltage_mv: float = 0.0
+    battery_temp: float = 0.0
+    throttling: int = 0
+    net_rx_kbs: float = 0.0
+    net_tx_kbs: float = 0.0
+    disk_read_kbs: float = 0.0
+    disk_write_kbs: float = 0.0
+    cpu_cores: dict = field(default_factory=dict)
+    cpu_freq_khz: dict = field(default_factory=dict)
+    cpu_clusters: dict = field(default_factory=dict)
+    temperaturas: dict = field(default_factory=dict)
+    net_interfaces: dict = field(default_factory=dict)
+    disk_devices: dict = field(default_factory=dict)
+
+    def as_dict(self):
+        return asdict(self)
+
+# Um único 'adb shell' lê todas as métricas; cada linha começa com uma tag de seção
+SCRIPT_CPU = (
+    "grep '^cpu' /proc/stat | sed 's/^/S /'; "
+    "grep . /sys/devices/system/cpu/cpu[0-9]*/cpufreq/scaling_cur_freq 2>/dev/null | sed 's/^/F /'; "
+)
+# Térmico, clusters, GPU e bateria só com 'read' (builtin): nenhum processo extra por arquivo
+SCRIPT_TERMICO = (
+    "for z in /sys/class/thermal/thermal_zone*; do read -r t < $z/type && read -r v < $z/temp && echo \"Z $t $v\"; done 2>/dev/null; "
+    "for p in /sys/devices/system/cpu/cpufreq/policy*; do read -r c < $p/scaling_cur_freq && read -r m < $p/scaling_max_freq "
+    "&& read -r x < $p/cpuinfo_max_freq && echo \"C ${p##*/} $c $m $x\"; done 2>/dev/null; "
+    "for c in /sys/class/thermal/cooling_device*; do read -r v < $c/cur_state && [ \"$v\" != 0 ] && echo \"K ${c##*/} $v\"; done 2>/dev/null; "
+    "for g in /sys/class/kgsl/kgsl-3d0/gpu_busy_percentage /sys/kernel/gpu/gpu_busy /sys/class/kgsl/kgsl-3d0/gpubusy; do "
+    "[ -r $g ] && read -r v < $g && echo \"G $v\" && break; done 2>/dev/null; "
+    "{ b=/sys/class/power_supply/battery; read -r i < $b/current_now; read -r u < $b/voltage_now; read -r t < $b/temp; echo \"V $i $u $t\"; } 2>/dev/null; "
+)
+THROTTLE_CPU_LIMITADA = 1   # scaling_max_freq de algum cluster caiu abaixo do teto visto nesta sessão
+THROTTLE_RESFRIAMENTO = 2   # algum cooling_device ativo
+THROTTLE_TEMPERATURA = 4    # alguma zona acima de TEMPERATURA_LIMITE
+THROTTLE_CPU_TETO = 8       # scaling_max_freq bem abaixo de cpuinfo_max_freq, mesmo que já estivesse assim no início
+TETO_CPU_FRACAO = 0.9       # até 10% abaixo do hardware é comum (frequências de boost fora do governor)
+# Acima desta potência na bateria uma leitura de current_now só pode estar em µA; abaixo, µA e mA são possíveis
+POTENCIA_BATERIA_MAX_W = 60.0
+# Leituras seguidas, todas plausíveis em mA, para concluir que o aparelho reporta em mA
+CORRENTE_AMOSTRAS_MA = 30
+TEMPERATURA_LIMITE = 80.0
+# Só discos inteiros (partições repetiriam os mesmos bytes) e nada de loop/ram
+DISCOS_MONITORADOS = re.compile(r"(sd[a-z]+|vd[a-z]+|mmcblk\d+|nvme\d+n\d+|dm-\d+|zram\d+)")
+SETOR_BYTES = 512
+
+SCRIPT_AMOSTRA = (
+    "echo U $(cat /proc/uptime); "
+    + SCRIPT_CPU +
+    "echo M $(grep -E '^(MemTotal|MemAvailable):' /proc/meminfo); "
+    "echo D $(df /data | tail -n 1); "
+    "echo B $(cat /sys/class/power_supply/battery/capacity 2>/dev/null || dumpsys battery | grep level); "
+    + SCRIPT_TERMICO +
+    "while read -r l; do echo \"N $l\"; done < /proc/net/dev; "
+    "while read -r l; do echo \"I $l\"; done < /proc/diskstats; "
+    "echo E"
+)
+# Primeira amostra: uma leitura extra de /proc/stat para já ter o delta de CPU
+SCRIPT_STAT_INICIAL = "grep '^cpu' /proc/stat | sed 's/^/S /'; sleep 0.2; "
+STREAM_INTERVALO_MINIMO = 0.1
+# Todos os processos numa única chamada: dono de cada /proc/<pid> (UID), linha de CPU agregada
+# e, por processo, stat|statm|cmdline lidos com 'read' (builtin, sem criar processos por PID)
+SCRIPT_PROCESSOS = (
+    "cd /proc; ls -ldn [0-9]* | sed 's/^/O /'; read -r c < stat; echo \"T $c\"; "
+    "for p in [0-9]*; do read -r s < $p/stat || continue; read -r m < $p/statm; "
+    "read -r n < $p/cmdline; echo \"P $p|$s|$m|$n\"; done"
+)
+PAGINA_KB = 4
+UID_PRIMEIRO_APP = 10000
+
 class DeviceMonitor:
-    def __init__(self, adb_path):
+    def __init__(self, adb_path, serial=None):
         self.adb_path = adb_path
-        self._last_cpu_stats = None
+        self.serial = serial
+        self.adb_cmd = comando_adb(adb_path, serial)
+        # {"cpu": (total, ocioso), "cpu0": ...} da última leitura de /proc/stat
+        self._last_cpu_stats = {}
+        # {"uptime": s, "net": {iface: (rx, tx)}, "disk": {dev: (lidos, escritos)}} em bytes
+        self._last_io = None
+        # AlertEngine opcional, avaliado a cada amostra coletada
+        self.alertas = None
+        self._stream_process = None
+        self._stream_lock = threading.Lock()
+        # {consumidor: ({pid: (início, jiffies)}, total)}: cada chamador mede a CPU contra a própria leitura anterior
+        self._proc_baselines = {}
+        self._proc_lock = threading.Lock()
+        self._uid_packages = None
+        self._uid_packages_time = 0
+        # Maior scaling_max_freq já visto por cluster: o teto normal do governor, que pode ficar abaixo do hardware
+        self._max_freq_base = {}
+        # current_now em µA (padrão do kernel) ou mA (alguns fabricantes), decidido uma vez por dispositivo
+        self._corrente_em_ua = None
+        self._correntes_ambiguas = 0
+
+    def _parse_sample(self, output, timestamp=None, lidas=None):
+        """Monta o MonitorSample; 'lidas' (opcional) recebe as métricas que de fato vieram na saída"""
+        sample = MonitorSample(timestamp=timestamp or time.time())
+        lidas = set() if lidas is None else lidas
+        rede, discos = {}, {}
+        for line in output.splitlines():
+            tag, _, dados = line.strip().partition(" ")
+            campos = dados.split()
+            try:
+                if tag == "U" and campos:
+                    sample.uptime = float(campos[0])
+                    lidas.add("uptime")
+                elif tag == "S" and len(campos) >= 5:
+                    tinha_base = campos[0] in self._last_cpu_stats
+                    uso = self._cpu_from_stat(campos[0], [int(v) for v in campos[1:9]])
+                    if campos[0] == "cpu":
+                        sample.cpu = uso
+                        if tinha_base:
+                            lidas.add("cpu")
+                    else:
+                        sample.cpu_cores[int(campos[0][3:])] = uso
+                elif tag == "F":
+                    match = re.search(r"/cpu(\d+)/cpufreq/scaling_cur_freq:(\d+)", dados)
+                    if match:
+                        sample.cpu_freq_khz[int(match.group(1))] = int(match.group(2))
+                elif tag == "M":
+                    valores = dict(re.findall(r"(\w+):\s+(\d+)", dados))
+                    total, disponivel = int(valores["MemTotal"]), int(valores["MemAvailable"])
+                    sample.ram_total_kb, sample.ram_used_kb = total, total - disponivel
+                    sample.ram = (total - disponivel) / total * 100 if total else 0.0
+                    lidas.update(("ram", "ram_used_kb", "ram_total_kb"))
+                elif tag == "D" and len(campos) >= 4:
+                    usado, livre = int(campos[2]), int(campos[3])
+                    sample.storage_total_kb, sample.storage_used_kb = int(campos[1]), usado
+                    sample.storage = usado / (usado + livre) * 100 if usado + livre else 0.0
+                    lidas.update(("storage", "storage_used_kb", "storage_total_kb"))
+                elif tag == "B":
+                    match = re.search(r"(\d+)", dados)
+                    if match:
+                        sample.battery = int(match.group(1))
+                        lidas.add("battery")
+                elif tag == "Z" and len(campos) >= 2:
+                    temperatura = int(campos[-1])
+                    # A maioria dos kernels reporta em m°C; alguns já em °C
+                    temperatura = temperatura / 1000 if abs(temperatura) >= 1000 else float(temperatura)
+                    if 0 < temperatura < 150:
+                        sample.temperaturas[" ".join(campos[:-1])] = temperatura
+                elif tag == "C" and len(campos) == 4:
+                    atual, maximo, hw_max = (int(v) for v in campos[1:])
+                    sample.cpu_clusters[campos[0]] = {"cur": atual, "max": maximo, "hw_max": hw_max}
+                    base = self._max_freq_base.get(campos[0], 0)
+                    if maximo < base:
+                        sample.throttling |= THROTTLE_CPU_LIMITADA
+                    if maximo < hw_max * TETO_CPU_FRACAO:
+                        sample.throttling |= THROTTLE_CPU_TETO
+                    self._max_freq_base[campos[0]] = max(base, maximo)
+                    lidas.add("throttling")
+                elif tag == "K":
+                    sample.throttling |= THROTTLE_RESFRIAMENTO
+                elif tag == "G":
+                    numeros = [int(v) for v in re.findall(r"\d+", dados)]
+                    if len(numeros) >= 2:
+                        sample.gpu_load = numeros[0] / numeros[1] * 100 if numeros[1] else 0.0
+                    elif numeros:
+                        sample.gpu_load = float(numeros[0])
+                    if numeros:
+                        lidas.add("gpu_load")
+                elif tag == "V" and len(campos) == 3:
+                    corrente, tensao, temperatura = (int(v) for v in campos)
+                    sample.battery_voltage_mv = tensao / 1000 if tensao > 100000 else float(tensao)
+                    sample.battery_temp = temperatura / 10
+                    lidas.update(("battery_voltage_mv", "battery_temp"))
+                    if self._decidir_unidade_corrente(corrente, sample.battery_voltage_mv):
+                        sample.battery_current_ma = corrente / 1000 if self._corrente_em_ua else float(corrente)
+                        lidas.add("battery_current_ma")
+                elif tag == "N" and ":" in dados:
+                    interface, _, contadores = dados.partition(":")
+                    contadores = contadores.split()
+                    if interface.strip() != "lo" and len(contadores) >= 9:
+                        rede[interface.strip()] = (int(contadores[0]), int(contadores[8]))
+                elif tag == "I" and len(campos) >= 10 and DISCOS_MONITORADOS.fullmatch(campos[2]):
+                    discos[campos[2]] = (int(campos[5]) * SETOR_BYTES, int(campos[9]) * SETOR_BYTES)
+            except (ValueError, KeyError, IndexError) as e:
+                print(f"Erro ao interpretar a seção '{tag}' da amostra: {e}")
+        if sample.uptime and (rede or discos):
+            if self._calcular_taxas_io(sample, rede, discos):
+                lidas.update(("net_rx_kbs", "net_tx_kbs", "disk_read_kbs", "disk_write_kbs"))
+        if sample.temperaturas:
+            sample.temp_max = max(sample.temperaturas.values())
+            lidas.update(("temp_max", "throttling"))
+            if sample.temp_max >= TEMPERATURA_LIMITE:
+                sample.throttling |= THROTTLE_TEMPERATURA
+        return sample
+
+    def _avaliar_alertas(self, sample, lidas):
+        # Só amostras completas (sample()/stream()) passam por aqui; métricas ausentes não são comparadas pelo valor padrão
+        if self.alertas and sample is not None:
+            self.alertas.avaliar(sample, self.serial, lidas)
+
+    def _decidir_unidade_corrente(self, corrente, tensao_mv):
+        """True quando a unidade de current_now já é conhecida.
+
+        Só uma leitura impossível em mA (potência acima de POTENCIA_BATERIA_MAX_W) prova µA. mA só é aceito
+        depois de CORRENTE_AMOSTRAS_MA leituras não nulas sem nenhuma dessas. Até lá a corrente não é reportada.
+        """
+        if not corrente:
+            return self._corrente_em_ua is not None
+        if abs(corrente) / 1000 * max(tensao_mv, 3000) / 1000 > POTENCIA_BATERIA_MAX_W:
+            self._corrente_em_ua = True
+        elif self._corrente_em_ua is None:
+            self._correntes_ambiguas += 1
+            if self._correntes_ambiguas >= CORRENTE_AMOSTRAS_MA:
+                self._corrente_em_ua = False
+        return self._corrente_em_ua is not None
+
+    def _calcular_taxas_io(self, sample, rede, discos):
+        # Taxas em KB/s pelo uptime do dispositivo, imune ao atraso do adb entre amostras
+        anterior, self._last_io = self._last_io, {"uptime": sample.uptime, "net": rede, "disk": discos}
+        if not anterior or sample.uptime <= anterior["uptime"]:
+            return False
+        intervalo = sample.uptime - anterior["uptime"]
+
+        def taxa(atual, antes):
+            return max(atual - antes, 0) / 1024 / intervalo
+
+        for interface, (rx, tx) in rede.items():
+            if interface in anterior["net"]:
+                rx_antes, tx_antes = anterior["net"][interface]
+                sample.net_interfaces[interface] = {"rx_kbs": taxa(rx, rx_antes), "tx_kbs": taxa(tx, tx_antes)}
+        for disco, (lidos, escritos) in discos.items():
+            if disco in anterior["disk"]:
+                lidos_antes, escritos_antes = anterior["disk"][disco]
+                sample.disk_devices[disco] = {"read_kbs": taxa(lidos, lidos_antes), "write_kbs": taxa(escritos, escritos_antes)}
+        sample.net_rx_kbs = sum(i["rx_kbs"] for i in sample.net_interfaces.values())
+        sample.net_tx_kbs = sum(i["tx_kbs"] for i in sample.net_interfaces.values())
+        # dm-* fica por cima de um disco físico; o total soma só os físicos para não contar duas vezes
+        fisicos = [d for nome, d in sample.disk_devices.items() if not nome.startswith(("dm-", "zram"))]
+        sample.disk_read_kbs = sum(d["read_kbs"] for d in fisicos)
+        sample.disk_write_kbs = sum(d["write_kbs"] for d in fisicos)
+        return True
+
+    def _cpu_from_stat(self, nome, valores):
+        # user nice system idle iowait irq softirq steal -> ocioso = idle + iowait
+        total, ocioso = sum(valores), valores[3] + (valores[4] if len(valores) > 4 else 0)
+        anterior = self._last_cpu_stats.get(nome)
+        self._last_cpu_stats[nome] = (total, ocioso)
+        if not anterior or total <= anterior[0]:
+            return 0.0
+        return max(0.0, min(100.0, (1 - (ocioso - anterior[1]) / (total - anterior[0])) * 100))
+
+    def sample(self, timeout=5):
+        """Lê CPU, RAM, armazenamento e bateria em uma única chamada 'adb shell'"""
+        lidas = set()
+        sample = self._sample_script(SCRIPT_AMOSTRA, timeout, lidas)
+        self._avaliar_alertas(sample, lidas)
+        return sample
+
+    def _sample_script(self, script, timeout=5, lidas=None):
+        if "cpu" not in self._last_cpu_stats:
+            script = SCRIPT_STAT_INICIAL + script
+        output = self._run_adb_shell_command([script], timeout=timeout)
+        if output is None:
+            return None
+        return self._parse_sample(output, lidas=lidas)
+
+    def stream(self, interval=1.0):
+        """Gera amostras de um único laço 'adb shell' que roda no dispositivo a cada 'interval' segundos.
+
+        O gerador termina quando stop_stream() é chamado ou o dispositivo desconecta.
+        """
+        interval = max(float(interval), STREAM_INTERVALO_MINIMO)
+        script = f"{SCRIPT_STAT_INICIAL if 'cpu' not in self._last_cpu_stats else ''}while true; do {SCRIPT_AMOSTRA}; sleep {interval:g}; done"
+        process = subprocess.Popen(
+            self.adb_cmd + ["shell", script],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, errors='ignore', bufsize=1
+        )
+        self.stop_stream()
+        with self._stream_lock:
+            self._stream_process = process
+        linhas = []
+        try:
+            for line in process.stdout:
+                if line.strip() != "E":
+                    linhas.append(line)
+                    continue
+                if self._stream_process is not process:
+                    break
+                lidas = set()
+                sample = self._parse_sample("".join(linhas), lidas=lidas)
+                self._avaliar_alertas(sample, lidas)
+                yield sample
+                linhas = []
+        finally:
+            with self._stream_lock:
+                if self._stream_process is process:
+                    self._stream_process = None
+            self._encerrar_processo(process)
+
+    def stop_stream(self):
+        """Encerra o laço de amostragem em andamento; o gerador de stream() termina na sequência"""
+        with self._stream_lock:
+            process, self._stream_process = self._stream_process, None
+        if process and process.poll() is None:
+            process.terminate()
+
+    @staticmethod
+    def _encerrar_processo(process):
+        # Fechar o 'adb shell' derruba o laço no dispositivo (SIGHUP/SIGPIPE no próximo echo)
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        if process.stdout:
+            process.stdout.close()
+
+    def get_cpu_stats(self):
+        """Uso de CPU total e por núcleo (delta de /proc/stat) e frequência atual de cada núcleo"""
+        sample = self._sample_script(SCRIPT_CPU)
+        if sample is None:
+            return None
+        return {"total": sample.cpu, "cores": sample.cpu_cores, "freq_khz": sample.cpu_freq_khz}
 
     def _run_adb_shell_command(self, command, timeout=5):
         try:
             result = subprocess.run(
-                [self.adb_path, "shell"] + command,
+                self.adb_cmd + ["shell"] + command,
                 capture_output=True, text=True, timeout=timeout, errors='ignore'
             )
             return result.stdout.strip() if result.returncode == 0 else None
@@ -526,17 +1269,10 @@ class DeviceMonitor:
             return None
 
     def get_cpu_usage(self):
-        top_output = self._run_adb_shell_command(["top", "-n", "1", "-b"])
-        if not top_output: 
+        stats = self.get_cpu_stats()
+        if not stats: 
             return "N/A"
-        
-        for line in top_output.splitlines():
-            if "CPU" in line:
-                match = re.search(r'(\d+)% *user.*, *(\d+)% *sys', line)
-                if match:
-                    user, sys = int(match.group(1)), int(match.group(2))
-                    return f"{user + sys}%"
-        return "N/A"
+        return f"{stats['total']:.1f}%"
 
     def get_cpu_usage_percentage(self):
         usage_str = self.get_cpu_usage()
@@ -603,30 +1339,1460 @@ class DeviceMonitor:
                         pass
         return 0
 
-    def get_running_apps(self):
-        output = self._run_adb_shell_command(["top", "-n", "1", "-b", "-o", "NAME", "-o", "PID"])
-        if not output: 
-            return []
-        apps = []
-        start_index = -1
-        for i, line in enumerate(output.splitlines()):
-            if "PID" in line and "NAME" in line:
-                start_index = i + 1
-                break
-        if start_index == -1: 
-            return []
+    def get_uid_packages(self, max_age=AppManager.INVENTORY_TTL):
+        """{appId: [pacotes]} a partir de 'pm list packages -U', em cache por alguns segundos"""
+        if self._uid_packages is not None and time.time() - self._uid_packages_time < max_age:
+            return self._uid_packages
+        output = self._run_adb_shell_command(["pm", "list", "packages", "-U"], timeout=15)
+        if output is None:
+            return self._uid_packages or {}
+        mapa = {}
+        for match in re.finditer(r"package:(\S+)\s+uid:(\d+)", output):
+            mapa.setdefault(int(match.group(2)) % 100000, []).append(match.group(1))
+        self._uid_packages, self._uid_packages_time = mapa, time.time()
+        return mapa
+
+    def get_process_stats(self, top_n=None, ordenar="cpu", consumidor="padrao"):
+        """CPU% (delta entre chamadas do mesmo 'consumidor') e memória de cada processo, ordenados por 'cpu' ou 'mem'.
+
+        A primeira chamada de cada consumidor só registra os contadores, então a CPU de todos os processos sai 0.
+        Com consumidor=None nenhuma base é lida ou alterada (a CPU sai 0).
+        """
+        # A leitura e a troca da base ficam sob o lock, senão uma chamada concorrente mede contra uma base mais nova que a sua
+        with self._proc_lock:
+            return self._get_process_stats(top_n, ordenar, consumidor)
+
+    def _get_process_stats(self, top_n, ordenar, consumidor):
+        output = self._run_adb_shell_command([SCRIPT_PROCESSOS], timeout=15)
+        if output is None:
+            return None
+        uids, total, brutos = {}, None, []
+        for line in output.splitlines():
+            tag, _, dados = line.partition(" ")
+            if tag == "O":
+                campos = dados.split()
+                if len(campos) >= 4 and campos[-1].isdigit():
+                    uids[int(campos[-1])] = int(campos[2])
+            elif tag == "T":
+                total = sum(int(v) for v in dados.split()[1:9])
+            elif tag == "P":
+                brutos.append(dados)
+
+        uid_packages = self.get_uid_packages()
+        base_stats, base_total = self._proc_baselines.get(consumidor, ({}, None))
+        delta_total = total - base_total if total and base_total else 0
+        atuais, processos = {}, []
+        for dados in brutos:
+            try:
+                pid_str, resto = dados.split("|", 1)
+                stat, statm, cmdline = resto.rsplit("|", 2)
+                pid = int(pid_str)
+                comm = stat[stat.index("(") + 1:stat.rindex(")")]
+                campos = stat[stat.rindex(")") + 2:].split()
+                jiffies, inicio = int(campos[11]) + int(campos[12]), int(campos[19])
+                rss_kb = int(statm.split()[1]) * PAGINA_KB
+            except (ValueError, IndexError):
+                continue
+            atuais[pid] = (inicio, jiffies)
+            anterior = base_stats.get(pid)
+            cpu = 0.0
+            if delta_total > 0 and anterior and anterior[0] == inicio:
+                cpu = max(0.0, (jiffies - anterior[1]) / delta_total * 100)
+
+            # O shell descarta os NULs do cmdline; só nomes de processo Android (pacote[:sufixo]) são confiáveis
+            cmdline = cmdline.strip("\x00 ")
+            nome = cmdline if re.fullmatch(r"[\w.]+\.[\w.]+(:[\w.]+)?", cmdline) else comm
+            uid = uids.get(pid)
+            pacotes = uid_packages.get(uid % 100000, []) if uid is not None and uid % 100000 >= UID_PRIMEIRO_APP else []
+            base = nome.split(":")[0]
+            pacote = base if base in pacotes else (pacotes[0] if pacotes else None)
+            processos.append({"pid": pid, "nome": nome, "pacote": pacote, "uid": uid, "estado": campos[0],
+                              "cpu": cpu, "rss_kb": rss_kb})
+
+        if consumidor is not None:
+            self._proc_baselines[consumidor] = (atuais, total)
+        chave = (lambda p: p["rss_kb"]) if ordenar == "mem" else (lambda p: (p["cpu"], p["rss_kb"]))
+        processos.sort(key=chave, reverse=True)
+        return processos[:top_n] if top_n else processos
 
-        for line in output.splitlines()[start_index:]:
-            parts = line.split()
-            if len(parts) >= 2 and "." in parts[-1]:
-                pid = parts[0]
-                name = parts[-1]
-                apps.append({'pid': pid, 'name': name})
-        return apps
+    def get_running_apps(self):
+        processos = self.get_process_stats(consumidor=None) or []
+        return [{'pid': str(p["pid"]), 'name': p["nome"]} for p in processos if p["pacote"]]
 
     def force_stop_app(self, package_name):
         return self._run_adb_shell_command(["am", "force-stop", package_name])
 
+def formatar_nucleos(amostra):
+    """Texto curto com uso e frequência de cada núcleo, ex.: 'cpu0 42% 1.80GHz · cpu1 ...'"""
+    partes = []
+    for nucleo in sorted(set(amostra.cpu_cores) | set(amostra.cpu_freq_khz)):
+        texto = f"cpu{nucleo}"
+        if nucleo in amostra.cpu_cores:
+            texto += f" {amostra.cpu_cores[nucleo]:.0f}%"
+        if nucleo in amostra.cpu_freq_khz:
+            texto += f" {amostra.cpu_freq_khz[nucleo] / 1e6:.2f}GHz"
+        partes.append(texto)
+    return " · ".join(partes)
+
+class AdaptiveSampler:
+    """Escolhe o intervalo de amostragem: acelera quando CPU/RAM mudam rápido e desacelera quando estão estáveis"""
+    NIVEIS = (0.25, 0.5, 1.0, 2.0, 5.0)
+    INTERVALO_OCULTO = 5.0
+
+    def __init__(self, limite_pico=15.0, limite_mudanca=5.0, limite_estavel=2.0, amostras_estaveis=5):
+        self.limite_pico = limite_pico
+        self.limite_mudanca = limite_mudanca
+        self.limite_estavel = limite_estavel
+        self.amostras_estaveis = amostras_estaveis
+        self.nivel = self.NIVEIS.index(1.0)
+        self._anterior = None
+        self._estaveis = 0
+
+    @property
+    def intervalo(self):
+        return self.NIVEIS[self.nivel]
+
+    def proximo_intervalo(self, sample, visivel=True, pausado=False):
+        """Registra a amostra e retorna o próximo intervalo (None = pausar a coleta)"""
+        anterior, self._anterior = self._anterior, sample
+        if pausado:
+            return None
+        if anterior is not None:
+            variacao = max(abs(sample.cpu - anterior.cpu), abs(sample.ram - anterior.ram))
+            if variacao >= self.limite_pico:
+                self.nivel, self._estaveis = 0, 0
+            elif variacao >= self.limite_mudanca:
+                self.nivel, self._estaveis = max(self.nivel - 1, 0), 0
+            elif variacao < self.limite_estavel:
+                self._estaveis += 1
+                if self._estaveis >= self.amostras_estaveis:
+                    self.nivel, self._estaveis = min(self.nivel + 1, len(self.NIVEIS) - 1), 0
+            else:
+                self._estaveis = 0
+        if not visivel:
+            return max(self.intervalo, self.INTERVALO_OCULTO)
+        return self.intervalo
+
+# 4 horas de histórico a 250 ms por amostra (16 bytes por ponto)
+HISTORICO_CAPACIDADE = 4 * 3600 * 4
+METRICAS_MONITOR = ("cpu", "ram", "storage", "battery", "temp_max", "gpu_load", "battery_current_ma", "throttling",
+                    "net_rx_kbs", "net_tx_kbs", "disk_read_kbs", "disk_write_kbs")
+
+def reduzir_lttb(ts, vs, pontos):
+    """Largest-Triangle-Three-Buckets: escolhe 'pontos' amostras que preservam o formato da série"""
+    n = len(ts)
+    if pontos >= n or pontos < 3:
+        return list(zip(ts, vs))
+    saida = [(ts[0], vs[0])]
+    passo = (n - 2) / (pontos - 2)
+    anterior = 0
+    for i in range(pontos - 2):
+        # Ponto médio do próximo bucket (no último, o ponto final da série)
+        inicio_prox, fim_prox = int((i + 1) * passo) + 1, min(int((i + 2) * passo) + 1, n)
+        qtd = fim_prox - inicio_prox
+        media_t, media_v = sum(ts[inicio_prox:fim_prox]) / qtd, sum(vs[inicio_prox:fim_prox]) / qtd
+        at, av = ts[anterior], vs[anterior]
+        melhor, maior_area = -1, -1.0
+        for j in range(int(i * passo) + 1, int((i + 1) * passo) + 1):
+            area = abs((at - media_t) * (vs[j] - av) - (at - ts[j]) * (media_v - av))
+            if area > maior_area:
+                melhor, maior_area = j, area
+        saida.append((ts[melhor], vs[melhor]))
+        anterior = melhor
+    saida.append((ts[-1], vs[-1]))
+    return saida
+
+def reduzir_minmax(ts, vs, pontos):
+    """Mantém o mínimo e o máximo de cada bucket, na ordem em que ocorreram (preserva picos)"""
+    n = len(ts)
+    buckets = max(pontos // 2, 1)
+    if n <= pontos:
+        return list(zip(ts, vs))
+    saida = []
+    for b in range(buckets):
+        inicio, fim = b * n // buckets, (b + 1) * n // buckets
+        trecho = vs[inicio:fim]
+        i_min, i_max = inicio + trecho.index(min(trecho)), inicio + trecho.index(max(trecho))
+        for i in sorted({i_min, i_max}):
+            saida.append((ts[i], vs[i]))
+    return saida
+
+class TimeSeriesBuffer:
+    """Buffer circular de tamanho fixo com timestamps e valores de uma métrica"""
+    def __init__(self, capacity=HISTORICO_CAPACIDADE):
+        self.capacity = capacity
+        self._ts = array('d', bytes(8 * capacity))
+        self._vs = array('d', bytes(8 * capacity))
+        self._inicio = 0
+        self._tamanho = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._tamanho
+
+    @classmethod
+    def from_arrays(cls, timestamps, valores):
+        """Cria um buffer cheio com séries já carregadas (ex.: de uma gravação)"""
+        buffer = cls(max(len(timestamps), 1))
+        buffer._ts[:len(timestamps)] = array('d', timestamps)
+        buffer._vs[:len(valores)] = array('d', valores)
+        buffer._tamanho = len(timestamps)
+        return buffer
+
+    def append(self, timestamp, valor):
+        with self._lock:
+            fim = (self._inicio + self._tamanho) % self.capacity
+            self._ts[fim], self._vs[fim] = timestamp, valor
+            if self._tamanho < self.capacity:
+                self._tamanho += 1
+            else:
+                self._inicio = (self._inicio + 1) % self.capacity
+
+    def first(self):
+        with self._lock:
+            if not self._tamanho:
+                return None
+            return self._ts[self._inicio], self._vs[self._inicio]
+
+    def last(self):
+        with self._lock:
+            if not self._tamanho:
+                return None
+            fim = (self._inicio + self._tamanho - 1) % self.capacity
+            return self._ts[fim], self._vs[fim]
+
+    def window(self, seconds=None):
+        """(timestamps, valores) em ordem cronológica; com 'seconds', só a janela mais recente"""
+        with self._lock:
+            fim = self._inicio + self._tamanho
+            if fim <= self.capacity:
+                ts, vs = self._ts[self._inicio:fim], self._vs[self._inicio:fim]
+            else:
+                ts = self._ts[self._inicio:] + self._ts[:fim - self.capacity]
+                vs = self._vs[self._inicio:] + self._vs[:fim - self.capacity]
+        if seconds and ts:
+            corte = bisect_left(ts, ts[-1] - seconds)
+            ts, vs = ts[corte:], vs[corte:]
+        return ts, vs
+
+    def stats(self, seconds=None):
+        _, vs = self.window(seconds)
+        if not vs:
+            return None
+        return {"min": min(vs), "max": max(vs), "media": sum(vs) / len(vs), "amostras": len(vs)}
+
+    def downsample(self, pontos, seconds=None, metodo="lttb"):
+        """Reduz a janela a no máximo 'pontos' pares (timestamp, valor) para desenhar no gráfico"""
+        ts, vs = self.window(seconds)
+        return (reduzir_lttb if metodo == "lttb" else reduzir_minmax)(ts, vs, pontos)
+
+class MonitorHistory:
+    """Um TimeSeriesBuffer por métrica, alimentado com MonitorSample"""
+    def __init__(self, metricas=METRICAS_MONITOR, capacity=HISTORICO_CAPACIDADE):
+        self.series = {metrica: TimeSeriesBuffer(capacity) for metrica in metricas}
+
+    def __getitem__(self, metrica):
+        return self.series[metrica]
+
+    def append(self, sample):
+        for metrica, serie in self.series.items():
+            serie.append(sample.timestamp, getattr(sample, metrica))
+
+    def clear(self):
+        self.series = {metrica: TimeSeriesBuffer(serie.capacity) for metrica, serie in self.series.items()}
+
+    @classmethod
+    def from_columns(cls, colunas):
+        """Histórico a partir das colunas de uma gravação ({'timestamp': ..., 'cpu': ...})"""
+        historico = cls(metricas=())
+        historico.series = {
+            metrica: TimeSeriesBuffer.from_arrays(colunas["timestamp"], valores)
+            for metrica, valores in colunas.items() if metrica != "timestamp"
+        }
+        return historico
+
+# Gravação do monitor: cabeçalho JSON + blocos colunares de doubles (um array por coluna),
+# opcionalmente comprimidos com zlib. Só acrescenta blocos; um bloco truncado no fim é ignorado.
+GRAVACAO_MAGIC = b"ADBMON1\n"
+GRAVACAO_BLOCO = struct.Struct("<4sIII")  # tipo (BLK0/BLKZ), amostras, bytes, crc32
+GRAVACAO_AMOSTRAS_POR_BLOCO = 240
+GRAVACAO_FLUSH_SEGUNDOS = 10
+
+def colunas_gravacao():
+    return [f.name for f in fields(MonitorSample) if f.type in (float, int, "float", "int")]
+
+class MonitorRecorder:
+    """Grava cada MonitorSample em um arquivo colunar append-only"""
+    def __init__(self, path, comprimir=True, metadados=None):
+        self.path = Path(path)
+        self.comprimir = comprimir
+        self.colunas = colunas_gravacao()
+        self.amostras = 0
+        self._pendentes = {coluna: array('d') for coluna in self.colunas}
+        self._ultimo_flush = time.time()
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        cabecalho = json.dumps({"colunas": self.colunas, "inicio": time.time(), **(metadados or {})}).encode()
+        self._arquivo = open(self.path, "wb")
+        self._arquivo.write(GRAVACAO_MAGIC + struct.pack("<I", len(cabecalho)) + cabecalho)
+        self._arquivo.flush()
+
+    def append(self, sample):
+        with self._lock:
+            for coluna in self.colunas:
+                self._pendentes[coluna].append(float(getattr(sample, coluna)))
+            self.amostras += 1
+            if (len(self._pendentes["timestamp"]) >= GRAVACAO_AMOSTRAS_POR_BLOCO
+                    or time.time() - self._ultimo_flush >= GRAVACAO_FLUSH_SEGUNDOS):
+                self._gravar_bloco()
+
+    def _gravar_bloco(self):
+        quantidade = len(self._pendentes["timestamp"])
+        self._ultimo_flush = time.time()
+        if not quantidade:
+            return
+        dados = b"".join(self._pendentes[coluna].tobytes() for coluna in self.colunas)
+        tipo = b"BLK0"
+        if self.comprimir:
+            dados, tipo = zlib.compress(dados, 6), b"BLKZ"
+        self._arquivo.write(GRAVACAO_BLOCO.pack(tipo, quantidade, len(dados), zlib.crc32(dados)) + dados)
+        self._arquivo.flush()
+        self._pendentes = {coluna: array('d') for coluna in self.colunas}
+
+    def close(self):
+        with self._lock:
+            if self._arquivo.closed:
+                return
+            self._gravar_bloco()
+            self._arquivo.close()
+
+def caminho_gravacao_padrao(serial=None):
+    return diretorio_dados("monitor_recordings") / f"{serial or 'dispositivo'}-{time.strftime('%Y%m%d-%H%M%S')}.admon"
+
+def formatar_intervalo_gravacao(metadados):
+    """'intervalo' dos metadados: segundos, "auto" (amostragem adaptativa) ou ausente em gravações antigas"""
+    intervalo = metadados.get("intervalo")
+    if intervalo == "auto":
+        return "automático"
+    return f"{intervalo:g} s" if isinstance(intervalo, (int, float)) else "desconhecido"
+
+def carregar_gravacao(path):
+    """Lê uma gravação do monitor via mmap e retorna (metadados, {coluna: array('d')})"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm[:len(GRAVACAO_MAGIC)] != GRAVACAO_MAGIC:
+            raise ValueError("Arquivo não é uma gravação do monitor")
+        pos = len(GRAVACAO_MAGIC)
+        (tamanho,) = struct.unpack_from("<I", mm, pos)
+        metadados = json.loads(mm[pos + 4:pos + 4 + tamanho])
+        colunas = {coluna: array('d') for coluna in metadados["colunas"]}
+        pos += 4 + tamanho
+        visao = memoryview(mm)
+        try:
+            while pos + GRAVACAO_BLOCO.size <= len(mm):
+                tipo, quantidade, tamanho, crc = GRAVACAO_BLOCO.unpack_from(mm, pos)
+                inicio, pos = pos + GRAVACAO_BLOCO.size, pos + GRAVACAO_BLOCO.size + tamanho
+                if pos > len(mm) or zlib.crc32(visao[inicio:pos]) != crc:
+                    # Bloco incompleto de uma gravação interrompida
+                    break
+                dados = zlib.decompress(visao[inicio:pos]) if tipo == b"BLKZ" else visao[inicio:pos]
+                largura = quantidade * 8
+                for i, coluna in enumerate(metadados["colunas"]):
+                    colunas[coluna].frombytes(dados[i * largura:(i + 1) * largura])
+                del dados
+        finally:
+            visao.release()
+    metadados["amostras"] = len(colunas["timestamp"])
+    return metadados, colunas
+
+# Regras de alerta: "<métrica> <op> <limite> [for <N>s]", ex.: "battery < 20", "ram > 90 for 30s"
+ALIASES_METRICAS = {"temp": "temp_max", "bateria": "battery", "armazenamento": "storage", "gpu": "gpu_load"}
+OPERADORES_ALERTA = {
+    "<": lambda v, l: v < l, "<=": lambda v, l: v <= l,
+    ">": lambda v, l: v > l, ">=": lambda v, l: v >= l,
+}
+ACOES_ALERTA = ("ui", "log", "webhook")
+ALERTAS_LOG = diretorio_dados("monitor_alerts.jsonl")
+ALERTAS_CONFIG = diretorio_dados("alert_rules.json")
+
+@dataclass
+class AlertRule:
+    metrica: str
+    operador: str
+    limite: float
+    duracao: float = 0.0
+    acoes: tuple = ACOES_ALERTA
+    texto: str = ""
+
+    @classmethod
+    def parse(cls, texto, acoes=ACOES_ALERTA):
+        match = re.fullmatch(r"\s*(\w+)\s*(<=|>=|<|>)\s*(-?[\d.]+)\s*(?:(?:for|por)\s+([\d.]+)\s*s?)?\s*", texto)
+        if not match:
+            raise ValueError(f"Regra inválida: '{texto}' (esperado: 'metrica > limite [for 30s]')")
+        metrica = ALIASES_METRICAS.get(match.group(1), match.group(1))
+        if metrica not in colunas_gravacao():
+            raise ValueError(f"Métrica desconhecida na regra '{texto}': {match.group(1)}")
+        return cls(metrica, match.group(2), float(match.group(3)), float(match.group(4) or 0), tuple(acoes), texto.strip())
+
+class AlertEngine:
+    """Avalia regras de limite a cada amostra, em O(1) por regra, mantendo o estado por dispositivo.
+
+    Uma regra dispara uma vez quando a condição se mantém por 'duracao' segundos e só volta a
+    disparar depois que a condição deixa de valer.
+    """
+    def __init__(self, regras, webhook_url=None, callback=None, log_path=ALERTAS_LOG):
+        self.callback = callback
+        self.log_path = Path(log_path) if log_path else None
+        self.disparados = 0
+        self._lock = threading.Lock()
+        self.configurar(regras, webhook_url)
+
+    def configurar(self, regras, webhook_url=None):
+        """Troca as regras (textos ou AlertRule); levanta ValueError se alguma for inválida"""
+        regras = [r if isinstance(r, AlertRule) else AlertRule.parse(r) for r in regras]
+        with self._lock:
+            self.regras, self.webhook_url = regras, webhook_url or None
+            # (serial, índice da regra) -> [início da condição ou None, já disparou]
+            self._estado = {}
+
+    @classmethod
+    def from_config(cls, path=ALERTAS_CONFIG, callback=None):
+        """Carrega {"regras": [...], "webhook": "http://..."}; sem arquivo, nenhuma regra"""
+        path = Path(path)
+        config = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+        return cls(config.get("regras", []), config.get("webhook"), callback)
+
+    def salvar_config(self, path=ALERTAS_CONFIG):
+        config = {"regras": [r.texto for r in self.regras], "webhook": self.webhook_url}
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(config, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def avaliar(self, sample, serial=None, lidas=None):
+        """Avalia as regras; com 'lidas', regras de métricas que a amostra não trouxe são puladas sem mexer no estado"""
+        alertas = []
+        with self._lock:
+            for indice, regra in enumerate(self.regras):
+                if lidas is not None and regra.metrica not in lidas:
+                    continue
+                estado = self._estado.setdefault((serial, indice), [None, False])
+                valor = getattr(sample, regra.metrica)
+                if not OPERADORES_ALERTA[regra.operador](valor, regra.limite):
+                    estado[0], estado[1] = None, False
+                    continue
+                if estado[0] is None:
+                    estado[0] = sample.timestamp
+                if not estado[1] and sample.timestamp - estado[0] >= regra.duracao:
+                    estado[1] = True
+                    alertas.append({"serial": serial, "regra": regra.texto, "metrica": regra.metrica,
+                                    "valor": valor, "limite": regra.limite, "ts": sample.timestamp, "acoes": regra.acoes})
+            self.disparados += len(alertas)
+        for alerta in alertas:
+            self._executar_acoes(alerta)
+        return alertas
+
+    def _executar_acoes(self, alerta):
+        if "log" in alerta["acoes"] and self.log_path:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({k: v for k, v in alerta.items() if k != "acoes"}, ensure_ascii=False) + "\n")
+        if "webhook" in alerta["acoes"] and self.webhook_url:
+            # Em outra thread para não atrasar a coleta se o endpoint demorar
+            threading.Thread(target=self._enviar_webhook, args=(alerta,), daemon=True).start()
+        if "ui" in alerta["acoes"] and self.callback:
+            self.callback(alerta)
+
+    def _enviar_webhook(self, alerta):
+        try:
+            requests.post(self.webhook_url, json={k: v for k, v in alerta.items() if k != "acoes"}, timeout=3)
+        except Exception as e:
+            print(f"Erro ao enviar alerta para o webhook: {e}")
+
+def formatar_alerta(alerta):
+    dispositivo = f"[{alerta['serial']}] " if alerta["serial"] else ""
+    return f"{dispositivo}Alerta: {alerta['regra']} (valor atual {alerta['valor']:.1f})"
+
+FROTA_MAX_PARALELO = 8
+FROTA_CAPACIDADE = 2 * 3600
+FROTA_REDESCOBRIR_SEGUNDOS = 10
+FROTA_INTERVALO = 2.0
+
+class FleetMonitor:
+    """Amostra vários dispositivos a partir de um único agendador, com paralelismo limitado.
+
+    A cada tick, cada dispositivo recebe no máximo uma chamada sample() (um 'adb shell');
+    dispositivos cuja amostra anterior ainda não voltou são pulados em vez de acumular fila.
+    """
+    def __init__(self, adb_path, max_workers=FROTA_MAX_PARALELO, interval=FROTA_INTERVALO, capacity=FROTA_CAPACIDADE, seriais=None, alertas=None):
+        self.adb_path = adb_path
+        self.alertas = alertas
+        self.max_workers = max_workers
+        self.interval = interval
+        self.capacity = capacity
+        self.seriais_fixos = seriais
+        self.monitores = {}
+        self.historicos = {}
+        self.ultimas = {}
+        self.falhas = {}
+        self.pulos = 0
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+        self._ultima_descoberta = 0
+
+    def atualizar_dispositivos(self):
+        seriais = self.seriais_fixos or listar_dispositivos(self.adb_path)
+        with self._lock:
+            for serial in seriais:
+                if serial not in self.monitores:
+                    self.monitores[serial] = DeviceMonitor(self.adb_path, serial)
+                    self.monitores[serial].alertas = self.alertas
+                    self.historicos[serial] = MonitorHistory(capacity=self.capacity)
+                    self.falhas[serial] = 0
+            for serial in set(self.monitores) - set(seriais):
+                # Mantém o histórico de quem desconectou, mas para de amostrar e deixa de reportar a última amostra
+                self.monitores.pop(serial)
+                self.ultimas.pop(serial, None)
+                self._em_andamento.pop(serial, None)
+        self._ultima_descoberta = time.time()
+        return seriais
+
+    def _amostrar(self, serial, monitor):
+        sample = monitor.sample()
+        with self._lock:
+            # Desconectado enquanto a amostra estava em andamento: não recria o cartão que acabou de sair
+            if self.monitores.get(serial) is not monitor:
+                return serial, None
+            if sample is None:
+                self.falhas[serial] = self.falhas.get(serial, 0) + 1
+            else:
+                self.falhas[serial] = 0
+                self.ultimas[serial] = sample
+                self.historicos[serial].append(sample)
+        return serial, sample
+
+    def run(self, stop_event, callback=None):
+        """Laço do agendador; chama callback(amostras_do_tick) ao fim de cada tick"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while not stop_event.is_set():
+                inicio = time.time()
+                if not self.monitores or inicio - self._ultima_descoberta >= FROTA_REDESCOBRIR_SEGUNDOS:
+                    self.atualizar_dispositivos()
+                for serial, monitor in list(self.monitores.items()):
+                    if serial in self._em_andamento and not self._em_andamento[serial].done():
+                        self.pulos += 1
+                        continue
+                    self._em_andamento[serial] = executor.submit(self._amostrar, serial, monitor)
+                # Espera as amostras deste tick até o fim do intervalo; as lentas entram no próximo
+                pendentes = [f for f in self._em_andamento.values() if not f.done()]
+                if pendentes:
+                    wait(pendentes, timeout=max(self.interval - (time.time() - inicio), 0))
+                if callback:
+                    # Cópia sob o lock, callback fora dele: uma interface lenta não trava as amostras em andamento
+                    with self._lock:
+                        ultimas = dict(self.ultimas)
+                    callback(ultimas)
+                stop_event.wait(max(self.interval - (time.time() - inicio), 0))
+
+    def resumo(self, serial, seconds=None):
+        historico = self.historicos[serial]
+        return {metrica: historico[metrica].stats(seconds) for metrica in historico.series}
+
+def formatar_taxa(kbs):
+    return f"{kbs / 1024:.1f} MB/s" if kbs >= 1024 else f"{kbs:.0f} KB/s"
+
+def descrever_throttling(flags):
+    motivos = []
+    if flags & THROTTLE_CPU_LIMITADA:
+        motivos.append("frequência máxima da CPU reduzida")
+    if flags & THROTTLE_CPU_TETO:
+        motivos.append("teto da CPU abaixo do máximo do hardware")
+    if flags & THROTTLE_RESFRIAMENTO:
+        motivos.append("resfriamento ativo")
+    if flags & THROTTLE_TEMPERATURA:
+        motivos.append(f"temperatura acima de {TEMPERATURA_LIMITE:.0f}°C")
+    return ", ".join(motivos)
+
+def formatar_termico(amostra):
+    """Texto curto com temperatura, GPU, clusters e bateria, ex.: '41.2°C • GPU 23% • policy0 1.80/1.80GHz • -350 mA 4.12 V'"""
+    partes = []
+    if amostra.temp_max:
+        partes.append(f"{amostra.temp_max:.1f}°C")
+    if amostra.gpu_load:
+        partes.append(f"GPU {amostra.gpu_load:.0f}%")
+    for nome, cluster in sorted(amostra.cpu_clusters.items()):
+        partes.append(f"{nome} {cluster['cur'] / 1e6:.2f}/{cluster['max'] / 1e6:.2f}GHz")
+    if amostra.battery_voltage_mv:
+        partes.append(f"{amostra.battery_current_ma:+.0f} mA {amostra.battery_voltage_mv / 1000:.2f} V {amostra.battery_temp:.1f}°C")
+    if amostra.throttling:
+        partes.append(f"THROTTLING ({descrever_throttling(amostra.throttling)})")
+    return " • ".join(partes)
+
+# Logcat: a leitura do adb roda em uma thread e só enfileira; a interface drena em lotes por quadro
+LOGCAT_BUFFER_MAX = 5000
+LOGCAT_QUADROS_POR_SEGUNDO = 10
+
+# 'logcat -B': cada registro é um logger_entry (len, hdr_size, pid, tid, sec, nsec[, lid[, uid]])
+# seguido do payload "<prioridade><tag>\0<mensagem>\0". hdr_size 0 é o formato v1 (20 bytes).
+LOGGER_ENTRY = struct.Struct("<HHiIII")
+LOGGER_ENTRY_V1_TAMANHO = 20
+PRIORIDADES_LOG = "??VDIWEFS"
+
+@dataclass
+class LogEntry:
+    timestamp: float
+    pid: int
+    tid: int
+    prioridade: str
+    tag: str
+    mensagem: str
+    uid: int = -1
+    serial: str = ""
+
+    def formatar(self):
+        return f"{time.strftime('%m-%d %H:%M:%S', time.localtime(self.timestamp))}.{int(self.timestamp * 1000) % 1000:03d} {self.pid:5d} {self.tid:5d} {self.prioridade} {self.tag}: {self.mensagem}"
+
+    def chave(self):
+        """Identidade para agrupar repetições: mesmo processo, prioridade, tag e mensagem"""
+        return (self.pid, self.prioridade, self.tag, self.mensagem)
+
+    def as_dict(self):
+        return asdict(self)
+
+def ler_entradas_binarias(stream):
+    """Gera LogEntry a partir da saída binária de 'logcat -B' (arquivo aberto em modo binário)"""
+    while True:
+        cabecalho = stream.read(LOGGER_ENTRY_V1_TAMANHO)
+        if len(cabecalho) < LOGGER_ENTRY_V1_TAMANHO:
+            return
+        tamanho, tamanho_cabecalho, pid, tid, sec, nsec = LOGGER_ENTRY.unpack(cabecalho)
+        extra = stream.read(tamanho_cabecalho - LOGGER_ENTRY_V1_TAMANHO) if tamanho_cabecalho > LOGGER_ENTRY_V1_TAMANHO else b""
+        payload = stream.read(tamanho)
+        if len(payload) < tamanho:
+            return
+        uid = struct.unpack_from("<I", extra, 4)[0] if len(extra) >= 8 else -1
+        fim_tag = payload.find(b"\0", 1)
+        if fim_tag < 0:
+            fim_tag = len(payload)
+        prioridade = payload[0] if payload else 0
+        yield LogEntry(
+            sec + nsec / 1e9, pid, tid,
+            PRIORIDADES_LOG[prioridade] if prioridade < len(PRIORIDADES_LOG) else "?",
+            payload[1:fim_tag].decode("utf-8", "replace"),
+            payload[fim_tag + 1:].rstrip(b"\0\n").decode("utf-8", "replace"),
+            uid,
+        )
+
+# Buffers e PID são filtrados pelo próprio logcat no dispositivo: só o que passa cruza o USB. Já TAG:PRIORIDADE
+# e -e só valem na formatação em texto, que o 'logcat -B' pula; esses dois são conferidos no host, em cada LogEntry
+NIVEIS_FILTRO_LOG = "VDIWEFS"
+# 'events' (e 'all', que o inclui) traz payloads binários de tags numéricas, que o leitor não decodifica
+LOGCAT_BUFFERS = ("main", "system", "crash", "radio", "kernel")
+
+@dataclass
+class LogcatFiltro:
+    buffers: list = field(default_factory=list)
+    specs: list = field(default_factory=list)
+    pid: int = None
+    pacote: str = ""
+    regex: str = ""
+
+    @classmethod
+    def from_texto(cls, buffers="", specs="", processo="", regex=""):
+        """Campos como digitados na interface: 'main,crash', 'ActivityManager:I *:S', PID ou pacote"""
+        processo = processo.strip()
+        return cls(
+            [b for b in re.split(r"[,\s]+", buffers) if b], specs.split(),
+            int(processo) if processo.isdigit() else None,
+            "" if processo.isdigit() else processo, regex.strip(),
+        )
+
+    def validar(self):
+        for buffer in self.buffers:
+            if buffer not in LOGCAT_BUFFERS:
+                raise ValueError(f"Buffer de log inválido: {buffer} (opções: {', '.join(LOGCAT_BUFFERS)})")
+        for spec in self.specs:
+            if not re.fullmatch(r"[^\s:]+:[VDIWEFS*]", spec):
+                raise ValueError(f"Filtro inválido: '{spec}' (esperado TAG:PRIORIDADE, ex.: ActivityManager:I ou *:S)")
+        if self.regex:
+            try:
+                re.compile(self.regex)
+            except re.error as e:
+                raise ValueError(f"Expressão regular inválida: {e}")
+
+    def opcoes(self, adb_cmd):
+        """Argumentos para 'logcat'; resolve o pacote para o PID atual no dispositivo"""
+        self.validar()
+        opcoes = [opcao for buffer in self.buffers for opcao in ("-b", buffer)]
+        pid = self.pid
+        if self.pacote:
+            pid = pid_do_pacote(adb_cmd, self.pacote)
+            if pid is None:
+                raise ValueError(f"O pacote {self.pacote} não está em execução")
+        if pid:
+            opcoes.append(f"--pid={pid}")
+        return opcoes
+
+    @property
+    def no_host(self):
+        """Há filtros que só aceita() aplica (o dispositivo manda tudo do buffer/PID escolhido)"""
+        return bool(self.specs or self.regex)
+
+    def aceita(self, entrada):
+        """TAG:PRIORIDADE (a última regra de cada tag vale; '*' é o padrão) e a expressão regular na mensagem"""
+        if self.specs:
+            minimos, padrao = self._minimos
+            if max(NIVEIS_FILTRO_LOG.find(entrada.prioridade), 0) < minimos.get(entrada.tag, padrao):
+                return False
+        return not self.regex or self._regex.search(entrada.mensagem) is not None
+
+    @cached_property
+    def _minimos(self):
+        minimos, padrao = {}, 0
+        for spec in self.specs:
+            tag, _, nivel = spec.rpartition(":")
+            indice = 0 if nivel == "*" else NIVEIS_FILTRO_LOG.index(nivel)
+            if tag == "*":
+                padrao = indice
+            else:
+                minimos[tag] = indice
+        return minimos, padrao
+
+    @cached_property
+    def _regex(self):
+        return re.compile(self.regex)
+
+    def __bool__(self):
+        return bool(self.buffers or self.specs or self.pid or self.pacote or self.regex)
+
+def pid_do_pacote(adb_cmd, pacote):
+    try:
+        result = subprocess.run(adb_cmd + ["shell", "pidof", "-s", pacote], capture_output=True, text=True, timeout=5)
+    except subprocess.TimeoutExpired:
+        return None
+    pid = result.stdout.strip()
+    return int(pid) if pid.isdigit() else None
+
+def abrir_logcat(adb_cmd, opcoes=()):
+    # exec-out evita o pty do 'adb shell', que trocaria \n por \r\n no meio dos registros binários
+    return subprocess.Popen(adb_cmd + ["exec-out", "logcat", "-B", *opcoes], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+def erro_logcat(process):
+    """Mensagem do stderr quando o logcat saiu sozinho com erro (buffer não suportado, regex inválida), senão None"""
+    try:
+        codigo = process.wait(timeout=2)
+    except subprocess.TimeoutExpired:
+        return None
+    if codigo == 0:
+        return None
+    mensagem = process.stderr.read().decode("utf-8", "replace").strip() if process.stderr else ""
+    return mensagem or f"logcat encerrou com código {codigo}"
+
+class LogcatBuffer:
+    """Fila limitada entre o leitor do logcat e a interface.
+
+    Entradas consecutivas com a mesma chave viram uma só com contador; quando a fila enche,
+    as mais antigas são descartadas e contadas.
+    """
+    def __init__(self, capacidade=LOGCAT_BUFFER_MAX):
+        self._fila = deque(maxlen=capacidade)
+        self._lock = threading.Lock()
+        self.recebidas = 0
+        self.descartadas = 0
+        self.agrupadas = 0
+
+    def __len__(self):
+        return len(self._fila)
+
+    def append(self, entrada, chave=None, repeticoes=1):
+        chave = entrada if chave is None else chave
+        with self._lock:
+            self.recebidas += repeticoes
+            if self._fila and self._fila[-1][2] == chave:
+                self._fila[-1][1] += repeticoes
+                self.agrupadas += repeticoes
+                return
+            if len(self._fila) == self._fila.maxlen:
+                self.descartadas += self._fila[0][1]
+            self.agrupadas += repeticoes - 1
+            self._fila.append([entrada, repeticoes, chave])
+
+    def drenar(self, maximo=None):
+        """Retira até 'maximo' pares (entrada, repetições); o excedente mais antigo conta como descartado"""
+        with self._lock:
+            entradas = list(self._fila)
+            self._fila.clear()
+            if maximo is not None and len(entradas) > maximo:
+                self.descartadas += sum(n for _, n, _ in entradas[:-maximo])
+                entradas = entradas[-maximo:]
+        return [(entrada, n) for entrada, n, _ in entradas]
+
+    def estatisticas(self):
+        with self._lock:
+            return {"recebidas": self.recebidas, "descartadas": self.descartadas, "agrupadas": self.agrupadas, "pendentes": len(self._fila)}
+
+class LogcatSession:
+    """Processo 'adb logcat -B' lido por uma thread própria que alimenta um LogcatBuffer com LogEntry.
+
+    Com 'captura' (LogcatCapture), toda entrada também é gravada em disco; stop() fecha a captura.
+    Com 'indice' (LogIndex), toda entrada fica pesquisável, inclusive as que a interface não chegou a mostrar.
+    Com 'volume' (LogVolumeStats), toda entrada entra nos contadores por tag, PID e prioridade.
+    """
+    def __init__(self, adb_path, serial=None, capacidade=LOGCAT_BUFFER_MAX, filtro=None, captura=None, indice=None, volume=None):
+        self.adb_cmd = comando_adb(adb_path, serial)
+        self.serial = serial
+        self.filtro = filtro or LogcatFiltro()
+        self.buffer = LogcatBuffer(capacidade)
+        self.captura = captura
+        self.indice = indice
+        self.volume = volume
+        # Motivo, vindo do stderr, quando o logcat encerrou sozinho com erro
+        self.erro = None
+        self._process = None
+        self._thread = None
+
+    @property
+    def ativo(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        opcoes = self.filtro.opcoes(self.adb_cmd)
+        # Só o processo anterior é encerrado: a captura continua aberta para esta leitura
+        self._encerrar_leitura()
+        self.erro = None
+        self._process = abrir_logcat(self.adb_cmd, opcoes)
+        self._thread = threading.Thread(target=self._ler, args=(self._process,), daemon=True)
+        self._thread.start()
+
+    def _ler(self, process):
+        try:
+            for entrada in ler_entradas_binarias(process.stdout):
+                if not self.filtro.aceita(entrada):
+                    continue
+                if self.captura:
+                    self.captura.append(entrada)
+                if self.indice is not None:
+                    self.indice.append(entrada)
+                if self.volume is not None:
+                    self.volume.append(entrada)
+                self.buffer.append(entrada, entrada.chave())
+        except (OSError, ValueError):
+            pass
+        # stop() zera _process antes de encerrar: se ainda é este processo, ele saiu por conta própria
+        if self._process is process:
+            self.erro = erro_logcat(process)
+
+    def _encerrar_leitura(self):
+        process, self._process = self._process, None
+        if process:
+            DeviceMonitor._encerrar_processo(process)
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def stop(self):
+        self._encerrar_leitura()
+        if self.captura:
+            self.captura.close()
+
+def medir_offset_relogio(adb_cmd, tentativas=3):
+    """Diferença relógio do dispositivo - relógio do host, em segundos, da leitura com menor ida e volta.
+
+    None quando nenhuma tentativa funcionou: o offset é desconhecido, não zero.
+    """
+    melhor = None
+    for _ in range(tentativas):
+        inicio = time.time()
+        try:
+            result = subprocess.run(adb_cmd + ["shell", "date", "+%s.%N"], capture_output=True, text=True, timeout=5)
+        except subprocess.TimeoutExpired:
+            continue
+        fim = time.time()
+        try:
+            # Sem suporte a %N o date devolve "1700000000.N"; fica só a parte inteira
+            valor = result.stdout.strip()
+            dispositivo = float(valor) if valor.replace(".", "", 1).isdigit() else float(valor.split(".")[0])
+        except ValueError:
+            continue
+        if melhor is None or fim - inicio < melhor[0]:
+            melhor = (fim - inicio, dispositivo - (inicio + fim) / 2)
+    return melhor[1] if melhor else None
+
+def formatar_offset_relogio(serial, offset, casas=2):
+    return f"{serial} {offset:+.{casas}f}s" if offset is not None else f"{serial} desconhecido"
+
+# Volume do log por tag, processo e prioridade. Tags e PIDs podem ser milhares: o top-k usa
+# Space-Saving (memória fixa, contagem com erro máximo conhecido) e qualquer chave pode ser
+# estimada pelo Count-Min. Ao vivo, as taxas usam duas janelas (anterior completa + atual ponderada)
+# no relógio do host, tanto ao contar quanto ao consultar; numa captura, são a média do período gravado.
+VOLUME_TOP_K = 100
+VOLUME_JANELA_SEGUNDOS = 10.0
+# Menor intervalo usado como divisor no começo da contagem, para a primeira linha não virar um pico absurdo
+VOLUME_TAXA_MINIMO_SEGUNDOS = 1.0
+
+class SpaceSaving:
+    """Top-k aproximado: guarda no máximo k chaves; a nova chave herda a contagem da menor que sai"""
+    def __init__(self, k=VOLUME_TOP_K):
+        self.k = k
+        # chave -> [linhas, bytes, erro em linhas]
+        self.contadores = {}
+        # Heap (linhas quando inserida, chave), uma por chave; só é corrigida na hora de escolher quem sai
+        self._heap = []
+
+    def add(self, chave, linhas=1, tamanho=0):
+        contador = self.contadores.get(chave)
+        if contador is None:
+            if len(self.contadores) >= self.k:
+                while self._heap[0][0] != self.contadores[self._heap[0][1]][0]:
+                    heapq.heapreplace(self._heap, (self.contadores[self._heap[0][1]][0], self._heap[0][1]))
+                _, menor = heapq.heappop(self._heap)
+                base_linhas, base_bytes, _ = self.contadores.pop(menor)
+                contador = self.contadores[chave] = [base_linhas, base_bytes, base_linhas]
+            else:
+                contador = self.contadores[chave] = [0, 0, 0]
+            heapq.heappush(self._heap, (contador[0] + linhas, chave))
+        contador[0] += linhas
+        contador[1] += tamanho
+
+    def top(self, n=10, por="linhas"):
+        coluna = 1 if por == "bytes" else 0
+        return sorted(self.contadores.items(), key=lambda item: item[1][coluna], reverse=True)[:n]
+
+class CountMinSketch:
+    def __init__(self, largura=2048, profundidade=4):
+        self.largura = largura
+        self.linhas = [array("Q", bytes(8 * largura)) for _ in range(profundidade)]
+
+    def add(self, chave, quantidade=1):
+        for i, linha in enumerate(self.linhas):
+            linha[hash((i, chave)) % self.largura] += quantidade
+
+    def estimar(self, chave):
+        return min(linha[hash((i, chave)) % self.largura] for i, linha in enumerate(self.linhas))
+
+class _JanelaVolume:
+    def __init__(self, inicio, k):
+        self.inicio = inicio
+        self.linhas = self.bytes = 0
+        self.prioridades = {}
+        self.tags = SpaceSaving(k)
+        self.pids = SpaceSaving(k)
+
+def contagem_janela(janela, dimensao, chave):
+    if janela is None:
+        return (0, 0)
+    if dimensao == "geral":
+        return (janela.linhas, janela.bytes)
+    contadores = getattr(janela, dimensao)
+    return (contadores if dimensao == "prioridades" else contadores.contadores).get(chave, (0, 0))
+
+class LogVolumeStats:
+    """Contadores de linhas e bytes (totais e por segundo) por tag, PID e prioridade, com memória limitada"""
+    def __init__(self, janela=VOLUME_JANELA_SEGUNDOS, k=VOLUME_TOP_K):
+        self.janela = janela
+        self.k = k
+        self._lock = threading.Lock()
+        self.limpar()
+
+    def limpar(self, ao_vivo=True):
+        """Zera tudo; ao_vivo=False para alimentar com uma captura (taxas pela duração dela, não pelo relógio atual)"""
+        with self._lock:
+            self.ao_vivo = ao_vivo
+            self.linhas = self.bytes = 0
+            self._primeiro = self._ultimo = None
+            self.prioridades = {}
+            self.tags = SpaceSaving(self.k)
+            self.pids = SpaceSaving(self.k)
+            self.linhas_por_tag = CountMinSketch()
+            self._atual = self._anterior = None
+            self._inicio = None
+
+    def append(self, entrada, repeticoes=1):
+        # Tamanho aproximado no buffer do logd: cabeçalho v1 + prioridade + tag + mensagem + terminadores
+        tamanho = (LOGGER_ENTRY_V1_TAMANHO + 3 + len(entrada.tag) + len(entrada.mensagem)) * repeticoes
+        pid = f"{entrada.serial}:{entrada.pid}" if entrada.serial else entrada.pid
+        with self._lock:
+            if self.ao_vivo:
+                # Janelas no relógio do host, o mesmo usado em resumo(): o do aparelho pode estar adiantado ou atrasado
+                self._rotacionar(time.time())
+            else:
+                self._primeiro = entrada.timestamp if self._primeiro is None else min(self._primeiro, entrada.timestamp)
+                self._ultimo = entrada.timestamp if self._ultimo is None else max(self._ultimo, entrada.timestamp)
+                self._rotacionar(entrada.timestamp)
+            for alvo in (self, self._atual):
+                alvo.linhas += repeticoes
+                alvo.bytes += tamanho
+                prioridade = alvo.prioridades.setdefault(entrada.prioridade, [0, 0])
+                prioridade[0] += repeticoes
+                prioridade[1] += tamanho
+                alvo.tags.add(entrada.tag, repeticoes, tamanho)
+                alvo.pids.add(pid, repeticoes, tamanho)
+            self.linhas_por_tag.add(entrada.tag, repeticoes)
+
+    def _rotacionar(self, agora):
+        if self._atual is None:
+            self._inicio = agora
+            self._atual = _JanelaVolume(agora, self.k)
+        elif agora >= self._atual.inicio + self.janela:
+            # Com um intervalo sem log maior que a janela, a anterior fica vazia
+            salto = agora >= self._atual.inicio + 2 * self.janela
+            self._anterior = None if salto else self._atual
+            self._atual = _JanelaVolume(agora if salto else self._atual.inicio + self.janela, self.k)
+
+    def _taxa(self, atual, anterior, agora):
+        """Janela deslizante aproximada: a anterior pesa pela fração que ainda cabe na janela"""
+        if self._anterior:
+            peso = max(0.0, 1 - (agora - self._atual.inicio) / self.janela)
+            return (atual + anterior * peso) / self.janela
+        # Sem anterior: no começo da contagem só o tempo já observado vale; depois de um silêncio, a janela toda
+        return atual / min(self.janela, max(agora - self._inicio, VOLUME_TAXA_MINIMO_SEGUNDOS))
+
+    def resumo(self, n=10, agora=None):
+        """Totais e taxas; ao vivo, 'linhas_s'/'bytes_s' valem para a janela que termina em 'agora' (padrão: time.time())"""
+        with self._lock:
+            if self._atual is None:
+                return {"linhas": 0, "bytes": 0, "linhas_s": 0.0, "bytes_s": 0.0, "ao_vivo": self.ao_vivo, "prioridades": [], "tags": [], "pids": []}
+            if self.ao_vivo:
+                agora = agora if agora is not None else time.time()
+                # Sem entradas novas as janelas também avançam: depois de um pico a taxa cai em vez de congelar
+                self._rotacionar(agora)
+                anterior = self._anterior
+
+                def taxa(dimensao, chave, total):
+                    a, p = contagem_janela(self._atual, dimensao, chave), contagem_janela(anterior, dimensao, chave)
+                    return self._taxa(a[0], p[0], agora), self._taxa(a[1], p[1], agora)
+            else:
+                # Captura: média do período gravado, não a última janela (que não tem nada de "agora")
+                duracao = max(self._ultimo - self._primeiro, 1.0)
+
+                def taxa(dimensao, chave, total):
+                    return total[0] / duracao, total[1] / duracao
+
+            def taxas(dimensao, chave, linhas_total, bytes_total, erro=0):
+                linhas_s, bytes_s = taxa(dimensao, chave, (linhas_total, bytes_total))
+                return {
+                    "chave": chave, "linhas": linhas_total, "bytes": bytes_total, "erro": erro,
+                    "linhas_s": linhas_s, "bytes_s": bytes_s,
+                }
+
+            geral = taxas("geral", None, self.linhas, self.bytes)
+            return {
+                "linhas": self.linhas, "bytes": self.bytes,
+                "linhas_s": geral["linhas_s"], "bytes_s": geral["bytes_s"], "ao_vivo": self.ao_vivo,
+                "prioridades": [taxas("prioridades", p, l, b) for p, (l, b) in sorted(self.prioridades.items(), key=lambda i: -i[1][0])],
+                "tags": [taxas("tags", t, l, b, e) for t, (l, b, e) in self.tags.top(n)],
+                "pids": [taxas("pids", p, l, b, e) for p, (l, b, e) in self.pids.top(n)],
+            }
+
+    def estimar_tag(self, tag):
+        with self._lock:
+            return self.linhas_por_tag.estimar(tag)
+
+    def exportar(self, path, n=VOLUME_TOP_K):
+        """Grava o resumo em JSON ou, para .csv, uma linha por (dimensão, chave)"""
+        path = Path(path)
+        resumo = self.resumo(n)
+        if path.suffix.lower() != ".csv":
+            path.write_text(json.dumps(resumo, ensure_ascii=False, indent=2), encoding="utf-8")
+            return path
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(["dimensao", "chave", "linhas", "bytes", "linhas_s", "bytes_s", "erro"])
+            for dimensao in ("prioridades", "tags", "pids"):
+                for item in resumo[dimensao]:
+                    escritor.writerow([dimensao, item["chave"], item["linhas"], item["bytes"], f"{item['linhas_s']:.2f}", f"{item['bytes_s']:.0f}", item["erro"]])
+        return path
+
+# Vários dispositivos numa só visualização: cada um tem seu LogcatSession; a cada quadro as entradas
+# (já no relógio do host) até 'atraso' segundos atrás são combinadas por timestamp com heapq.merge
+LOGCAT_ATRASO_MESCLA = 0.5
+
+class MultiLogcatSession:
+    """Logcat de vários seriais mesclado por timestamp, com a mesma interface (buffer, ativo) do LogcatSession"""
+    def __init__(self, adb_path, seriais, capacidade=LOGCAT_BUFFER_MAX, filtro=None, indice=None, atraso=LOGCAT_ATRASO_MESCLA, volume=None):
+        self.sessoes = {serial: LogcatSession(adb_path, serial, capacidade, filtro) for serial in seriais}
+        self.buffer = LogcatBuffer(capacidade)
+        self.indice = indice
+        self.volume = volume
+        self.atraso = atraso
+        self.offsets = {}
+        self._pendentes = {serial: [] for serial in seriais}
+        self._parar = threading.Event()
+        self._thread = None
+
+    @property
+    def ativo(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def erro(self):
+        erros = [f"{serial}: {sessao.erro}" for serial, sessao in self.sessoes.items() if sessao.erro]
+        return "; ".join(erros) or None
+
+    def start(self):
+        self.stop()
+        with ThreadPoolExecutor(max_workers=len(self.sessoes) or 1) as executor:
+            self.offsets = dict(zip(self.sessoes, executor.map(medir_offset_relogio, [s.adb_cmd for s in self.sessoes.values()])))
+        for sessao in self.sessoes.values():
+            sessao.start()
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._mesclar_continuamente, daemon=True)
+        self._thread.start()
+
+    def _mesclar_continuamente(self):
+        while not self._parar.wait(1 / LOGCAT_QUADROS_POR_SEGUNDO):
+            encerradas = not any(sessao.ativo for sessao in self.sessoes.values())
+            self.mesclar(final=encerradas)
+            if encerradas:
+                return
+
+    def mesclar(self, final=False):
+        """Move para o buffer as entradas de todos os dispositivos anteriores ao corte, em ordem de tempo"""
+        corte = float("inf") if final else time.time() - self.atraso
+        fatias = []
+        for serial, sessao in self.sessoes.items():
+            pendentes = self._pendentes[serial]
+            for entrada, n in sessao.buffer.drenar():
+                # Offset desconhecido: sem correção, o horário do próprio aparelho é o melhor disponível
+                entrada.timestamp -= self.offsets.get(serial) or 0.0
+                entrada.serial = serial
+                pendentes.append((entrada.timestamp, entrada, n))
+            # Entre buffers do mesmo dispositivo a ordem é quase crescente; o sort é praticamente linear
+            pendentes.sort(key=lambda item: item[0])
+            i = bisect_left(pendentes, corte, key=lambda item: item[0])
+            fatias.append(pendentes[:i])
+            del pendentes[:i]
+        for _, entrada, n in heapq.merge(*fatias, key=lambda item: item[0]):
+            if self.indice is not None:
+                self.indice.append(entrada)
+            if self.volume is not None:
+                self.volume.append(entrada, n)
+            self.buffer.append(entrada, (entrada.serial, entrada.chave()), n)
+
+    def stop(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        for sessao in self.sessoes.values():
+            sessao.stop()
+
+# Captura contínua do logcat: segmentos seg-NNNNNN.gz com um membro gzip independente por bloco
+# de entradas (JSON por linha) e, ao lado, seg-NNNNNN.idx com (timestamp inicial, offset) de cada
+# bloco. Para ir a um instante basta um bisect no índice e descomprimir a partir daquele bloco.
+LOGCAT_INDICE = struct.Struct("<dQ")
+LOGCAT_BLOCO_ENTRADAS = 2000
+LOGCAT_BLOCO_SEGUNDOS = 2.0
+LOGCAT_SEGMENTO_BYTES = 16 * 1024 * 1024
+LOGCAT_MAX_SEGMENTOS = 64
+
+class LogcatCapture:
+    """Grava LogEntry em segmentos comprimidos com rotação por tamanho e índice de tempo"""
+    def __init__(self, diretorio, segmento_bytes=LOGCAT_SEGMENTO_BYTES, max_segmentos=LOGCAT_MAX_SEGMENTOS):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.segmento_bytes = segmento_bytes
+        self.max_segmentos = max_segmentos
+        self.entradas = 0
+        self._bloco = []
+        self._inicio_bloco = None
+        self._lock = threading.Lock()
+        existentes = segmentos_captura(self.diretorio)
+        self._numero = int(existentes[-1].stem.split("-")[1]) + 1 if existentes else 0
+        self._abrir_segmento()
+        # Com o log parado, append() não é chamado: o bloco pendente é gravado por tempo em outra thread
+        self._fechada = threading.Event()
+        threading.Thread(target=self._gravar_por_tempo, daemon=True).start()
+
+    def _abrir_segmento(self):
+        base = self.diretorio / f"seg-{self._numero:06d}"
+        self._dados = open(base.with_suffix(".gz"), "ab")
+        self._indice = open(base.with_suffix(".idx"), "ab")
+
+    def append(self, entrada):
+        with self._lock:
+            if self._dados is None:
+                return
+            if not self._bloco:
+                self._inicio_bloco = time.monotonic()
+            self._bloco.append(entrada)
+            self.entradas += 1
+            if len(self._bloco) >= LOGCAT_BLOCO_ENTRADAS or time.monotonic() - self._inicio_bloco >= LOGCAT_BLOCO_SEGUNDOS:
+                self._gravar_bloco()
+
+    def _gravar_por_tempo(self):
+        while not self._fechada.wait(LOGCAT_BLOCO_SEGUNDOS / 2):
+            with self._lock:
+                if self._dados is not None and self._bloco and time.monotonic() - self._inicio_bloco >= LOGCAT_BLOCO_SEGUNDOS:
+                    self._gravar_bloco()
+
+    def _gravar_bloco(self):
+        if not self._bloco:
+            return
+        texto = "".join(json.dumps(e.as_dict(), ensure_ascii=False) + "\n" for e in self._bloco)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: membro gzip completo
+        offset = self._dados.tell()
+        self._dados.write(compressor.compress(texto.encode("utf-8")) + compressor.flush())
+        self._dados.flush()
+        self._indice.write(LOGCAT_INDICE.pack(self._bloco[0].timestamp, offset))
+        self._indice.flush()
+        self._bloco = []
+        if self._dados.tell() >= self.segmento_bytes:
+            self._dados.close()
+            self._indice.close()
+            self._numero += 1
+            self._abrir_segmento()
+            for antigo in segmentos_captura(self.diretorio)[:-self.max_segmentos]:
+                antigo.unlink(missing_ok=True)
+                antigo.with_suffix(".idx").unlink(missing_ok=True)
+
+    def close(self):
+        self._fechada.set()
+        with self._lock:
+            if self._dados is None:
+                return
+            self._gravar_bloco()
+            vazio = self._dados.tell() == 0
+            self._dados.close()
+            self._indice.close()
+            if vazio:
+                Path(self._dados.name).unlink(missing_ok=True)
+                Path(self._indice.name).unlink(missing_ok=True)
+            self._dados = self._indice = None
+
+def segmentos_captura(diretorio):
+    return sorted(Path(diretorio).glob("seg-*.gz"))
+
+def caminho_captura_padrao(serial=None):
+    return diretorio_dados("logcat_captures") / f"{serial or 'dispositivo'}-{time.strftime('%Y%m%d-%H%M%S')}"
+
+def indice_captura(diretorio):
+    """[(timestamp inicial do bloco, segmento, offset)] de todos os blocos, em ordem"""
+    blocos = []
+    for segmento in segmentos_captura(diretorio):
+        indice = segmento.with_suffix(".idx")
+        dados = indice.read_bytes() if indice.exists() else b""
+        dados = dados[:len(dados) - len(dados) % LOGCAT_INDICE.size]
+        blocos += [(ts, segmento, offset) for ts, offset in LOGCAT_INDICE.iter_unpack(dados)]
+    return blocos
+
+def ler_captura(diretorio, desde=None, ate=None, limite=None, blocos=None):
+    """Gera LogEntry de uma captura a partir do instante 'desde', descomprimindo só dali em diante"""
+    blocos = indice_captura(diretorio) if blocos is None else blocos
+    if not blocos:
+        return
+    inicio = 0
+    if desde is not None:
+        inicio = max(bisect_left([ts for ts, _, _ in blocos], desde) - 1, 0)
+    lidas = 0
+    segmento_atual = None
+    for ts, segmento, offset in blocos[inicio:]:
+        if ate is not None and ts > ate:
+            return
+        if segmento == segmento_atual:
+            continue
+        # O GzipFile continua pelos membros seguintes, então cada segmento é aberto uma só vez
+        segmento_atual = segmento
+        with open(segmento, "rb") as f:
+            f.seek(offset)
+            try:
+                for linha in gzip.GzipFile(fileobj=f):
+                    entrada = LogEntry(**json.loads(linha))
+                    if desde is not None and entrada.timestamp < desde:
+                        continue
+                    if ate is not None and entrada.timestamp > ate:
+                        return
+                    yield entrada
+                    lidas += 1
+                    if limite is not None and lidas >= limite:
+                        return
+            except (EOFError, gzip.BadGzipFile, zlib.error, json.JSONDecodeError):
+                # Bloco final incompleto (captura interrompida): o que veio antes continua válido
+                continue
+
+# Busca no logcat: índice invertido incremental (tokens da mensagem, tag, pid e prioridade -> ids
+# das entradas em ordem crescente). Consultas: palavras, "frases", tag:X, pid:N, level>=W e -exclusão.
+TOKEN_LOG = re.compile(r"\w+")
+CONSULTA_LOG = re.compile(r'(-?)(?:(tag|pid|level|nivel)(:|>=|<=|>|<|=))?(?:"([^"]*)"|(\S+))', re.IGNORECASE)
+NIVEIS_LOG = "VDIWEF"
+# Cada entrada indexada custa ~500 bytes (registro compacto + listas de ids): ~250 MB no limite
+LOG_INDICE_MAX = 500_000
+# Varreduras sem lista de ids (só exclusões) soltam o lock a cada lote para não travar quem alimenta o índice
+LOG_BUSCA_LOTE = 20_000
+
+@dataclass
+class LogQuery:
+    palavras: list = field(default_factory=list)
+    frases: list = field(default_factory=list)
+    tags: list = field(default_factory=list)
+    pids: list = field(default_factory=list)
+    niveis: str = ""
+    excluidas: list = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, texto):
+        consulta = cls()
+        for negar, campo, operador, aspas, termo in CONSULTA_LOG.findall(texto):
+            valor = aspas or termo
+            campo = campo.lower()
+            if negar:
+                consulta.excluidas.append(valor.lower())
+            elif campo == "tag":
+                consulta.tags.append(valor)
+            elif campo == "pid":
+                if not valor.isdigit():
+                    raise ValueError(f"PID inválido na busca: {valor}")
+                consulta.pids.append(int(valor))
+            elif campo:
+                consulta.niveis = niveis_da_comparacao(operador, valor.upper()[:1])
+            elif aspas or not TOKEN_LOG.fullmatch(valor):
+                consulta.frases.append(valor.lower())
+            else:
+                consulta.palavras.append(valor.lower())
+        return consulta
+
+    def destaques(self):
+        return self.palavras + self.frases
+
+    def confere(self, prioridade, tag, mensagem):
+        """Critérios que as listas de ids não resolvem: prioridade, frases literais e exclusões"""
+        if self.niveis and prioridade not in self.niveis:
+            return False
+        mensagem = mensagem.lower() if self.frases or self.excluidas else ""
+        if not all(f in mensagem for f in self.frases):
+            return False
+        return not any(x in mensagem or x == tag.lower() for x in self.excluidas)
+
+    def aceita(self, entrada):
+        """O mesmo critério do LogIndex aplicado a uma entrada avulsa, para varrer uma captura sem indexar"""
+        tokens = set(TOKEN_LOG.findall(entrada.mensagem.lower()))
+        if not all(t in tokens for t in self.palavras + [t for f in self.frases for t in TOKEN_LOG.findall(f)]):
+            return False
+        if not all(t.lower() == entrada.tag.lower() for t in self.tags) or not all(p == entrada.pid for p in self.pids):
+            return False
+        return self.confere(entrada.prioridade, entrada.tag, entrada.mensagem)
+
+def niveis_da_comparacao(operador, nivel):
+    if nivel not in NIVEIS_LOG:
+        raise ValueError(f"Prioridade inválida na busca: {nivel} (use {', '.join(NIVEIS_LOG)})")
+    i = NIVEIS_LOG.index(nivel)
+    return {">=": NIVEIS_LOG[i:], ">": NIVEIS_LOG[i + 1:], "<=": NIVEIS_LOG[:i + 1], "<": NIVEIS_LOG[:i]}.get(operador, nivel)
+
+class LogIndex:
+    """Índice invertido das entradas do logcat, alimentado uma entrada por vez.
+
+    Cada entrada fica como uma tupla (campos do LogEntry, tag internada) e só vira LogEntry nos resultados.
+    Acima da capacidade, o quarto mais antigo sai e as listas de ids são só aparadas (sem reindexar).
+    """
+    def __init__(self, capacidade=LOG_INDICE_MAX):
+        self.capacidade = capacidade
+        self._lock = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        with self._lock:
+            self.entradas = []
+            self._base = 0
+            self._tokens, self._tags, self._pids, self._niveis = {}, {}, {}, {}
+
+    def __len__(self):
+        return len(self.entradas)
+
+    @staticmethod
+    def _postar(indice, chave, id_entrada):
+        lista = indice.get(chave)
+        if lista is None:
+            lista = indice[chave] = array("I")
+        lista.append(id_entrada)
+
+    def append(self, entrada):
+        with self._lock:
+            if len(self.entradas) >= self.capacidade:
+                self._descartar_antigas()
+            id_entrada = self._base + len(self.entradas)
+            self.entradas.append((entrada.timestamp, entrada.pid, entrada.tid, entrada.prioridade,
+                                  sys.intern(entrada.tag), entrada.mensagem, entrada.uid, entrada.serial))
+            self._postar(self._tags, entrada.tag.lower(), id_entrada)
+            self._postar(self._pids, entrada.pid, id_entrada)
+            self._postar(self._niveis, entrada.prioridade, id_entrada)
+            for token in set(TOKEN_LOG.findall(entrada.mensagem.lower())):
+                self._postar(self._tokens, token, id_entrada)
+
+    def _descartar_antigas(self):
+        quantidade = len(self.entradas) // 4
+        del self.entradas[:quantidade]
+        self._base += quantidade
+        for indice in (self._tokens, self._tags, self._pids, self._niveis):
+            for chave in list(indice):
+                lista = indice[chave]
+                del lista[:bisect_left(lista, self._base)]
+                if not lista:
+                    del indice[chave]
+
+    def buscar(self, consulta, limite=500):
+        """Entradas que atendem à consulta (texto ou LogQuery), as mais recentes, em ordem cronológica"""
+        if not isinstance(consulta, LogQuery):
+            consulta = LogQuery.parse(consulta)
+        with self._lock:
+            listas = [self._tokens.get(p, ()) for p in consulta.palavras]
+            listas += [self._tokens.get(t, ()) for f in consulta.frases for t in TOKEN_LOG.findall(f)]
+            listas += [self._tags.get(t.lower(), ()) for t in consulta.tags]
+            listas += [self._pids.get(p, ()) for p in consulta.pids]
+            if listas:
+                # Percorre a lista mais curta e confere as demais por busca binária
+                listas.sort(key=len)
+                resultados = self._varrer(reversed(listas[0]), listas[1:], consulta, limite)
+            elif consulta.niveis:
+                # Só prioridade: os candidatos são a união das listas dos níveis pedidos, do mais recente para trás
+                niveis = [reversed(self._niveis[n]) for n in consulta.niveis if n in self._niveis]
+                resultados = self._varrer(heapq.merge(*niveis, reverse=True), [], consulta, limite)
+            else:
+                resultados, fim = [], self._base + len(self.entradas)
+        if not listas and not consulta.niveis:
+            while len(resultados) < limite:
+                with self._lock:
+                    inicio = max(fim - LOG_BUSCA_LOTE, self._base)
+                    if inicio >= fim:
+                        break
+                    resultados += self._varrer(range(fim - 1, inicio - 1, -1), [], consulta, limite - len(resultados))
+                fim = inicio
+        resultados.reverse()
+        return [LogEntry(*registro) for registro in resultados]
+
+    def _varrer(self, candidatos, outras, consulta, limite):
+        # Chamado com o lock: ids do mais recente para o mais antigo, até 'limite' registros aceitos
+        resultados = []
+        for id_entrada in candidatos:
+            if id_entrada < self._base:
+                break
+            if not all(contem_ordenado(lista, id_entrada) for lista in outras):
+                continue
+            registro = self.entradas[id_entrada - self._base]
+            if not consulta.confere(registro[3], registro[4], registro[5]):
+                continue
+            resultados.append(registro)
+            if len(resultados) >= limite:
+                break
+        return resultados
+
+def contem_ordenado(lista, valor):
+    i = bisect_left(lista, valor)
+    return i < len(lista) and lista[i] == valor
+
+def dividir_destaques(texto, termos):
+    """[(trecho, destacado)] marcando cada ocorrência dos termos, sem diferenciar maiúsculas"""
+    termos = [t for t in termos if t]
+    if not termos:
+        return [(texto, False)]
+    padrao = re.compile("|".join(re.escape(t) for t in sorted(termos, key=len, reverse=True)), re.IGNORECASE)
+    partes, fim = [], 0
+    for m in padrao.finditer(texto):
+        if m.start() > fim:
+            partes.append((texto[fim:m.start()], False))
+        partes.append((m.group(), True))
+        fim = m.end()
+    if fim < len(texto):
+        partes.append((texto[fim:], False))
+    return partes
+
 # Funções utilitárias
 def executar_comando_adb_simples(adb_path, comando, timeout=30):
     """Executa um comando ADB simples e retorna o resultado"""
@@ -642,6 +2808,113 @@ def executar_comando_adb_simples(adb_path, comando, timeout=30):
     except Exception as e:
         return False, "", str(e)
 
+INSTALL_CHUNK_SIZE = 1024 * 1024
+INSTALL_PROGRESS_INTERVAL = 0.25
+
+def _dados_progresso(fase, enviados, total, inicio):
+    decorrido = max(time.time() - inicio, 1e-6)
+    mb_s = enviados / decorrido / 1048576
+    restante = (total - enviados) / (mb_s * 1048576) if mb_s > 0 and total else None
+    return {
+        "fase": fase,
+        "bytes_enviados": enviados,
+        "bytes_total": total,
+        "mb_s": mb_s,
+        "eta": restante,
+        "decorrido": decorrido,
+    }
+
+def formatar_progresso(progresso):
+    """Texto curto para exibir o progresso de uma instalação"""
+    if progresso["fase"] == "transferindo":
+        eta = f"{progresso['eta']:.0f}s" if progresso["eta"] is not None else "--"
+        return (f"{progresso['bytes_enviados'] / 1048576:.1f} / {progresso['bytes_total'] / 1048576:.1f} MB"
+                f" — {progresso['mb_s']:.1f} MB/s — ETA {eta}")
+    if progresso["fase"] == "instalando":
+        return f"Instalando no dispositivo... ({progresso['mb_s']:.1f} MB/s na transferência)"
+    if progresso["fase"] == "concluido":
+        return f"Concluído — {progresso['mb_s']:.1f} MB/s"
+    return "Verificando se o APK já está instalado..."
+
+INSTALL_TIMEOUT_MSG = "Timeout na instalação"
+
+def _streaming_nao_suportado(stdout, stderr):
+    # O package manager respondeu (Success/Failure) ou o tempo acabou: repetir com 'adb install' não ajuda
+    return "Success" not in stdout and "Failure" not in stdout and stderr != INSTALL_TIMEOUT_MSG
+
+def _instalar_apk_streaming(adb_path, apk_path, progresso=None, timeout=300, serial=None):
+    """Envia o APK pelo stdin do 'cmd package install -S', medindo bytes enviados e vazão"""
+    total = os.path.getsize(apk_path)
+    inicio = time.time()
+    ultimo_relatorio = 0
+    process = subprocess.Popen(
+        comando_adb(adb_path, serial) + ["exec-in", "cmd", "package", "install", "-r", "-S", str(total)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    enviados = 0
+    try:
+        with open(apk_path, "rb") as f:
+            while True:
+                chunk = f.read(INSTALL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                process.stdin.write(chunk)
+                enviados += len(chunk)
+                if progresso and time.time() - ultimo_relatorio >= INSTALL_PROGRESS_INTERVAL:
+                    ultimo_relatorio = time.time()
+                    progresso(_dados_progresso("transferindo", enviados, total, inicio))
+    except (BrokenPipeError, OSError):
+        pass
+
+    dados = _dados_progresso("instalando", enviados, total, inicio)
+    if progresso:
+        progresso(dados)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        return False, "", INSTALL_TIMEOUT_MSG, dados
+    return b"Success" in stdout, stdout.decode(errors="ignore"), stderr.decode(errors="ignore"), dados
+
+def instalar_apk(adb_path, apk_path, app_manager=None, pular_se_instalado=True, timeout=300, progresso=None, serial=None):
+    """Instala um APK, pulando a transferência quando a mesma versão assinada já está no dispositivo.
+    'progresso' recebe dicts com fase, bytes enviados, MB/s e ETA. Retorna (sucesso, saida, erro, pulado, estatisticas)"""
+    if app_manager is None:
+        app_manager = AppManager(adb_path, serial)
+    serial = serial or app_manager.serial
+
+    total = os.path.getsize(apk_path) if os.path.exists(apk_path) else 0
+    inicio_total = time.time()
+    if progresso:
+        progresso(_dados_progresso("verificando", 0, total, inicio_total))
+    if pular_se_instalado:
+        ja_instalado, motivo = app_manager.is_apk_already_installed(apk_path)
+        if ja_instalado:
+            print(f"⏭️  Pulando {os.path.basename(apk_path)}: {motivo}")
+            return True, motivo, "", True, None
+
+    try:
+        success, stdout, stderr, estatisticas = _instalar_apk_streaming(adb_path, apk_path, progresso, timeout, serial)
+    except Exception as e:
+        success, stdout, stderr, estatisticas = False, "", str(e), None
+
+    # Dispositivos antigos (sem 'cmd package'/exec-in) caem no 'adb install' tradicional
+    if not success and _streaming_nao_suportado(stdout, stderr):
+        inicio = time.time()
+        if progresso:
+            progresso(_dados_progresso("instalando", 0, total, inicio))
+        success, stdout, stderr = executar_comando_adb_simples(adb_path, comando_adb(adb_path, serial)[1:] + ["install", "-r", apk_path], timeout=timeout)
+        estatisticas = _dados_progresso("instalando", total, total, inicio)
+
+    app_manager.invalidate_package_inventory()
+    if estatisticas:
+        estatisticas = dict(estatisticas, fase="concluido", duracao=time.time() - inicio_total)
+        print(f"📊 {os.path.basename(apk_path)}: {total / 1048576:.1f} MB a {estatisticas['mb_s']:.1f} MB/s")
+    if progresso:
+        progresso(estatisticas or _dados_progresso("concluido", total, total, time.time()))
+    return success, stdout, stderr, False, estatisticas
+
 def criar_script_config_ssh():
     """Cria o script de configuração SSH para o Termux"""
     script_content = """#!/data/data/com.termux/files/usr/bin/bash
@@ -712,68 +2985,426 @@ read -p "Pressione Enter para continuar..."
         print(f"❌ Erro ao criar script: {e}")
         return False
 
-def processar_script_json(arquivo_json, adb_path):
+class ScriptJournal:
+    """Diário append-only dos passos concluídos de um script, por dispositivo, para retomar execuções interrompidas"""
+
+    def __init__(self, script_hash, journal_dir=None):
+        self.journal_dir = Path(journal_dir) if journal_dir else diretorio_dados("script_journal")
+        self.path = self.journal_dir / f"{script_hash}.jsonl"
+        self._lock = threading.Lock()
+        self._concluidos = self._carregar()
+
+    @staticmethod
+    def hash_script(script_data):
+        opcoes_de_execucao = {"DRY_RUN", "MAX_PARALLEL"}
+        conteudo = {k: v for k, v in script_data.items() if k not in opcoes_de_execucao}
+        return hashlib.sha256(json.dumps(conteudo, sort_keys=True).encode()).hexdigest()[:16]
+
+    def _carregar(self):
+        concluidos = {}
+        self._precisa_quebra_linha = False
+        if not self.path.exists():
+            return concluidos
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                self._precisa_quebra_linha = not line.endswith("\n")
+                try:
+                    registro = json.loads(line)
+                except json.JSONDecodeError:
+                    # Última linha incompleta de uma execução que caiu no meio da escrita
+                    continue
+                concluidos[(registro["serial"], registro["passo"])] = registro["fingerprint"]
+        return concluidos
+
+    def concluido(self, serial, step_id, fingerprint):
+        return self._concluidos.get((serial, step_id)) == fingerprint
+
+    def registrar(self, serial, step_id, fingerprint, duracao):
+        registro = {"serial": serial, "passo": step_id, "fingerprint": fingerprint, "duracao": duracao, "ts": time.time()}
+        with self._lock:
+            self.journal_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                if self._precisa_quebra_linha:
+                    f.write("\n")
+                    self._precisa_quebra_linha = False
+                f.write(json.dumps(registro) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._concluidos[(serial, step_id)] = fingerprint
+
+    def limpar(self):
+        with self._lock:
+            self._concluidos.clear()
+            if self.path.exists():
+                self.path.unlink()
+
+class ScriptEngine:
+    """Executa os passos de um script JSON como um grafo de dependências, em paralelo entre dispositivos.
+
+    Cada passo aceita: id, type, depends_on, after, retries, retry_delay e timeout. 'depends_on' exige
+    que os passos citados tenham sucesso; 'after' só espera que terminem, com ou sem sucesso. Passos sem
+    dependência entre si rodam ao mesmo tempo; um 'reboot' funciona como barreira no seu dispositivo."""
+
+    TIPOS = {
+        "shell": "shell",
+        "push": "envio",
+        "pull": "cópia",
+        "settings": "configuração",
+        "install": "instalação",
+        "uninstall": "desinstalação",
+        "reboot": "reinício",
+    }
+
+    def __init__(self, adb_path, script_data, base_dir=None, app_manager=None, progresso=None, dry_run=None, max_parallel=None, journal=None):
+        self.adb_path = adb_path
+        self.script_data = script_data
+        self.base_dir = Path(base_dir) if base_dir else Path.cwd()
+        self.progresso = progresso
+        self.dry_run = script_data.get("DRY_RUN", False) if dry_run is None else dry_run
+        self.max_parallel = max_parallel or script_data.get("MAX_PARALLEL", 8)
+        self.skip_installed = script_data.get("SKIP_INSTALLED", True)
+        self.steps = self._normalizar_passos(script_data)
+        self.devices = self._resolver_dispositivos(script_data.get("DEVICES"))
+        self._app_managers = {}
+        if app_manager is not None:
+            self._app_managers[app_manager.serial] = app_manager
+        self._app_managers_lock = threading.Lock()
+        self.journal = None if self.dry_run else journal
+        # Serial real por trás de 'None' (dispositivo padrão), para o diário não misturar aparelhos
+        self._serial_padrao = None
+        self.relatorio = None
+
+    def _normalizar_passos(self, script_data):
+        if "STEPS" in script_data:
+            steps = [dict(step) for step in script_data["STEPS"]]
+        else:
+            # Formato antigo: desinstalações e depois instalações, uma de cada vez no dispositivo e sem
+            # depender de sucesso (desinstalar um pacote ausente falha, mas as instalações seguiam)
+            comandos = script_data.get("COMMAND", {})
+            steps = [{"id": f"uninstall-{i}", "type": "uninstall", "package": pkg} for i, pkg in enumerate(comandos.get("UNISTALL", []))]
+            steps += [{"id": f"install-{i}", "type": "install", "apk": apk} for i, apk in enumerate(comandos.get("INSTALL", []))]
+            for anterior, step in zip(steps, steps[1:]):
+                step["after"] = [anterior["id"]]
+
+        ids_vistos = set()
+        ultima_barreira = None
+        for i, step in enumerate(steps):
+            if step.get("type") not in self.TIPOS:
+                raise ValueError(f"Tipo de passo desconhecido: {step.get('type')}")
+            step.setdefault("id", f"{step['type']}-{i}")
+            if step["id"] in ids_vistos:
+                raise ValueError(f"ID de passo duplicado: {step['id']}")
+            for chave in ("depends_on", "after"):
+                deps = step.get(chave, [])
+                # dict.fromkeys: sem repetições, que impediriam a contagem de dependências de chegar a zero
+                step[chave] = list(dict.fromkeys([deps] if isinstance(deps, str) else deps))
+            if step["type"] == "reboot":
+                step["depends_on"] = sorted(ids_vistos)
+                ultima_barreira = step["id"]
+            elif ultima_barreira and ultima_barreira not in step["depends_on"]:
+                step["depends_on"].append(ultima_barreira)
+            step["after"] = [dep for dep in step["after"] if dep not in step["depends_on"]]
+            ids_vistos.add(step["id"])
+
+        for step in steps:
+            desconhecidas = [dep for dep in step["depends_on"] + step["after"] if dep not in ids_vistos]
+            if desconhecidas:
+                raise ValueError(f"Passo '{step['id']}' depende de passos inexistentes: {', '.join(desconhecidas)}")
+
+        # Kahn: garante que o grafo não tem ciclos
+        pendentes = {step["id"]: set(step["depends_on"] + step["after"]) for step in steps}
+        while pendentes:
+            prontos = [step_id for step_id, deps in pendentes.items() if not deps]
+            if not prontos:
+                raise ValueError(f"Dependências circulares entre: {', '.join(sorted(pendentes))}")
+            for step_id in prontos:
+                del pendentes[step_id]
+            for deps in pendentes.values():
+                deps.difference_update(prontos)
+        return steps
+
+    def _resolver_dispositivos(self, devices):
+        if devices in (None, [], ""):
+            return [None]
+        if devices == "all":
+            return listar_dispositivos(self.adb_path) or [None]
+        return [devices] if isinstance(devices, str) else list(devices)
+
+    def _caminho_local(self, caminho, serial=None, saida=False):
+        caminho = str(caminho).replace("{serial}", serial or "default")
+        if os.path.isabs(caminho):
+            return caminho
+        # Caminhos relativos ao script têm prioridade; os antigos, relativos ao diretório atual, continuam valendo
+        relativo_ao_script = self.base_dir / caminho
+        if saida or relativo_ao_script.exists() or not os.path.exists(caminho):
+            return str(relativo_ao_script)
+        return caminho
+
+    def _app_manager(self, serial):
+        with self._app_managers_lock:
+            if serial not in self._app_managers:
+                self._app_managers[serial] = AppManager(self.adb_path, serial)
+            return self._app_managers[serial]
+
+    def _comando(self, step, serial):
+        tipo = step["type"]
+        if tipo == "shell":
+            command = step["command"]
+            return ["shell"] + (command if isinstance(command, list) else [command])
+        if tipo == "push":
+            return ["push", self._caminho_local(step["local"], serial), step["remote"]]
+        if tipo == "pull":
+            return ["pull", step["remote"], self._caminho_local(step["local"], serial, saida=True)]
+        if tipo == "settings":
+            if step.get("value") is None:
+                return ["shell", "settings", "delete", step.get("namespace", "global"), step["key"]]
+            return ["shell", "settings", "put", step.get("namespace", "global"), step["key"], str(step["value"])]
+        if tipo == "uninstall":
+            return ["shell", "pm", "uninstall", "--user", str(step.get("user", 0)), step["package"]]
+        if tipo == "install":
+            return ["install", "-r", self._caminho_local(step["apk"], serial)]
+        return ["reboot"]
+
+    def _descricao(self, step):
+        return (step.get("package") or step.get("apk") or step.get("remote") or step.get("key")
+                or (" ".join(step["command"]) if isinstance(step.get("command"), list) else step.get("command")) or step["id"])
+
+    def _aguardar_boot(self, serial, timeout):
+        limite = time.time() + timeout
+        base = comando_adb(self.adb_path, serial)
+        try:
+            subprocess.run(base + ["wait-for-device"], capture_output=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return False, "", "Timeout aguardando o dispositivo voltar"
+        while time.time() < limite:
+            try:
+                result = subprocess.run(base + ["shell", "getprop", "sys.boot_completed"], capture_output=True, text=True, timeout=5, errors="ignore")
+                if result.stdout.strip() == "1":
+                    return True, f"Boot concluído em {timeout - (limite - time.time()):.0f}s", ""
+            except subprocess.TimeoutExpired:
+                pass
+            time.sleep(2)
+        return False, "", "Timeout aguardando sys.boot_completed"
+
+    def _executar_uma_vez(self, step, serial, timeout):
+        tipo = step["type"]
+        comando = comando_adb(self.adb_path, serial)[1:] + self._comando(step, serial)
+        if self.dry_run:
+            return True, f"[dry-run] adb {' '.join(comando)}", "", False, None
+
+        if tipo == "install":
+            apk_path = self._caminho_local(step["apk"], serial)
+            return instalar_apk(
+                self.adb_path, apk_path, self._app_manager(serial), pular_se_instalado=step.get("skip_installed", self.skip_installed),
+                timeout=timeout, serial=serial,
+                progresso=(lambda dados: self.progresso(apk_path, dados)) if self.progresso else None
+            )
+
+        if tipo == "pull":
+            Path(comando[-1]).parent.mkdir(parents=True, exist_ok=True)
+        success, stdout, stderr = executar_comando_adb_simples(self.adb_path, comando, timeout=timeout)
+        if success and tipo == "uninstall" and "Failure" in stdout:
+            success = False
+        if success and step.get("expect") and step["expect"] not in stdout:
+            success, stderr = False, f"Saída não contém '{step['expect']}'"
+        if tipo in ("uninstall", "reboot"):
+            self._app_manager(serial).invalidate_package_inventory()
+        if success and tipo == "reboot" and step.get("wait", True):
+            success, stdout, stderr = self._aguardar_boot(serial, timeout)
+        return success, stdout, stderr, False, None
+
+    def _fingerprint(self, step, serial):
+        # Inclui tamanho e data dos arquivos locais: trocar o APK invalida o passo já concluído
+        dados = json.dumps(step, sort_keys=True)
+        for chave in ("apk", "local"):
+            if chave in step and step["type"] in ("install", "push"):
+                caminho = self._caminho_local(step[chave], serial)
+                if os.path.exists(caminho):
+                    stat = os.stat(caminho)
+                    dados += f"|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(dados.encode()).hexdigest()
+
+    def _executar_passo(self, step, serial):
+        fingerprint = self._fingerprint(step, serial) if self.journal else None
+        serial_diario = serial or self._serial_padrao
+        if self.journal and self.journal.concluido(serial_diario, step["id"], fingerprint):
+            resultado = self._resultado_base(step, serial)
+            resultado.update(sucesso=True, pulado=True, retomado=True, saida="Concluído em uma execução anterior")
+            return resultado
+
+        padrao = 300 if step["type"] in ("install", "reboot") else 60
+        timeout = step.get("timeout", padrao)
+        tentativas_max = 1 + int(step.get("retries", 0))
+        inicio = time.time()
+        for tentativa in range(1, tentativas_max + 1):
+            try:
+                success, stdout, stderr, pulado, estatisticas = self._executar_uma_vez(step, serial, timeout)
+            except Exception as e:
+                success, stdout, stderr, pulado, estatisticas = False, "", str(e), False, None
+            if success or tentativa == tentativas_max:
+                break
+            print(f"🔁 [{serial or 'padrão'}] {step['id']}: tentativa {tentativa} falhou, repetindo...")
+            time.sleep(step.get("retry_delay", 2))
+
+        resultado = self._resultado_base(step, serial)
+        resultado.update(
+            sucesso=success, pulado=pulado, tentativas=tentativa, inicio=inicio, duracao=time.time() - inicio,
+            estatisticas=estatisticas, saida=stdout, erro=stderr,
+        )
+        if success and self.journal:
+            self.journal.registrar(serial_diario, step["id"], fingerprint, resultado["duracao"])
+        return resultado
+
+    def _resultado_base(self, step, serial):
+        resultado = {
+            "tipo": self.TIPOS[step["type"]],
+            "passo": step["id"],
+            "dispositivo": serial,
+            "descricao": self._descricao(step),
+            "sucesso": False,
+            "pulado": False,
+            "tentativas": 0,
+            "inicio": time.time(),
+            "duracao": 0,
+            "estatisticas": None,
+            "saida": "",
+            "erro": "",
+        }
+        if step["type"] == "install":
+            resultado["arquivo"] = step["apk"]
+        elif step["type"] == "uninstall":
+            resultado["pacote"] = step["package"]
+        return resultado
+
+    def _resultado_bloqueado(self, step, serial, motivo):
+        resultado = self._resultado_base(step, serial)
+        resultado.update(bloqueado=True, erro=f"Não executado: dependência '{motivo}' falhou")
+        return resultado
+
+    def run(self):
+        if self.journal and None in self.devices:
+            self._serial_padrao = serial_conectado(self.adb_path)
+            if self._serial_padrao is None:
+                print("⚠️  Dispositivo sem serial identificável: a execução não será registrada para retomada")
+                self.journal = None
+        steps_by_id = {step["id"]: step for step in self.steps}
+        # step_id -> [(dependente, exige sucesso)]
+        dependentes = {step["id"]: [] for step in self.steps}
+        for step in self.steps:
+            for dep in step["depends_on"]:
+                dependentes[dep].append((step["id"], True))
+            for dep in step["after"]:
+                dependentes[dep].append((step["id"], False))
+
+        faltando = {(serial, step["id"]): len(step["depends_on"]) + len(step["after"]) for serial in self.devices for step in self.steps}
+        resultados = []
+        inicio = time.time()
+
+        def concluir(serial, step_id, sucesso, motivo):
+            for dependente, exige_sucesso in dependentes[step_id]:
+                chave = (serial, dependente)
+                if chave not in faltando:
+                    continue
+                if exige_sucesso and not sucesso:
+                    del faltando[chave]
+                    resultados.append(self._resultado_bloqueado(steps_by_id[dependente], serial, motivo))
+                    concluir(serial, dependente, False, motivo)
+                else:
+                    faltando[chave] -= 1
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            em_execucao = {}
+
+            def submeter_prontos():
+                for chave, restantes in list(faltando.items()):
+                    if restantes == 0:
+                        del faltando[chave]
+                        serial, step_id = chave
+                        em_execucao[executor.submit(self._executar_passo, steps_by_id[step_id], serial)] = chave
+
+            submeter_prontos()
+            while em_execucao:
+                concluidos, _ = wait(list(em_execucao), return_when=FIRST_COMPLETED)
+                for future in concluidos:
+                    serial, step_id = em_execucao.pop(future)
+                    resultado = future.result()
+                    resultados.append(resultado)
+                    status = "✅" if resultado["sucesso"] else "❌"
+                    print(f"{status} [{serial or 'padrão'}] {step_id} ({resultado['duracao']:.1f}s)")
+                    concluir(serial, step_id, resultado["sucesso"], step_id)
+                submeter_prontos()
+
+        self.relatorio = gerar_relatorio_execucao(resultados, time.time() - inicio)
+        # Execução completa em todos os dispositivos: a próxima começa do zero
+        if self.journal and all(r["sucesso"] for r in resultados):
+            self.journal.limpar()
+        return resultados
+
+def gerar_relatorio_execucao(resultados, duracao_total=None):
+    """Resumo de tempos de um script: tempo real, tempo somado dos passos e ganho do paralelismo"""
+    executados = [r for r in resultados if not r.get("bloqueado")]
+    if duracao_total is None:
+        duracao_total = (max(r["inicio"] + r["duracao"] for r in executados) - min(r["inicio"] for r in executados)) if executados else 0
+    soma = sum(r.get("duracao", 0) for r in executados)
+    return {
+        "duracao_total": duracao_total,
+        "soma_passos": soma,
+        "ganho_paralelismo": soma / duracao_total if duracao_total > 0 else 1.0,
+        "passos": len(resultados),
+        "sucessos": sum(1 for r in resultados if r["sucesso"]),
+        "falhas": sum(1 for r in resultados if not r["sucesso"] and not r.get("bloqueado")),
+        "bloqueados": sum(1 for r in resultados if r.get("bloqueado")),
+        "pulados": sum(1 for r in resultados if r.get("pulado")),
+        "retomados": sum(1 for r in resultados if r.get("retomado")),
+        "mais_lentos": [
+            {"passo": r["passo"], "dispositivo": r.get("dispositivo"), "duracao": r["duracao"]}
+            for r in sorted(executados, key=lambda r: r["duracao"], reverse=True)[:5]
+        ],
+    }
+
+def processar_script_json(arquivo_json, adb_path, app_manager=None, progresso=None, dry_run=None, retomar=True, dispositivos=None):
     """Processa um arquivo JSON com comandos para executar no dispositivo"""
     try:
         with open(arquivo_json, 'r', encoding='utf-8') as f:
             script_data = json.load(f)
-        
-        resultados = []
-        
-        # Processar comandos de desinstalação
-        if "COMMAND" in script_data and "UNISTALL" in script_data["COMMAND"]:
-            for package in script_data["COMMAND"]["UNISTALL"]:
-                print(f"🗑️  Desinstalando: {package}")
-                success, stdout, stderr = executar_comando_adb_simples(
-                    adb_path, ["shell", "pm", "uninstall", "--user", "0", package]
-                )
-                
-                resultados.append({
-                    "tipo": "desinstalação",
-                    "pacote": package,
-                    "sucesso": success,
-                    "saida": stdout,
-                    "erro": stderr
-                })
-        
-        # Processar outros tipos de comandos
-        if "COMMAND" in script_data and "INSTALL" in script_data["COMMAND"]:
-            for apk_path in script_data["COMMAND"]["INSTALL"]:
-                print(f"📦 Instalando: {apk_path}")
-                success, stdout, stderr = executar_comando_adb_simples(
-                    adb_path, ["install", "-r", apk_path]
-                )
-                
-                resultados.append({
-                    "tipo": "instalação",
-                    "arquivo": apk_path,
-                    "sucesso": success,
-                    "saida": stdout,
-                    "erro": stderr
-                })
-        
+        if dispositivos:
+            script_data["DEVICES"] = dispositivos
+
+        engine = ScriptEngine(
+            adb_path, script_data, base_dir=Path(arquivo_json).resolve().parent, app_manager=app_manager,
+            progresso=progresso, dry_run=dry_run
+        )
+        if not engine.dry_run:
+            engine.journal = ScriptJournal(ScriptJournal.hash_script(script_data))
+        if engine.journal and not retomar:
+            engine.journal.limpar()
+        resultados = engine.run()
+        relatorio = engine.relatorio
+        print(f"⏱️  Script concluído em {relatorio['duracao_total']:.1f}s "
+              f"(soma dos passos {relatorio['soma_passos']:.1f}s, {relatorio['ganho_paralelismo']:.1f}x)")
         return True, resultados
         
     except Exception as e:
         return False, f"Erro ao processar script: {e}"
 
-def tirar_screenshot(adb_path, arquivo_local="screenshot.png"):
+def tirar_screenshot(adb_path, arquivo_local="screenshot.png", serial=None):
     """Tira um screenshot do dispositivo"""
+    prefixo = comando_adb(adb_path, serial)[1:]
     try:
         # Tirar screenshot no dispositivo
         success, stdout, stderr = executar_comando_adb_simples(
-            adb_path, ["shell", "screencap", "-p", "/sdcard/screenshot.png"]
+            adb_path, prefixo + ["shell", "screencap", "-p", "/sdcard/screenshot.png"]
         )
         
         if success:
             # Copiar para o computador
             success, stdout, stderr = executar_comando_adb_simples(
-                adb_path, ["pull", "/sdcard/screenshot.png", arquivo_local]
+                adb_path, prefixo + ["pull", "/sdcard/screenshot.png", arquivo_local]
             )
             
             # Remover do dispositivo
             executar_comando_adb_simples(
-                adb_path, ["shell", "rm", "/sdcard/screenshot.png"]
+                adb_path, prefixo + ["shell", "rm", "/sdcard/screenshot.png"]
             )
             
             return success
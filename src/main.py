@@ -11,7 +11,7 @@ def main(page: ft.Page):
 
     ADB, app_manager, config_manager, device_monitor = None, None, None, None
     todos_os_widgets_de_apps = []
-    logcat_thread, monitor_thread = None, None
+    logcat_thread, monitor_thread, processos_thread = None, None, None
     stop_logcat_event, stop_monitor_event = threading.Event(), threading.Event()
     is_wifi_connected = False
     
@@ -20,10 +20,26 @@ def main(page: ft.Page):
     status_indicator = ft.Container(width=10, height=10, bgcolor=theme_colors["subtext"], border_radius=5)
     
     # Dados para os gráficos
-    cpu_data = [0] * 60
-    ram_data = [0] * 60
-    storage_data = [0] * 60
-    battery_data = [0] * 60
+    historico_monitor = MonitorHistory()
+    monitor_origem = None
+    monitor_recorder = None
+    eventos_throttling, throttling_anterior = 0, 0
+    monitor_reproduzindo = False
+    GRAFICO_PONTOS = 120
+    PROCESSOS_TOP_N, PROCESSOS_INTERVALO = 15, 3
+    ABA_MONITOR, ABA_FROTA = 3, 4
+    fleet_monitor, fleet_stop_event = None, None
+    fleet_cards = {}
+    alert_engine = None
+    LOGCAT_LINHAS_VISIVEIS = 500
+    logcat_captura_sessao = None
+    logcat_captura_blocos = []
+    logcat_indice = LogIndex()
+    # Event da indexação de captura em andamento: limpar o índice cancela quem ainda o alimenta
+    logcat_indexacao = None
+    logcat_volume = LogVolumeStats()
+    logcat_busca_ativa = False
+    VOLUME_TOP_N = 8
     monitor_running = False
     
     # Referências para os gráficos
@@ -33,10 +49,16 @@ def main(page: ft.Page):
     battery_chart_ref = None
     
     def inicializar_adb_completo():
-        nonlocal ADB, app_manager, config_manager, device_monitor
+        nonlocal ADB, app_manager, config_manager, device_monitor, alert_engine
         ADB, error_msg = localizar_adb()
         if ADB:
             app_manager, config_manager, device_monitor = AppManager(ADB), ConfigManager(ADB), DeviceMonitor(ADB)
+            try:
+                alert_engine = AlertEngine.from_config(callback=mostrar_alerta)
+            except (ValueError, json.JSONDecodeError) as e:
+                print(f"Regras de alerta ignoradas: {e}")
+                alert_engine = AlertEngine([], callback=mostrar_alerta)
+            device_monitor.alertas = alert_engine
             return True
         else:
             page.clean()
@@ -207,6 +229,8 @@ def main(page: ft.Page):
         try:
             result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=30)
             print(f"[SUCESSO] Pacote '{pkg_name}' desinstalado.")
+            if app_manager:
+                app_manager.invalidate_package_inventory()
             if result.stdout: 
                 print(f"   |-- Saída do ADB: {result.stdout.strip()}")
             
@@ -640,25 +664,86 @@ def main(page: ft.Page):
     def _install_apk_task(apk_path):
         installer_progress_ring.visible = True
         installer_icon.visible = False
+        installer_progress_bar.visible = True
+        installer_progress_bar.value = None
         installer_text.value = f"Instalando {os.path.basename(apk_path)}..."
         page.update()
+
+        def atualizar_progresso(dados):
+            if dados["fase"] == "transferindo" and dados["bytes_total"]:
+                installer_progress_bar.value = dados["bytes_enviados"] / dados["bytes_total"]
+            else:
+                installer_progress_bar.value = None
+            installer_text.value = f"{os.path.basename(apk_path)}: {formatar_progresso(dados)}"
+            page.update()
         
         try:
-            subprocess.run([ADB, "install", "-r", apk_path], capture_output=True, text=True, timeout=300, check=True)
-            page.snack_bar = ft.SnackBar(content=ft.Text(f"App instalado com sucesso!"), bgcolor=theme_colors["success"])
-        except subprocess.CalledProcessError as e: 
-            page.snack_bar = ft.SnackBar(content=ft.Text(f"Falha na instalação: {e.stderr.strip()}"), bgcolor=theme_colors["error"])
+            success, stdout, stderr, pulado, estatisticas = instalar_apk(ADB, apk_path, app_manager, progresso=atualizar_progresso)
+            if pulado:
+                page.snack_bar = ft.SnackBar(content=ft.Text(f"Instalação ignorada: {stdout}"), bgcolor=theme_colors["warning"])
+            elif success:
+                vazao = f" ({estatisticas['mb_s']:.1f} MB/s, {estatisticas['duracao']:.1f}s)" if estatisticas else ""
+                page.snack_bar = ft.SnackBar(content=ft.Text(f"App instalado com sucesso!{vazao}"), bgcolor=theme_colors["success"])
+            else:
+                page.snack_bar = ft.SnackBar(content=ft.Text(f"Falha na instalação: {(stderr or stdout).strip()}"), bgcolor=theme_colors["error"])
         except Exception as e: 
             page.snack_bar = ft.SnackBar(content=ft.Text(f"Erro inesperado: {e}"), bgcolor=theme_colors["error"])
         finally:
             installer_progress_ring.visible = False
+            installer_progress_bar.visible = False
             installer_icon.visible = True
             installer_text.value = "Arraste e solte o APK aqui ou clique para selecionar"
             page.snack_bar.open = True
             page.update()
     
+    def _preflight_apk_task(apk_path):
+        try:
+            info = ler_info_apk(apk_path)
+        except Exception as ex:
+            installer_info.controls = [ft.Text(f"Não foi possível ler o APK: {ex}", color=theme_colors["error"], size=12)]
+            installer_info.visible = True
+            page.update()
+            return
+
+        abis = ", ".join(info["abis"]) if info["abis"] else "Universal (sem libs nativas)"
+        installer_info.controls = [
+            ft.Text(info["package"] or "Pacote desconhecido", size=14, weight=ft.FontWeight.BOLD, color=theme_colors["text"]),
+            ft.Text(f"Versão {info['version_name'] or '-'} (versionCode {info['version_code']})", size=12, color=theme_colors["subtext"]),
+            ft.Text(f"SDK mínimo {info['min_sdk'] or '-'} • alvo {info['target_sdk'] or '-'} • ABIs: {abis}", size=12, color=theme_colors["subtext"]),
+            ft.Text(f"Tamanho: {info['size'] / 1048576:.1f} MB", size=12, color=theme_colors["subtext"]),
+        ]
+        installer_info.visible = True
+        page.update()
+
+        problemas = app_manager.check_apk_compatibility(apk_path, info) if app_manager else []
+        if not problemas:
+            _install_apk_task(apk_path)
+            return
+
+        for problema in problemas:
+            installer_info.controls.append(ft.Row([ft.Icon(ft.Icons.WARNING_AMBER, color=theme_colors["warning"], size=16), ft.Text(problema, size=12, color=theme_colors["warning"])], spacing=5))
+
+        def confirmar(e):
+            dialog.open = False
+            page.update()
+            threading.Thread(target=_install_apk_task, args=(apk_path,), daemon=True).start()
+
+        dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Possíveis incompatibilidades"),
+            content=ft.Column([ft.Text(problema) for problema in problemas], tight=True),
+            actions=[
+                ft.TextButton("Cancelar", on_click=lambda _: setattr(dialog, 'open', False) or page.update()),
+                ft.FilledButton("Instalar mesmo assim", on_click=confirmar),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END
+        )
+        page.overlay.append(dialog)
+        dialog.open = True
+        page.update()
+
     def install_apk(path): 
-        threading.Thread(target=_install_apk_task, args=(path,), daemon=True).start()
+        threading.Thread(target=_preflight_apk_task, args=(path,), daemon=True).start()
     
     def on_apk_picked(e: ft.FilePickerResultEvent):
         if e.files and e.files[0].path: 
@@ -679,43 +764,245 @@ def main(page: ft.Page):
         e.control.content.border = ft.border.all(1, theme_colors["subtext"])
         page.update()
     
-    def update_logcat_view(log_list_view, stop_event):
+    CORES_PRIORIDADE_LOG = {"E": theme_colors["error"], "F": theme_colors["error"], "W": theme_colors["warning"], "I": theme_colors["text"]}
+
+    def linha_logcat(entrada, n=1, destaques=()):
+        texto = (f"[{entrada.serial}] " if entrada.serial else "") + entrada.formatar() + (f"  (×{n})" if n > 1 else "")
+        cor = CORES_PRIORIDADE_LOG.get(entrada.prioridade, theme_colors["subtext"])
+        if not destaques:
+            return ft.Text(texto, font_family="monospace", size=11, color=cor)
+        estilo = ft.TextStyle(bgcolor=theme_colors["warning"], color=theme_colors["on_primary"], weight=ft.FontWeight.BOLD)
+        return ft.Text(
+            spans=[ft.TextSpan(trecho, estilo if destacado else None) for trecho, destacado in dividir_destaques(texto, destaques)],
+            font_family="monospace", size=11, color=cor,
+        )
+
+    def filtro_logcat_da_tela():
+        return LogcatFiltro.from_texto(logcat_buffers_field.value, logcat_specs_field.value, logcat_process_field.value, logcat_regex_field.value)
+
+    def mostrar_erro_logcat(mensagem):
+        page.snack_bar = ft.SnackBar(content=ft.Text(mensagem), bgcolor=theme_colors["error"])
+        page.snack_bar.open = True
+        page.update()
+
+    def update_logcat_view(log_list_view, stop_event, filtro):
+        # A leitura do adb só enfileira; aqui a fila é drenada em lotes, um page.update por quadro
+        seriais = [c.data for c in logcat_devices_row.controls if isinstance(c, ft.Checkbox) and c.value]
+        if len(seriais) > 1:
+            sessao = MultiLogcatSession(ADB, seriais, filtro=filtro, indice=logcat_indice, volume=logcat_volume)
+        else:
+            sessao = LogcatSession(ADB, seriais[0] if seriais else None, filtro=filtro, indice=logcat_indice, volume=logcat_volume)
+        ultimas_estatisticas = None
+        proximo_volume = 0
         try:
-            process = subprocess.Popen([ADB, "logcat", "-v", "brief"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="ignore")
-            while not stop_event.is_set():
-                line = process.stdout.readline()
-                if not line: 
+            try:
+                sessao.start()
+            except ValueError as ex:
+                logcat_toggle_button.icon, logcat_toggle_button.text = ft.Icons.PLAY_ARROW, "Iniciar"
+                mostrar_erro_logcat(str(ex))
+                return
+            while not stop_event.wait(1 / LOGCAT_QUADROS_POR_SEGUNDO):
+                entradas = sessao.buffer.drenar(LOGCAT_LINHAS_VISIVEIS)
+                # Com uma busca na tela, as novas entradas só entram no índice
+                if entradas and not logcat_busca_ativa:
+                    log_list_view.controls.extend(linha_logcat(entrada, n) for entrada, n in entradas)
+                    excesso = len(log_list_view.controls) - LOGCAT_LINHAS_VISIVEIS
+                    if excesso > 0:
+                        del log_list_view.controls[:excesso]
+                estatisticas = sessao.buffer.estatisticas()
+                if (entradas and not logcat_busca_ativa) or estatisticas != ultimas_estatisticas:
+                    ultimas_estatisticas = estatisticas
+                    logcat_stats_text.value = f"{estatisticas['recebidas']} linhas • {estatisticas['agrupadas']} agrupadas • {estatisticas['descartadas']} descartadas"
+                    if isinstance(sessao, MultiLogcatSession):
+                        logcat_stats_text.value += " • relógios " + ", ".join(formatar_offset_relogio(s, o) for s, o in sessao.offsets.items())
+                    page.update(log_list_view, logcat_stats_text)
+                if logcat_volume_panel.visible and time.monotonic() >= proximo_volume:
+                    proximo_volume = time.monotonic() + 1
+                    atualizar_painel_volume()
+                if not sessao.ativo and not len(sessao.buffer):
+                    if sessao.erro:
+                        logcat_toggle_button.icon, logcat_toggle_button.text = ft.Icons.PLAY_ARROW, "Iniciar"
+                        mostrar_erro_logcat(f"O logcat encerrou: {sessao.erro}")
                     break
-                color = theme_colors["subtext"]
-                if line.startswith("E/"): 
-                    color = theme_colors["error"]
-                elif line.startswith("W/"): 
-                    color = theme_colors["warning"]
-                log_list_view.controls.append(ft.Text(line.strip(), font_family="monospace", size=11, color=color))
-                if len(log_list_view.controls) > 500: 
-                    log_list_view.controls.pop(0)
-                page.update()
-            process.terminate()
         except Exception as ex: 
             print(f"Erro no logcat: {ex}")
+        finally:
+            sessao.stop()
 
     def start_stop_logcat(e):
-        nonlocal logcat_thread
+        nonlocal logcat_thread, logcat_busca_ativa
         if logcat_thread and logcat_thread.is_alive():
             stop_logcat_event.set()
             logcat_thread.join()
             logcat_thread = None
             logcat_toggle_button.icon, logcat_toggle_button.text = ft.Icons.PLAY_ARROW, "Iniciar"
         else:
+            filtro = filtro_logcat_da_tela()
+            try:
+                filtro.validar()
+            except ValueError as ex:
+                mostrar_erro_logcat(str(ex))
+                return
+            logcat_capture_slider.visible = False
             stop_logcat_event.clear()
             logcat_list.controls.clear()
-            logcat_thread = threading.Thread(target=update_logcat_view, args=(logcat_list, stop_logcat_event), daemon=True)
+            cancelar_indexacao()
+            logcat_indice.limpar()
+            logcat_volume.limpar()
+            logcat_search_field.value = ""
+            logcat_busca_ativa = False
+            logcat_thread = threading.Thread(target=update_logcat_view, args=(logcat_list, stop_logcat_event, filtro), daemon=True)
             logcat_thread.start()
             logcat_toggle_button.icon, logcat_toggle_button.text = ft.Icons.STOP, "Parar"
         page.update()
 
+    def alternar_captura_logcat(e):
+        # Captura em segundo plano, independente da visualização: continua gravando com a lista parada
+        nonlocal logcat_captura_sessao
+        if logcat_captura_sessao:
+            sessao, logcat_captura_sessao = logcat_captura_sessao, None
+            sessao.stop()
+            logcat_capture_button.icon_color = theme_colors["subtext"]
+            logcat_capture_button.tooltip = "Capturar em disco"
+            page.snack_bar = ft.SnackBar(content=ft.Text(f"Captura salva: {sessao.captura.diretorio} ({sessao.captura.entradas} entradas)"), bgcolor=theme_colors["success"])
+            page.snack_bar.open = True
+            page.update()
+            return
+        sessao = LogcatSession(ADB, filtro=filtro_logcat_da_tela(), captura=LogcatCapture(caminho_captura_padrao()))
+        try:
+            sessao.start()
+        except ValueError as ex:
+            sessao.captura.close()
+            mostrar_erro_logcat(str(ex))
+            return
+        logcat_captura_sessao = sessao
+        logcat_capture_button.icon_color = theme_colors["error"]
+        logcat_capture_button.tooltip = f"Capturando em {sessao.captura.diretorio.name} — clique para parar"
+        page.update()
+
+    def on_capture_picked(e: ft.FilePickerResultEvent):
+        nonlocal logcat_captura_blocos, logcat_indexacao
+        if not e.path:
+            return
+        logcat_captura_blocos = indice_captura(e.path)
+        if not logcat_captura_blocos:
+            mostrar_erro_logcat("Nenhuma captura de logcat nesta pasta")
+            return
+        if logcat_thread and logcat_thread.is_alive():
+            start_stop_logcat(e)
+        inicio, fim = logcat_captura_blocos[0][0], logcat_captura_blocos[-1][0]
+        logcat_capture_slider.min, logcat_capture_slider.max = inicio, max(fim, inicio + 1)
+        logcat_capture_slider.value = inicio
+        logcat_capture_slider.data = e.path
+        logcat_capture_slider.visible = True
+        ir_para_instante_captura(inicio)
+        cancelar_indexacao()
+        logcat_indexacao = threading.Event()
+        threading.Thread(target=indexar_captura, args=(e.path, logcat_indexacao), daemon=True).start()
+
+    def cancelar_indexacao():
+        if logcat_indexacao:
+            logcat_indexacao.set()
+
+    def indexar_captura(diretorio, cancelada):
+        logcat_indice.limpar()
+        logcat_volume.limpar(ao_vivo=False)
+        for i, entrada in enumerate(ler_captura(diretorio, blocos=logcat_captura_blocos), 1):
+            if cancelada.is_set():
+                return
+            logcat_indice.append(entrada)
+            logcat_volume.append(entrada)
+            if i % 100000 == 0:
+                logcat_search_field.hint_text = f"Indexando captura... {i} entradas"
+                page.update(logcat_search_field)
+        logcat_search_field.hint_text = f"Buscar em {len(logcat_indice)} entradas"
+        page.update(logcat_search_field)
+
+    def buscar_logcat(e):
+        nonlocal logcat_busca_ativa
+        texto = logcat_search_field.value.strip()
+        logcat_list.controls.clear()
+        if not texto:
+            logcat_busca_ativa = False
+            logcat_stats_text.value = ""
+            page.update()
+            return
+        try:
+            consulta = LogQuery.parse(texto)
+        except ValueError as ex:
+            mostrar_erro_logcat(str(ex))
+            return
+        inicio = time.perf_counter()
+        resultados = logcat_indice.buscar(consulta, LOGCAT_LINHAS_VISIVEIS)
+        duracao = (time.perf_counter() - inicio) * 1000
+        logcat_busca_ativa = True
+        logcat_list.controls = [linha_logcat(entrada, destaques=consulta.destaques()) for entrada in resultados]
+        logcat_stats_text.value = f"{len(resultados)} resultados em {len(logcat_indice)} entradas ({duracao:.0f} ms)"
+        page.update()
+
+    def ir_para_instante_captura(instante):
+        # Só os blocos a partir do instante são descomprimidos, graças ao índice de cada segmento
+        entradas = list(ler_captura(logcat_capture_slider.data, desde=instante, limite=LOGCAT_LINHAS_VISIVEIS, blocos=logcat_captura_blocos))
+        logcat_list.controls = [linha_logcat(entrada) for entrada in entradas]
+        logcat_stats_text.value = f"Captura: {time.strftime('%d/%m %H:%M:%S', time.localtime(instante))} • {len(entradas)} entradas"
+        page.update()
+
+    def atualizar_dispositivos_logcat(e=None):
+        # Nenhum marcado: dispositivo padrão do adb; dois ou mais: visualização mesclada por horário
+        marcados = {c.data for c in logcat_devices_row.controls if isinstance(c, ft.Checkbox) and c.value}
+        seriais = listar_dispositivos(ADB) if ADB else []
+        logcat_devices_row.controls = [ft.Text("Dispositivos:", size=12, color=theme_colors["subtext"])]
+        logcat_devices_row.controls += [ft.Checkbox(label=serial, data=serial, value=serial in marcados) for serial in seriais]
+        logcat_devices_row.controls.append(ft.IconButton(icon=ft.Icons.REFRESH, tooltip="Atualizar dispositivos", on_click=atualizar_dispositivos_logcat))
+        if e is not None:
+            page.update()
+
+    def atualizar_painel_volume():
+        resumo = logcat_volume.resumo(VOLUME_TOP_N)
+        periodo = "" if resumo["ao_vivo"] else " (média da captura)"
+        linhas = [ft.Text(f"{resumo['linhas']} linhas • {resumo['linhas_s']:.0f}/s • {formatar_taxa(resumo['bytes_s'] / 1024)}{periodo}", size=12, weight=ft.FontWeight.BOLD)]
+        for titulo, dimensao in (("Prioridade", "prioridades"), ("Tags", "tags"), ("Processos (PID)", "pids")):
+            linhas.append(ft.Text(titulo, size=12, color=theme_colors["primary"]))
+            for item in resumo[dimensao]:
+                cor = CORES_PRIORIDADE_LOG.get(item["chave"], theme_colors["text"]) if dimensao == "prioridades" else theme_colors["text"]
+                linhas.append(ft.Row([
+                    ft.Text(str(item["chave"]), size=11, color=cor, expand=True, no_wrap=True, tooltip=f"{item['linhas']} linhas" + (f" (±{item['erro']})" if item["erro"] else "")),
+                    ft.Text(f"{item['linhas_s']:.0f}/s", size=11, width=60, text_align=ft.TextAlign.RIGHT),
+                    ft.Text(formatar_taxa(item["bytes_s"] / 1024), size=11, width=70, text_align=ft.TextAlign.RIGHT, color=theme_colors["subtext"]),
+                ], spacing=5))
+        logcat_volume_list.controls = linhas
+        page.update(logcat_volume_panel)
+
+    def alternar_painel_volume(e):
+        logcat_volume_panel.visible = not logcat_volume_panel.visible
+        if logcat_volume_panel.visible:
+            atualizar_painel_volume()
+        page.update()
+
+    def on_volume_export(e: ft.FilePickerResultEvent):
+        if not e.path:
+            return
+        caminho = e.path if e.path.lower().endswith((".csv", ".json")) else e.path + ".csv"
+        logcat_volume.exportar(caminho)
+        page.snack_bar = ft.SnackBar(content=ft.Text(f"Estatísticas de volume salvas em {caminho}"), bgcolor=theme_colors["success"])
+        page.snack_bar.open = True
+        page.update()
+
+    def aplicar_filtros_logcat(e):
+        # Os filtros vão para o logcat do dispositivo, então mudar exige reiniciar a leitura
+        if logcat_thread and logcat_thread.is_alive():
+            start_stop_logcat(e)
+            start_stop_logcat(e)
+
     def clear_logcat(e): 
+        nonlocal logcat_busca_ativa
         logcat_list.controls.clear()
+        cancelar_indexacao()
+        logcat_indice.limpar()
+        logcat_volume.limpar()
+        logcat_search_field.value = ""
+        logcat_busca_ativa = False
+        logcat_stats_text.value = ""
         page.update()
     
     def _executar_comando_dispositivo(e, comando, titulo, msg, sucesso_msg):
@@ -774,6 +1061,9 @@ def main(page: ft.Page):
             global ESPELHAMENTO_ATIVO
             try:
                 ESPELHAMENTO_ATIVO = True
+                # Para a coleta do Monitor já, sem esperar a próxima amostra chegar
+                if device_monitor:
+                    device_monitor.stop_stream()
                 bloquear_interface(True)
                 page.snack_bar = ft.SnackBar(content=ft.Text("Iniciando espelhamento de tela..."), bgcolor=theme_colors["primary"])
                 page.snack_bar.open = True
@@ -926,43 +1216,32 @@ def main(page: ft.Page):
         page.update()
 
     # --- Funções para a Aba de Monitoramento ---
-    def create_chart(data, color, title, max_value=100):
-        if not data: 
-            return ft.Container(
-                content=ft.Text("Sem dados", color=theme_colors["subtext"]),
-                padding=10,
-                border_radius=8,
-                bgcolor=theme_colors["surface"],
-                expand=True,
+    def create_live_chart(title, series, escala=100):
+        """Gráfico com uma linha por métrica: series = [(metrica, cor)]; escala=None ajusta o eixo Y aos dados"""
+        # Séries e gráfico são criados uma vez; as atualizações mexem só nos pontos que entram e saem
+        linhas = {
+            metrica: ft.LineChartData(
+                data_points=[],
+                stroke_width=2,
+                color=color,
+                curved=True,
+                stroke_cap_round=True,
             )
-        
-        points = []
-        for i, value in enumerate(data):
-            if value is not None:
-                y = max(0, min(100, value))
-                points.append(ft.LineChartDataPoint(i, 100 - y))
-        
+            for metrica, color in series
+        }
+        color = series[0][1]
         chart = ft.LineChart(
-            data_series=[
-                ft.LineChartData(
-                    data_points=points,
-                    stroke_width=2,
-                    color=color,
-                    curved=True,
-                    stroke_cap_round=True,
-                )
-            ],
+            data_series=list(linhas.values()),
             border=ft.border.all(1, ft.Colors.with_opacity(0.2, color)),
             left_axis=ft.ChartAxis(labels_size=40),
             bottom_axis=ft.ChartAxis(labels_size=0),
             tooltip_bgcolor=ft.Colors.with_opacity(0.8, ft.Colors.GREY_900),
             min_y=0,
-            max_y=100,
+            max_y=escala or 1,
             expand=True,
             height=120,
         )
-        
-        return ft.Container(
+        container = ft.Container(
             content=ft.Column([
                 ft.Text(title, size=14, weight=ft.FontWeight.BOLD),
                 chart
@@ -972,71 +1251,385 @@ def main(page: ft.Page):
             bgcolor=theme_colors["surface"],
             expand=True,
         )
-
-    def update_monitor_data():
-        nonlocal cpu_data, ram_data, storage_data, battery_data, monitor_running
+        container.data = {"chart": chart, "series": linhas, "escala": escala, "janela": None, "incremental": False, "recalculado_em": 0.0}
+        return container
+
+    def ponto_grafico(timestamp, value, escala=100):
+        y = max(0, value if escala is None else min(escala, value))
+        return ft.LineChartDataPoint(timestamp - monitor_origem, y)
+
+    def atualizar_grafico(container, forcar=False):
+        """Atualiza o gráfico com a última amostra; retorna o LineChart se algo mudou"""
+        estado = container.data
+        referencia = historico_monitor[next(iter(estado["series"]))]
+        ultimo = referencia.last()
+        if not ultimo:
+            return None
+        timestamp = ultimo[0]
+        # Janela "Tudo" (0): do primeiro ao último ponto do histórico
+        janela = float(monitor_window_dropdown.value) or max(timestamp - referencia.first()[0], 1)
+        inicio_janela = timestamp - janela - monitor_origem
         
-        while monitor_running:
-            if device_monitor and ADB:
+        if not forcar and estado["janela"] == janela and estado["incremental"]:
+            # Poucos pontos na janela: acrescenta o novo e descarta os que saíram à esquerda
+            for metrica, serie in estado["series"].items():
+                pontos = serie.data_points
+                pontos.append(ponto_grafico(*historico_monitor[metrica].last(), estado["escala"]))
+                while pontos and pontos[0].x < inicio_janela:
+                    pontos.pop(0)
+                if len(pontos) > GRAFICO_PONTOS:
+                    forcar = True
+        elif not forcar and estado["janela"] == janela and timestamp - estado["recalculado_em"] < janela / GRAFICO_PONTOS:
+            # Série reduzida: só muda quando um bucket inteiro de tempo passou
+            return None
+        else:
+            forcar = True
+        
+        if forcar:
+            for metrica, serie in estado["series"].items():
+                dados = historico_monitor[metrica].downsample(GRAFICO_PONTOS, seconds=janela)
+                serie.data_points = [ponto_grafico(t, v, estado["escala"]) for t, v in dados]
+            estado["incremental"] = len(dados) < GRAFICO_PONTOS
+            estado["janela"], estado["recalculado_em"] = janela, timestamp
+        
+        chart = estado["chart"]
+        chart.min_x, chart.max_x = inicio_janela, timestamp - monitor_origem
+        if estado["escala"] is None:
+            maior = max((p.y for serie in estado["series"].values() for p in serie.data_points), default=0)
+            chart.max_y = max(maior * 1.2, 1)
+        return chart
+
+    def atualizar_monitor(amostra, desenhar=True):
+        nonlocal monitor_origem, eventos_throttling, throttling_anterior
+        if monitor_origem is None:
+            monitor_origem = amostra.timestamp
+        historico_monitor.append(amostra)
+        if amostra.throttling and not throttling_anterior:
+            eventos_throttling += 1
+        throttling_anterior = amostra.throttling
+        if monitor_recorder:
+            monitor_recorder.append(amostra)
+        if not desenhar:
+            return
+        
+        cpu_value_text.value = f"{amostra.cpu:.1f}%"
+        cpu_cores_text.value = formatar_nucleos(amostra)
+        ram_value_text.value = f"{amostra.ram:.1f}%"
+        storage_value_text.value = f"{amostra.storage:.1f}%"
+        battery_value_text.value = f"{amostra.battery}%"
+        net_value_text.value = f"↓ {formatar_taxa(amostra.net_rx_kbs)}  ↑ {formatar_taxa(amostra.net_tx_kbs)}"
+        disk_value_text.value = f"L {formatar_taxa(amostra.disk_read_kbs)}  E {formatar_taxa(amostra.disk_write_kbs)}"
+        thermal_text.value = formatar_termico(amostra)
+        throttling_badge.visible = bool(amostra.throttling)
+        throttling_badge.tooltip = descrever_throttling(amostra.throttling)
+        throttling_count_text.value = f"Eventos de throttling: {eventos_throttling}" if eventos_throttling else ""
+        
+        atualizar_graficos(textos=[cpu_value_text, cpu_cores_text, ram_value_text, storage_value_text, battery_value_text,
+                                   net_value_text, disk_value_text, thermal_text, throttling_badge, throttling_count_text])
+
+    def atualizar_graficos(e=None, textos=()):
+        # Envia só os controles alterados, em vez de percorrer a página inteira
+        forcar = e is not None
+        alterados = list(textos)
+        for container in (cpu_chart_ref, ram_chart_ref, storage_chart_ref, battery_chart_ref, net_chart_ref, disk_chart_ref):
+            chart = atualizar_grafico(container, forcar)
+            if chart:
+                alterados.append(chart)
+        if alterados:
+            page.update(*alterados)
+
+    # Última leitura completa: só o laço periódico consulta o aparelho (e avança a base de CPU);
+    # ordenar e forçar parada apenas redesenham essa lista
+    ultimos_processos = []
+
+    def atualizar_processos():
+        processos = device_monitor.get_process_stats()
+        if processos is None:
+            return
+        ultimos_processos[:] = processos
+        renderizar_processos()
+
+    def renderizar_processos():
+        chave = (lambda p: p["rss_kb"]) if process_sort_dropdown.value == "mem" else (lambda p: (p["cpu"], p["rss_kb"]))
+        linhas = []
+        for proc in sorted(ultimos_processos, key=chave, reverse=True)[:PROCESSOS_TOP_N]:
+            linhas.append(ft.Row([
+                ft.Column([
+                    ft.Text(proc["nome"], size=13, weight=ft.FontWeight.BOLD, no_wrap=True),
+                    ft.Text(f"PID {proc['pid']}" + (f" • {proc['pacote']}" if proc["pacote"] else ""), size=11, color=theme_colors["subtext"], no_wrap=True),
+                ], spacing=0, expand=True),
+                ft.Text(f"{proc['cpu']:.1f}%", width=60, text_align=ft.TextAlign.RIGHT, color=theme_colors["primary"]),
+                ft.Text(f"{proc['rss_kb'] / 1024:.0f} MB", width=70, text_align=ft.TextAlign.RIGHT, color=theme_colors["success"]),
+                ft.IconButton(
+                    icon=ft.Icons.STOP_CIRCLE_OUTLINED,
+                    icon_color=theme_colors["error"],
+                    tooltip=f"Forçar parada de {proc['pacote']}" if proc["pacote"] else "Processo do sistema",
+                    disabled=not proc["pacote"],
+                    on_click=lambda e, pacote=proc["pacote"]: forcar_parada(pacote),
+                ),
+            ]))
+        process_list.controls = linhas
+        page.update(process_list)
+
+    def forcar_parada(pacote):
+        device_monitor.force_stop_app(pacote)
+        page.snack_bar = ft.SnackBar(content=ft.Text(f"{pacote} foi forçado a parar."), bgcolor=theme_colors["success"])
+        page.snack_bar.open = True
+        page.update()
+        ultimos_processos[:] = [p for p in ultimos_processos if p["pacote"] != pacote]
+        renderizar_processos()
+
+    def update_process_data(stop_event):
+        # Cada início do monitor cria um evento próprio: uma thread antiga que ainda esteja presa
+        # em uma chamada ao adb termina na volta seguinte, mesmo que o monitor já tenha sido reiniciado
+        while not stop_event.is_set():
+            if device_monitor and ADB and monitor_visivel() and not ESPELHAMENTO_ATIVO:
                 try:
-                    cpu_current = device_monitor.get_cpu_usage_percentage()
-                    ram_current = device_monitor.get_ram_usage_percentage()
-                    storage_current = device_monitor.get_storage_usage_percentage()
-                    battery_current = device_monitor.get_battery_level()
-                    
-                    cpu_data.append(cpu_current)
-                    ram_data.append(ram_current)
-                    storage_data.append(storage_current)
-                    battery_data.append(battery_current)
-                    
-                    if len(cpu_data) > 60: 
-                        cpu_data = cpu_data[-60:]
-                    if len(ram_data) > 60: 
-                        ram_data = ram_data[-60:]
-                    if len(storage_data) > 60: 
-                        storage_data = storage_data[-60:]
-                    if len(battery_data) > 60: 
-                        battery_data = battery_data[-60:]
-                    
-                    cpu_value_text.value = f"{cpu_current:.1f}%"
-                    ram_value_text.value = f"{ram_current:.1f}%"
-                    storage_value_text.value = f"{storage_current:.1f}%"
-                    battery_value_text.value = f"{battery_current}%"
-                    
-                    if cpu_chart_ref:
-                        cpu_chart_ref.content = create_chart(cpu_data, theme_colors["primary"], "CPU").content
-                    if ram_chart_ref:
-                        ram_chart_ref.content = create_chart(ram_data, theme_colors["success"], "RAM").content
-                    if storage_chart_ref:
-                        storage_chart_ref.content = create_chart(storage_data, theme_colors["warning"], "Armazenamento").content
-                    if battery_chart_ref:
-                        battery_chart_ref.content = create_chart(battery_data, theme_colors["error"], "Bateria", 100).content
-                    
-                    page.update()
-                    
+                    atualizar_processos()
                 except Exception as e:
-                    print(f"Erro ao coletar dados de monitoramento: {e}")
-            
-            time.sleep(2)
+                    print(f"Erro ao coletar processos: {e}")
+            stop_event.wait(PROCESSOS_INTERVALO)
+
+    def monitor_visivel():
+        return tabs.selected_index == ABA_MONITOR
+
+    def update_monitor_data():
+        # Um único laço 'adb shell' envia as amostras; ele é reiniciado quando o intervalo muda
+        # e fica parado enquanto o espelhamento (scrcpy) está ativo
+        agendador = AdaptiveSampler()
+        while monitor_running:
+            if not (device_monitor and ADB) or ESPELHAMENTO_ATIVO:
+                time.sleep(1)
+                continue
+            automatico = monitor_interval_dropdown.value == "auto"
+            intervalo = agendador.intervalo if automatico else float(monitor_interval_dropdown.value)
+            # Com a aba oculta o ritmo mínimo vale também para o intervalo fixo
+            oculto = not monitor_visivel()
+            if oculto:
+                intervalo = max(intervalo, AdaptiveSampler.INTERVALO_OCULTO)
+            fluxo = device_monitor.stream(interval=intervalo)
+            try:
+                for amostra in fluxo:
+                    if not monitor_running:
+                        break
+                    visivel = monitor_visivel()
+                    atualizar_monitor(amostra, desenhar=visivel)
+                    proximo = agendador.proximo_intervalo(amostra, visivel=visivel, pausado=ESPELHAMENTO_ATIVO)
+                    if ESPELHAMENTO_ATIVO or (automatico and proximo != intervalo) or oculto == visivel:
+                        break
+            except Exception as e:
+                print(f"Erro ao coletar dados de monitoramento: {e}")
+                time.sleep(2)
+            finally:
+                fluxo.close()
+            monitor_interval_dropdown.helper_text = "Pausado (espelhamento)" if ESPELHAMENTO_ATIVO else (f"{agendador.intervalo:g} s" if automatico else None)
+            if monitor_visivel():
+                page.update(monitor_interval_dropdown)
+
+    def on_tab_change(e):
+        # Ao voltar para o Monitor: redesenha os gráficos e reinicia a coleta no ritmo da aba visível
+        if monitor_running and monitor_visivel():
+            atualizar_graficos(e)
+            if device_monitor:
+                device_monitor.stop_stream()
 
     def start_stop_monitor(e):
-        nonlocal monitor_thread, monitor_running
+        nonlocal monitor_thread, processos_thread, stop_monitor_event, monitor_running, historico_monitor, monitor_origem, monitor_reproduzindo
         
         if monitor_running:
             monitor_running = False
+            stop_monitor_event.set()
+            if device_monitor:
+                device_monitor.stop_stream()
+            parar_gravacao()
             if monitor_thread and monitor_thread.is_alive():
                 monitor_thread.join(timeout=1)
+            if processos_thread and processos_thread.is_alive():
+                processos_thread.join(timeout=1)
             monitor_toggle_button.icon = ft.Icons.PLAY_ARROW
             monitor_toggle_button.text = "Iniciar Monitoramento"
         else:
+            if monitor_reproduzindo:
+                historico_monitor, monitor_origem, monitor_reproduzindo = MonitorHistory(), None, False
+                monitor_replay_text.value = ""
             monitor_running = True
             monitor_thread = threading.Thread(target=update_monitor_data, daemon=True)
             monitor_thread.start()
+            stop_monitor_event = threading.Event()
+            processos_thread = threading.Thread(target=update_process_data, args=(stop_monitor_event,), daemon=True)
+            processos_thread.start()
             monitor_toggle_button.icon = ft.Icons.STOP
             monitor_toggle_button.text = "Parar Monitoramento"
         
         page.update()
 
+    def alternar_gravacao(e):
+        nonlocal monitor_recorder
+        if monitor_recorder:
+            parar_gravacao()
+        else:
+            # No modo automático o intervalo muda durante a sessão: os timestamps de cada amostra é que valem
+            valor = monitor_interval_dropdown.value
+            monitor_recorder = MonitorRecorder(caminho_gravacao_padrao(), metadados={"intervalo": valor if valor == "auto" else float(valor)})
+            monitor_record_button.icon_color = theme_colors["error"]
+            monitor_record_button.tooltip = f"Gravando em {monitor_recorder.path.name} — clique para parar"
+        page.update()
+
+    def parar_gravacao():
+        nonlocal monitor_recorder
+        if not monitor_recorder:
+            return
+        recorder, monitor_recorder = monitor_recorder, None
+        recorder.close()
+        monitor_record_button.icon_color = theme_colors["subtext"]
+        monitor_record_button.tooltip = "Gravar sessão"
+        page.snack_bar = ft.SnackBar(content=ft.Text(f"Gravação salva: {recorder.path} ({recorder.amostras} amostras)"), bgcolor=theme_colors["success"])
+        page.snack_bar.open = True
+
+    def on_recording_picked(e: ft.FilePickerResultEvent):
+        nonlocal historico_monitor, monitor_origem, monitor_reproduzindo
+        if not e.files:
+            return
+        try:
+            metadados, colunas = carregar_gravacao(e.files[0].path)
+        except Exception as err:
+            page.snack_bar = ft.SnackBar(content=ft.Text(f"Erro ao abrir gravação: {err}"), bgcolor=theme_colors["error"])
+            page.snack_bar.open = True
+            page.update()
+            return
+        if not metadados["amostras"]:
+            return
+        if monitor_running:
+            start_stop_monitor(None)
+        historico_monitor = MonitorHistory.from_columns(colunas)
+        monitor_origem, monitor_reproduzindo = colunas["timestamp"][0], True
+        duracao = colunas["timestamp"][-1] - colunas["timestamp"][0]
+        monitor_replay_text.value = f"Gravação: {os.path.basename(e.files[0].path)} — {metadados['amostras']} amostras, {duracao / 60:.1f} min, intervalo {formatar_intervalo_gravacao(metadados)}"
+        monitor_window_dropdown.value = "0"
+        atualizar_graficos(e)
+        page.update()
+
+    def mostrar_alerta(alerta):
+        page.snack_bar = ft.SnackBar(content=ft.Text(formatar_alerta(alerta), color=theme_colors["on_primary"]), bgcolor=theme_colors["warning"])
+        page.snack_bar.open = True
+        page.update()
+
+    def editar_alertas(e):
+        if not alert_engine:
+            return
+        regras_field = ft.TextField(
+            label="Regras (uma por linha)", multiline=True, min_lines=4, max_lines=10,
+            value="\n".join(r.texto for r in alert_engine.regras),
+            hint_text="battery < 20\nram > 90 for 30s\ntemp > 45",
+        )
+        webhook_field = ft.TextField(label="Webhook (opcional)", value=alert_engine.webhook_url or "", hint_text="https://...")
+
+        def salvar(e_inner):
+            try:
+                alert_engine.configurar([l for l in regras_field.value.splitlines() if l.strip()], webhook_field.value.strip())
+            except ValueError as err:
+                regras_field.error_text = str(err)
+                page.update()
+                return
+            alert_engine.salvar_config()
+            page.dialog.open = False
+            page.snack_bar = ft.SnackBar(content=ft.Text(f"{len(alert_engine.regras)} regras de alerta ativas"), bgcolor=theme_colors["success"])
+            page.snack_bar.open = True
+            page.update()
+
+        page.dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Alertas do Monitor"),
+            content=ft.Column([
+                regras_field,
+                webhook_field,
+                ft.Text("Métricas: " + ", ".join(colunas_gravacao()[1:]), size=11, color=theme_colors["subtext"]),
+            ], tight=True, width=480),
+            actions=[
+                ft.TextButton("Cancelar", on_click=lambda e_inner: setattr(page.dialog, 'open', False) or page.update()),
+                ft.FilledButton("Salvar", on_click=salvar),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END,
+            shape=ft.RoundedRectangleBorder(radius=10),
+            bgcolor=theme_colors["surface"]
+        )
+        page.dialog.open = True
+        page.update()
+
+    def alterar_intervalo_monitor(e):
+        # Reinicia o laço no dispositivo com o novo intervalo
+        if monitor_running and device_monitor:
+            device_monitor.stop_stream()
+
+    # --- Frota: vários dispositivos em um único agendador ---
+    def criar_card_frota(serial):
+        series = {
+            metrica: ft.LineChartData(data_points=[], stroke_width=1.5, color=cor, curved=False)
+            for metrica, cor in (("cpu", theme_colors["primary"]), ("ram", theme_colors["success"]))
+        }
+        sparkline = ft.LineChart(
+            data_series=list(series.values()),
+            left_axis=ft.ChartAxis(labels_size=0),
+            bottom_axis=ft.ChartAxis(labels_size=0),
+            min_y=0,
+            max_y=100,
+            height=60,
+            expand=True,
+        )
+        textos = {metrica: ft.Text("-", size=12, color=cor) for metrica, cor in (
+            ("cpu", theme_colors["primary"]), ("ram", theme_colors["success"]), ("battery", theme_colors["error"]))}
+        status = ft.Container(width=8, height=8, bgcolor=theme_colors["success"], border_radius=4)
+        card = ft.Container(
+            content=ft.Column([
+                ft.Row([status, ft.Text(serial, size=13, weight=ft.FontWeight.BOLD, expand=True, no_wrap=True)]),
+                ft.Row([textos["cpu"], textos["ram"], textos["battery"]], spacing=12),
+                sparkline,
+            ], spacing=4),
+            padding=10,
+            border_radius=8,
+            bgcolor=theme_colors["surface"],
+        )
+        card.data = {"series": series, "textos": textos, "status": status, "chart": sparkline}
+        return card
+
+    def atualizar_frota(frota, ultimas):
+        # Um tick atrasado de uma execução já parada não redesenha a frota nova
+        if frota is not fleet_monitor or tabs.selected_index != ABA_FROTA:
+            return
+        agora = time.time()
+        for serial, historico in list(frota.historicos.items()):
+            if serial not in fleet_cards:
+                fleet_cards[serial] = criar_card_frota(serial)
+                fleet_grid.controls.append(fleet_cards[serial])
+            estado = fleet_cards[serial].data
+            amostra = ultimas.get(serial)
+            if amostra:
+                estado["textos"]["cpu"].value = f"CPU {amostra.cpu:.0f}%"
+                estado["textos"]["ram"].value = f"RAM {amostra.ram:.0f}%"
+                estado["textos"]["battery"].value = f"Bat {amostra.battery}%"
+            conectado = serial in frota.monitores and frota.falhas.get(serial, 0) == 0
+            estado["status"].bgcolor = theme_colors["success"] if conectado else theme_colors["error"]
+            for metrica, serie in estado["series"].items():
+                serie.data_points = [ft.LineChartDataPoint(t - agora, v) for t, v in historico[metrica].downsample(FROTA_SPARKLINE_PONTOS, seconds=FROTA_SPARKLINE_JANELA)]
+            estado["chart"].min_x, estado["chart"].max_x = -FROTA_SPARKLINE_JANELA, 0
+        fleet_status_text.value = f"{len(frota.monitores)} dispositivos • {frota.pulos} amostras puladas (dispositivo lento)"
+        page.update(fleet_grid, fleet_status_text)
+
+    def start_stop_frota(e):
+        nonlocal fleet_monitor, fleet_stop_event
+        if fleet_stop_event and not fleet_stop_event.is_set():
+            fleet_stop_event.set()
+            fleet_toggle_button.icon, fleet_toggle_button.text = ft.Icons.PLAY_ARROW, "Iniciar Frota"
+        else:
+            # Cada execução tem o próprio Event: limpar um Event compartilhado reativaria o laço anterior, que ainda pode estar no fim de um tick
+            fleet_stop_event = threading.Event()
+            fleet_monitor = FleetMonitor(ADB, max_workers=int(fleet_workers_dropdown.value), interval=FROTA_INTERVALO, alertas=alert_engine)
+            fleet_cards.clear()
+            fleet_grid.controls.clear()
+            threading.Thread(target=fleet_monitor.run, args=(fleet_stop_event, lambda ultimas, frota=fleet_monitor: atualizar_frota(frota, ultimas)), daemon=True).start()
+            fleet_toggle_button.icon, fleet_toggle_button.text = ft.Icons.STOP, "Parar Frota"
+        page.update()
+
     def termux_ssh_setup(e):
         def fechar_dialog():
             dialog.open = False
@@ -1290,19 +1883,29 @@ def main(page: ft.Page):
         dialog.open = True
         page.update()
     
-    def Exec_script(e):
+    def Exec_script(e, dry_run=False):
         def on_file_picked(ev: ft.FilePickerResultEvent):
             if not ev.files:
                 return
                 
             file = ev.files[0]
+            progresso_texto = ft.Text("Executando script...")
+            page.snack_bar = ft.SnackBar(content=progresso_texto, bgcolor=theme_colors["primary"], duration=600000)
+            page.snack_bar.open = True
+            page.update()
+
+            def atualizar_progresso(arquivo, dados):
+                progresso_texto.value = f"{os.path.basename(arquivo)}: {formatar_progresso(dados)}"
+                page.update()
+
             try:
-                success, resultados = processar_script_json(file.path, ADB)
+                success, resultados = processar_script_json(file.path, ADB, app_manager, progresso=atualizar_progresso, dry_run=dry_run or None)
+                page.snack_bar.open = False
                 
                 if success:
                     mostrar_dialogo_resultado(
                         page, 
-                        "Resultado da Execução do Script", 
+                        "Simulação do Script (dry-run)" if dry_run else "Resultado da Execução do Script", 
                         resultados, 
                         theme_colors
                     )
@@ -1336,16 +1939,24 @@ def main(page: ft.Page):
 
     def mostrar_dialogo_resultado(page, titulo, resultados, theme_colors):
         conteudo = ft.Column(scroll=ft.ScrollMode.ADAPTIVE, expand=True)
+
+        relatorio = gerar_relatorio_execucao(resultados)
+        conteudo.controls.append(ft.Text(
+            f"{relatorio['sucessos']}/{relatorio['passos']} passos OK • {relatorio['falhas']} falhas • {relatorio['bloqueados']} bloqueados • {relatorio['pulados']} pulados ({relatorio['retomados']} retomados)\n"
+            f"Tempo total {relatorio['duracao_total']:.1f}s (soma dos passos {relatorio['soma_passos']:.1f}s, {relatorio['ganho_paralelismo']:.1f}x em paralelo)",
+            size=12, color=theme_colors["subtext"]
+        ))
         
         for resultado in resultados:
-            cor = theme_colors["success"] if resultado["sucesso"] else theme_colors["error"]
-            icone = ft.Icons.CHECK_CIRCLE if resultado["sucesso"] else ft.Icons.ERROR
+            cor = theme_colors["success"] if resultado["sucesso"] else theme_colors["warning"] if resultado.get("bloqueado") else theme_colors["error"]
+            icone = ft.Icons.CHECK_CIRCLE if resultado["sucesso"] else ft.Icons.BLOCK if resultado.get("bloqueado") else ft.Icons.ERROR
+            dispositivo = f" [{resultado['dispositivo']}]" if resultado.get("dispositivo") else ""
             
             conteudo.controls.append(
                 ft.ListTile(
                     leading=ft.Icon(icone, color=cor),
-                    title=ft.Text(f"{resultado['tipo'].title()}: {resultado.get('pacote', resultado.get('arquivo', 'N/A'))}"),
-                    subtitle=ft.Text("Sucesso" if resultado["sucesso"] else "Falha"),
+                    title=ft.Text(f"{resultado['tipo'].title()}: {resultado.get('pacote', resultado.get('arquivo', resultado.get('descricao', 'N/A')))}{dispositivo}"),
+                    subtitle=ft.Text(("Já instalado (ignorado)" if resultado.get("pulado") else "Sucesso" if resultado["sucesso"] else "Bloqueado" if resultado.get("bloqueado") else "Falha") + (f" — {resultado['estatisticas']['mb_s']:.1f} MB/s em {resultado['estatisticas']['duracao']:.1f}s" if resultado.get("estatisticas") else f" — {resultado['duracao']:.1f}s" if "duracao" in resultado else "") + (f" ({resultado['tentativas']} tentativas)" if resultado.get("tentativas", 1) > 1 else "")),
                     trailing=ft.IconButton(
                         icon=ft.Icons.INFO,
                         on_click=lambda e, r=resultado: mostrar_detalhes_comando(page, r, theme_colors)
@@ -1606,6 +2217,8 @@ def main(page: ft.Page):
     installer_progress_ring = ft.ProgressRing(visible=False, width=32, height=32)
     installer_icon = ft.Icon(ft.Icons.UPLOAD_FILE_ROUNDED, size=48, color=theme_colors["subtext"])
     installer_text = ft.Text("Arraste e solte o APK aqui ou clique para selecionar", color=theme_colors["subtext"], text_align=ft.TextAlign.CENTER)
+    installer_progress_bar = ft.ProgressBar(visible=False, width=400, color=theme_colors["primary"])
+    installer_info = ft.Column(visible=False, spacing=2, horizontal_alignment=ft.CrossAxisAlignment.CENTER)
     
     apk_installer_view = ft.Container(
         content=ft.Column([
@@ -1624,6 +2237,8 @@ def main(page: ft.Page):
                     on_click=lambda _: file_picker.pick_files(allow_multiple=False, allowed_extensions=["apk"])
                 )
             ), 
+            installer_info,
+            installer_progress_bar,
             installer_text, 
             ft.FilledButton("Voltar para a lista", icon=ft.Icons.ARROW_BACK, on_click=hide_apk_installer_view, style=ft.ButtonStyle(bgcolor=theme_colors["surface"],color=theme_colors["text"]))
         ], expand=True, horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=10), 
@@ -1649,7 +2264,8 @@ def main(page: ft.Page):
         ft.PopupMenuItem(text="Instalação de APK", icon=ft.Icons.INSTALL_MOBILE, on_click=show_apk_installer_view),
         ft.PopupMenuItem(text="Ativar Shinzuku", icon=ft.Icons.ANDROID, on_click=shizuku_active),
         ft.PopupMenuItem(text="Instalar o Termux", on_click=termux_ssh_setup,icon=ft.Icons.TERMINAL),
-        ft.PopupMenuItem(text="Execultar Script", on_click=Exec_script,icon=ft.Icons.AUTO_AWESOME)
+        ft.PopupMenuItem(text="Execultar Script", on_click=Exec_script,icon=ft.Icons.AUTO_AWESOME),
+        ft.PopupMenuItem(text="Simular Script (dry-run)", on_click=lambda e: Exec_script(e, dry_run=True),icon=ft.Icons.PLAYLIST_PLAY)
     ], icon=ft.Icons.MORE_VERT)
     
     apps_content = ft.Column(controls=[
@@ -1664,9 +2280,42 @@ def main(page: ft.Page):
 
     logcat_list = ft.ListView(expand=True, spacing=2, auto_scroll=True)
     logcat_toggle_button = ft.FilledButton("Iniciar", icon=ft.Icons.PLAY_ARROW, on_click=start_stop_logcat)
+    logcat_stats_text = ft.Text("", size=12, color=theme_colors["subtext"])
+    logcat_buffers_field = ft.TextField(label="Buffers", hint_text="main,crash", width=140, dense=True, on_submit=aplicar_filtros_logcat)
+    logcat_specs_field = ft.TextField(label="Filtros TAG:PRIORIDADE", hint_text="ActivityManager:I *:S", expand=True, dense=True, on_submit=aplicar_filtros_logcat)
+    logcat_process_field = ft.TextField(label="Pacote ou PID", width=200, dense=True, on_submit=aplicar_filtros_logcat)
+    logcat_regex_field = ft.TextField(label="Regex (-e)", width=180, dense=True, on_submit=aplicar_filtros_logcat)
+    logcat_devices_row = ft.Row(spacing=5, wrap=True)
+    logcat_search_field = ft.TextField(
+        label="Buscar", hint_text='tag:ActivityManager level>=W "ANR" -gc', prefix_icon=ft.Icons.SEARCH,
+        dense=True, expand=True, on_submit=buscar_logcat,
+    )
+    logcat_capture_button = ft.IconButton(icon=ft.Icons.FIBER_MANUAL_RECORD, icon_color=theme_colors["subtext"], tooltip="Capturar em disco", on_click=alternar_captura_logcat)
+    capture_picker = ft.FilePicker(on_result=on_capture_picked)
+    page.overlay.append(capture_picker)
+    logcat_open_capture_button = ft.IconButton(icon=ft.Icons.FOLDER_OPEN, tooltip="Abrir captura", on_click=lambda _: capture_picker.get_directory_path(dialog_title="Pasta da captura"))
+    logcat_capture_slider = ft.Slider(visible=False, on_change_end=lambda e: ir_para_instante_captura(e.control.value))
+    volume_picker = ft.FilePicker(on_result=on_volume_export)
+    page.overlay.append(volume_picker)
+    logcat_volume_list = ft.Column(spacing=2, scroll=ft.ScrollMode.ADAPTIVE, expand=True)
+    logcat_volume_panel = ft.Container(
+        width=340, padding=10, border_radius=8, bgcolor=theme_colors["surface"], visible=False,
+        content=ft.Column([
+            ft.Row([
+                ft.Text("Quem mais escreve no log", size=14, weight=ft.FontWeight.BOLD, expand=True),
+                ft.IconButton(icon=ft.Icons.DOWNLOAD, tooltip="Exportar (.csv ou .json)", on_click=lambda _: volume_picker.save_file(file_name="logcat-volume.csv", allowed_extensions=["csv", "json"])),
+            ]),
+            logcat_volume_list,
+        ], expand=True),
+    )
+    logcat_volume_button = ft.IconButton(icon=ft.Icons.BAR_CHART, tooltip="Volume por tag e processo", on_click=alternar_painel_volume)
     logcat_content = ft.Column(controls=[
-        ft.Row([logcat_toggle_button, ft.FilledButton("Limpar", icon=ft.Icons.CLEAR_ALL, on_click=clear_logcat)], spacing=10), 
-        logcat_list
+        ft.Row([logcat_toggle_button, ft.FilledButton("Limpar", icon=ft.Icons.CLEAR_ALL, on_click=clear_logcat), logcat_capture_button, logcat_open_capture_button, logcat_volume_button, logcat_stats_text], spacing=10), 
+        logcat_search_field,
+        logcat_capture_slider,
+        ft.Row([logcat_buffers_field, logcat_specs_field, logcat_process_field, logcat_regex_field], spacing=10),
+        logcat_devices_row,
+        ft.Row([logcat_list, logcat_volume_panel], expand=True, vertical_alignment=ft.CrossAxisAlignment.STRETCH),
     ], expand=True)
     
     def create_setting_control(label, min_val, max_val, initial_val, divisions):
@@ -1761,25 +2410,101 @@ def main(page: ft.Page):
     ram_value_text = ft.Text("0%", size=16, weight=ft.FontWeight.BOLD, color=theme_colors["success"])
     storage_value_text = ft.Text("0%", size=16, weight=ft.FontWeight.BOLD, color=theme_colors["warning"])
     battery_value_text = ft.Text("0%", size=16, weight=ft.FontWeight.BOLD, color=theme_colors["error"])
+    cpu_cores_text = ft.Text("", size=11, color=theme_colors["subtext"])
+    net_value_text = ft.Text("-", size=16, weight=ft.FontWeight.BOLD, color=theme_colors["primary"])
+    disk_value_text = ft.Text("-", size=16, weight=ft.FontWeight.BOLD, color=theme_colors["success"])
+    thermal_text = ft.Text("", size=12, color=theme_colors["subtext"], expand=True)
+    throttling_badge = ft.Container(
+        content=ft.Text("THROTTLING", size=11, weight=ft.FontWeight.BOLD, color=theme_colors["on_primary"]),
+        bgcolor=theme_colors["error"],
+        padding=ft.padding.symmetric(horizontal=8, vertical=2),
+        border_radius=10,
+        visible=False,
+    )
+    throttling_count_text = ft.Text("", size=12, color=theme_colors["error"])
     
     monitor_toggle_button = ft.FilledButton("Iniciar Monitoramento", icon=ft.Icons.PLAY_ARROW, on_click=start_stop_monitor)
+    monitor_interval_dropdown = ft.Dropdown(
+        label="Intervalo",
+        width=130,
+        value="auto",
+        options=[ft.dropdown.Option(key=v, text=t) for v, t in (("auto", "Automático"), ("0.25", "250 ms"), ("0.5", "500 ms"), ("1", "1 s"), ("2", "2 s"))],
+        on_change=alterar_intervalo_monitor,
+    )
+    monitor_window_dropdown = ft.Dropdown(
+        label="Janela",
+        width=120,
+        value="120",
+        options=[ft.dropdown.Option(key=v, text=t) for v, t in (("60", "1 min"), ("120", "2 min"), ("600", "10 min"), ("3600", "1 h"), ("14400", "4 h"), ("0", "Tudo"))],
+        on_change=atualizar_graficos,
+    )
+    monitor_record_button = ft.IconButton(icon=ft.Icons.FIBER_MANUAL_RECORD, icon_color=theme_colors["subtext"], tooltip="Gravar sessão", on_click=alternar_gravacao)
+    recording_picker = ft.FilePicker(on_result=on_recording_picked)
+    page.overlay.append(recording_picker)
+    monitor_replay_button = ft.IconButton(
+        icon=ft.Icons.FOLDER_OPEN, tooltip="Abrir gravação",
+        on_click=lambda _: recording_picker.pick_files(allow_multiple=False, allowed_extensions=["admon"]),
+    )
+    monitor_replay_text = ft.Text("", size=12, color=theme_colors["subtext"])
+    monitor_alerts_button = ft.IconButton(icon=ft.Icons.NOTIFICATIONS_ACTIVE, tooltip="Alertas", on_click=editar_alertas)
     
-    cpu_chart_ref = create_chart(cpu_data, theme_colors["primary"], "CPU")
-    ram_chart_ref = create_chart(ram_data, theme_colors["success"], "RAM")
-    storage_chart_ref = create_chart(storage_data, theme_colors["warning"], "Armazenamento")
-    battery_chart_ref = create_chart(battery_data, theme_colors["error"], "Bateria", 100)
+    process_sort_dropdown = ft.Dropdown(
+        label="Ordenar por",
+        width=150,
+        value="cpu",
+        options=[ft.dropdown.Option(key="cpu", text="CPU"), ft.dropdown.Option(key="mem", text="Memória")],
+        on_change=lambda e: renderizar_processos(),
+    )
+    process_list = ft.Column(spacing=2)
     
+    cpu_chart_ref = create_live_chart("CPU", [("cpu", theme_colors["primary"])])
+    ram_chart_ref = create_live_chart("RAM", [("ram", theme_colors["success"])])
+    storage_chart_ref = create_live_chart("Armazenamento", [("storage", theme_colors["warning"])])
+    battery_chart_ref = create_live_chart("Bateria", [("battery", theme_colors["error"])])
+    net_chart_ref = create_live_chart("Rede (KB/s)", [("net_rx_kbs", theme_colors["primary"]), ("net_tx_kbs", theme_colors["warning"])], escala=None)
+    disk_chart_ref = create_live_chart("Disco (KB/s)", [("disk_read_kbs", theme_colors["success"]), ("disk_write_kbs", theme_colors["error"])], escala=None)
+    
+    FROTA_SPARKLINE_PONTOS, FROTA_SPARKLINE_JANELA = 40, 300
+    fleet_toggle_button = ft.FilledButton("Iniciar Frota", icon=ft.Icons.PLAY_ARROW, on_click=start_stop_frota)
+    fleet_workers_dropdown = ft.Dropdown(
+        label="Paralelo",
+        width=110,
+        value=str(FROTA_MAX_PARALELO),
+        options=[ft.dropdown.Option(str(n)) for n in (2, 4, 8, 16)],
+    )
+    fleet_status_text = ft.Text("", size=12, color=theme_colors["subtext"])
+    fleet_grid = ft.GridView(expand=True, max_extent=320, child_aspect_ratio=1.8, spacing=10, run_spacing=10)
+    fleet_content = ft.Column([
+        ft.Row([
+            ft.Text("Frota de Dispositivos", size=18, weight=ft.FontWeight.BOLD, expand=True),
+            fleet_workers_dropdown,
+            fleet_toggle_button,
+        ]),
+        fleet_status_text,
+        ft.Divider(height=10),
+        fleet_grid,
+        ft.Text(f"Cada cartão mostra CPU e RAM dos últimos {FROTA_SPARKLINE_JANELA // 60} minutos; todos os dispositivos conectados são amostrados a cada {FROTA_INTERVALO:g} s", size=12, color=theme_colors["subtext"], text_align=ft.TextAlign.CENTER),
+    ], expand=True)
+
     monitor_content = ft.Column(
         controls=[
             ft.Row([
                 ft.Text("Monitoramento em Tempo Real", size=18, weight=ft.FontWeight.BOLD, expand=True),
+                monitor_interval_dropdown,
+                monitor_window_dropdown,
+                monitor_record_button,
+                monitor_replay_button,
+                monitor_alerts_button,
                 monitor_toggle_button
             ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+            monitor_replay_text,
+            ft.Row([ft.Icon(ft.Icons.THERMOSTAT, color=theme_colors["warning"]), thermal_text, throttling_badge, throttling_count_text]),
             ft.Divider(height=20),
             ft.Row([
                 ft.Container(
                     content=ft.Column([
                         ft.Row([ft.Icon(ft.Icons.MEMORY, color=theme_colors["primary"]), ft.Text("CPU", size=16), cpu_value_text]),
+                        cpu_cores_text,
                         cpu_chart_ref
                     ], spacing=10),
                     expand=True
@@ -1809,8 +2534,45 @@ def main(page: ft.Page):
                     expand=True
                 )
             ], spacing=15),
+            ft.Divider(height=15),
+            ft.Row([
+                ft.Container(
+                    content=ft.Column([
+                        ft.Row([ft.Icon(ft.Icons.NETWORK_CHECK, color=theme_colors["primary"]), ft.Text("Rede", size=16), net_value_text]),
+                        net_chart_ref
+                    ], spacing=10),
+                    expand=True
+                ),
+                ft.Container(
+                    content=ft.Column([
+                        ft.Row([ft.Icon(ft.Icons.SAVE_AS, color=theme_colors["success"]), ft.Text("Disco", size=16), disk_value_text]),
+                        disk_chart_ref
+                    ], spacing=10),
+                    expand=True
+                )
+            ], spacing=15),
+            ft.Divider(height=15),
+            ft.Container(
+                content=ft.Column([
+                    ft.Row([
+                        ft.Icon(ft.Icons.LIST_ALT, color=theme_colors["primary"]),
+                        ft.Text(f"Processos (top {PROCESSOS_TOP_N})", size=16, expand=True),
+                        process_sort_dropdown,
+                    ]),
+                    ft.Row([
+                        ft.Text("Processo", size=11, color=theme_colors["subtext"], expand=True),
+                        ft.Text("CPU", size=11, color=theme_colors["subtext"], width=60, text_align=ft.TextAlign.RIGHT),
+                        ft.Text("Memória", size=11, color=theme_colors["subtext"], width=70, text_align=ft.TextAlign.RIGHT),
+                        ft.Container(width=48),
+                    ]),
+                    process_list,
+                ], spacing=8),
+                padding=10,
+                border_radius=8,
+                bgcolor=theme_colors["surface"],
+            ),
             ft.Divider(height=10),
-            ft.Text("Os gráficos mostram a utilização dos recursos nos últimos 2 minutos", size=12, color=theme_colors["subtext"], text_align=ft.TextAlign.CENTER)
+            ft.Text("Os gráficos mostram a utilização dos recursos na janela selecionada (até 4 horas de histórico)", size=12, color=theme_colors["subtext"], text_align=ft.TextAlign.CENTER)
         ],
         expand=True,
         scroll=ft.ScrollMode.ADAPTIVE
@@ -1830,12 +2592,14 @@ def main(page: ft.Page):
             ft.Tab(text=" Tela", icon=ft.Icons.TUNE, content=ft.Container(config_content, padding=20, expand=True)),
             ft.Tab(text=" Info", icon=ft.Icons.INFO_OUTLINE, content=ft.Container(info_page_content, padding=20, expand=True)),
             ft.Tab(text=" Monitor", icon=ft.Icons.MONITOR_HEART, content=ft.Container(monitor_content, padding=20, expand=True)),
+            ft.Tab(text=" Frota", icon=ft.Icons.DEVICES, content=ft.Container(fleet_content, padding=20, expand=True)),
             ft.Tab(text=" Logcat", icon=ft.Icons.DESCRIPTION, content=ft.Container(logcat_content, padding=20, expand=True)),
             ft.Tab(text=" Config", icon=ft.Icons.SETTINGS, content=criar_aba_configuracoes()),
         ], 
         expand=True, 
         indicator_color=theme_colors["primary"], 
-        label_color=theme_colors["primary"]
+        label_color=theme_colors["primary"],
+        on_change=on_tab_change,
     )
     
     page.add(loading_container)
@@ -1845,6 +2609,7 @@ def main(page: ft.Page):
         atualizar_info()
         carregar_configuracoes_atuais()
         load_device_info()
+        atualizar_dispositivos_logcat(True)
 
 if __name__ == "__main__":
     ft.app(target=main, upload_dir="uploads")
\ No newline at end of file
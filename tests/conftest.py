@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# O app roda a partir de src/ ('from back.back import *'); os testes importam do mesmo jeito
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
@@ -0,0 +1,83 @@
+import struct
+import zipfile
+
+import pytest
+
+pytest.importorskip("back.back")
+from back.back import (
+    AXML_START_ELEMENT, AXML_STRING_POOL, AXML_TYPE_INT_BOOLEAN, AXML_TYPE_INT_DEC, AXML_TYPE_STRING,
+    ler_info_apk, verificar_compatibilidade_apk,
+)
+
+ID_VERSION_CODE = 0x0101021b
+ID_MIN_SDK = 0x0101020c
+
+
+def chunk(tipo, cabecalho, corpo, tamanho_cabecalho):
+    return struct.pack("<HHI", tipo, tamanho_cabecalho, tamanho_cabecalho + len(corpo)) + cabecalho + corpo
+
+
+def montar_axml(strings, resource_ids, elementos):
+    """AndroidManifest.xml binário mínimo: string pool UTF-16, mapa de IDs e um START_ELEMENT por elemento"""
+    dados, offsets = b"", []
+    for s in strings:
+        offsets.append(len(dados))
+        dados += struct.pack("<H", len(s)) + s.encode("utf-16-le") + b"\0\0"
+    dados += b"\0" * (-len(dados) % 4)
+    inicio = 28 + 4 * len(strings)
+    pool = chunk(AXML_STRING_POOL, struct.pack("<IIIII", len(strings), 0, 0, inicio, 0),
+                 b"".join(struct.pack("<I", o) for o in offsets) + dados, 28)
+    mapa = chunk(0x0180, b"", b"".join(struct.pack("<I", i) for i in resource_ids), 8)
+    corpo = b""
+    for nome, atributos in elementos:
+        attrs = b"".join(
+            struct.pack("<IIIHBBI", 0xFFFFFFFF, nome_attr, valor if tipo == AXML_TYPE_STRING else 0xFFFFFFFF, 8, 0, tipo, valor)
+            for nome_attr, tipo, valor in atributos
+        )
+        ext = struct.pack("<IIHHHHHH", 0xFFFFFFFF, strings.index(nome), 20, 20, len(atributos), 0, 0, 0)
+        corpo += chunk(AXML_START_ELEMENT, struct.pack("<II", 1, 0xFFFFFFFF), ext + attrs, 16)
+    return chunk(0x0003, b"", pool + mapa + corpo, 8)
+
+
+@pytest.fixture
+def apk(tmp_path):
+    # Índices 0 e 1 estão no mapa de IDs; o 0 vem com o nome apagado, como em APKs ofuscados
+    strings = ["", "minSdkVersion", "manifest", "package", "com.exemplo.app", "versionName", "1.2.3",
+               "uses-sdk", "application", "debuggable"]
+    manifesto = montar_axml(strings, [ID_VERSION_CODE, ID_MIN_SDK], [
+        ("manifest", [(0, AXML_TYPE_INT_DEC, 42), (3, AXML_TYPE_STRING, 4), (5, AXML_TYPE_STRING, 6)]),
+        ("uses-sdk", [(1, AXML_TYPE_INT_DEC, 26)]),
+        ("application", [(9, AXML_TYPE_INT_BOOLEAN, 0xFFFFFFFF)]),
+    ])
+    caminho = tmp_path / "app.apk"
+    with zipfile.ZipFile(caminho, "w") as z:
+        z.writestr("AndroidManifest.xml", manifesto)
+        z.writestr("lib/arm64-v8a/libnativo.so", b"")
+        z.writestr("lib/x86_64/libnativo.so", b"")
+    return caminho
+
+
+def test_ler_info_apk(apk):
+    info = ler_info_apk(apk)
+    assert info["package"] == "com.exemplo.app"
+    assert info["version_code"] == 42
+    assert info["version_name"] == "1.2.3"
+    assert info["min_sdk"] == 26
+    assert info["target_sdk"] is None
+    assert info["abis"] == ["arm64-v8a", "x86_64"]
+    assert info["debuggable"] is True
+    assert info["signature_hash"] is None
+    assert info["size"] == apk.stat().st_size
+
+
+def test_ler_info_apk_manifesto_invalido(tmp_path):
+    caminho = tmp_path / "ruim.apk"
+    with zipfile.ZipFile(caminho, "w") as z:
+        z.writestr("AndroidManifest.xml", b"<manifest/>")
+    with pytest.raises(ValueError):
+        ler_info_apk(caminho)
+
+
+def test_compatibilidade_sdk_e_abi(apk):
+    problemas = verificar_compatibilidade_apk(ler_info_apk(apk), device_sdk=24, device_abis=["armeabi-v7a"])
+    assert len(problemas) == 2
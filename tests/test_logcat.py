@@ -0,0 +1,160 @@
+import io
+import struct
+import time
+
+import pytest
+
+pytest.importorskip("back.back")
+from back.back import (
+    LogcatFiltro, LogEntry, LogIndex, LogQuery, LogVolumeStats, MultiLogcatSession, ler_entradas_binarias,
+)
+
+
+def registro(prioridade, tag, mensagem, sec=1700000000, nsec=0, pid=100, tid=200, uid=None):
+    """Um logger_entry como o 'logcat -B' envia: v1 (20 bytes) ou, com uid, v4 (28 bytes)"""
+    payload = bytes([" VDIWEFS".index(prioridade) + 1]) + tag.encode() + b"\0" + mensagem.encode() + b"\0"
+    if uid is None:
+        return struct.pack("<HHiIII", len(payload), 0, pid, tid, sec, nsec) + payload
+    return struct.pack("<HHiIIIII", len(payload), 28, pid, tid, sec, nsec, 0, uid) + payload
+
+
+def entrada(t, tag="Tag", mensagem="", prioridade="I", pid=1):
+    return LogEntry(t, pid, pid, prioridade, tag, mensagem)
+
+
+class TestLeituraBinaria:
+    def test_formatos_v1_e_v4(self):
+        dados = registro("I", "ActivityManager", "Start proc çã", nsec=500_000_000) + registro("E", "App", "falhou", uid=10050)
+        entradas = list(ler_entradas_binarias(io.BytesIO(dados)))
+        assert [(e.prioridade, e.tag, e.mensagem, e.uid) for e in entradas] == [
+            ("I", "ActivityManager", "Start proc çã", -1),
+            ("E", "App", "falhou", 10050),
+        ]
+        assert entradas[0].timestamp == pytest.approx(1700000000.5)
+        assert entradas[0].pid == 100
+
+    def test_registro_truncado_encerra_sem_erro(self):
+        dados = registro("W", "A", "inteiro") + registro("W", "B", "cortado")[:-3]
+        assert [e.tag for e in ler_entradas_binarias(io.BytesIO(dados))] == ["A"]
+
+
+class TestFiltroNoHost:
+    def test_tag_prioridade(self):
+        filtro = LogcatFiltro.from_texto(specs="ActivityManager:I App:V *:E")
+        assert filtro.no_host
+        assert filtro.aceita(entrada(0, "ActivityManager", prioridade="I"))
+        assert not filtro.aceita(entrada(0, "ActivityManager", prioridade="D"))
+        assert filtro.aceita(entrada(0, "App", prioridade="V"))
+        assert not filtro.aceita(entrada(0, "Outra", prioridade="W"))
+        assert filtro.aceita(entrada(0, "Outra", prioridade="F"))
+
+    def test_silencioso_e_regex(self):
+        filtro = LogcatFiltro.from_texto(specs="*:S Rede:D", regex=r"timeout \d+")
+        assert filtro.aceita(entrada(0, "Rede", "timeout 30", "D"))
+        assert not filtro.aceita(entrada(0, "Rede", "ok", "D"))
+        assert not filtro.aceita(entrada(0, "Outra", "timeout 30", "F"))
+        assert not LogcatFiltro.from_texto(buffers="main").no_host
+
+
+class TestLogIndex:
+    @pytest.fixture
+    def indice(self):
+        indice = LogIndex()
+        for i, (tag, mensagem, prioridade) in enumerate([
+            ("Rede", "Conexão estabelecida com servidor", "I"),
+            ("Rede", "Timeout ao conectar com servidor", "E"),
+            ("UI", "Tela desenhada em 16 ms", "D"),
+            ("UI", "Timeout de input", "W"),
+        ]):
+            indice.append(entrada(float(i), tag, mensagem, prioridade, pid=10 + i % 2))
+        return indice
+
+    def mensagens(self, indice, consulta, **kwargs):
+        return [e.mensagem for e in indice.buscar(consulta, **kwargs)]
+
+    def test_palavras_tag_e_pid(self, indice):
+        assert self.mensagens(indice, "timeout") == ["Timeout ao conectar com servidor", "Timeout de input"]
+        assert self.mensagens(indice, "timeout tag:UI") == ["Timeout de input"]
+        assert self.mensagens(indice, "servidor pid:10") == ["Conexão estabelecida com servidor"]
+
+    def test_niveis_frases_e_exclusoes(self, indice):
+        assert self.mensagens(indice, "level>=W") == ["Timeout ao conectar com servidor", "Timeout de input"]
+        assert self.mensagens(indice, '"ao conectar"') == ["Timeout ao conectar com servidor"]
+        assert self.mensagens(indice, "-timeout") == ["Conexão estabelecida com servidor", "Tela desenhada em 16 ms"]
+        assert self.mensagens(indice, "-rede") == ["Tela desenhada em 16 ms", "Timeout de input"]
+
+    def test_limite_traz_as_mais_recentes(self, indice):
+        assert [e.timestamp for e in indice.buscar("", limite=2)] == [2.0, 3.0]
+
+    def test_capacidade_descarta_as_antigas(self):
+        indice = LogIndex(capacidade=8)
+        for i in range(20):
+            indice.append(entrada(float(i), mensagem=f"evento n{i}"))
+        assert len(indice) <= 8
+        assert indice.buscar("n0") == []
+        assert [e.timestamp for e in indice.buscar("evento")][-1] == 19.0
+
+    def test_mesmo_criterio_sem_indice(self, indice):
+        consulta = LogQuery.parse('timeout -input level>=E')
+        avulsas = [e for e in indice.buscar("") if consulta.aceita(e)]
+        assert avulsas == indice.buscar(consulta)
+
+
+class TestMesclaMultiDispositivo:
+    def test_ordem_global_com_offsets(self):
+        indice, volume = LogIndex(), LogVolumeStats()
+        volume.limpar(ao_vivo=False)
+        multi = MultiLogcatSession("adb", ["a", "b"], indice=indice, volume=volume)
+        # 'a' está 10 s adiantado; 'b' tem offset desconhecido (sem correção)
+        multi.offsets = {"a": 10.0, "b": None}
+        for t in (110.0, 112.0, 114.0):
+            multi.sessoes["a"].buffer.append(entrada(t, "A"))
+        for t in (101.0, 103.0, 105.0):
+            multi.sessoes["b"].buffer.append(entrada(t, "B"))
+        multi.mesclar(final=True)
+        mescladas = [e for e, _ in multi.buffer.drenar()]
+        assert [(e.serial, e.timestamp) for e in mescladas] == [
+            ("a", 100.0), ("b", 101.0), ("a", 102.0), ("b", 103.0), ("a", 104.0), ("b", 105.0),
+        ]
+        assert len(indice) == 6
+        assert volume.resumo()["linhas"] == 6
+
+    def test_corte_segura_entradas_recentes(self):
+        multi = MultiLogcatSession("adb", ["a"], atraso=5.0)
+        agora = time.time()
+        multi.sessoes["a"].buffer.append(entrada(agora - 60, mensagem="antiga"))
+        multi.sessoes["a"].buffer.append(entrada(agora, mensagem="recente"))
+        multi.mesclar()
+        assert [e.mensagem for e, _ in multi.buffer.drenar()] == ["antiga"]
+        multi.mesclar(final=True)
+        assert [e.mensagem for e, _ in multi.buffer.drenar()] == ["recente"]
+
+
+class TestLogVolumeStats:
+    def test_contagem_por_tag_e_prioridade(self):
+        volume = LogVolumeStats()
+        volume.limpar(ao_vivo=False)
+        for i in range(30):
+            volume.append(entrada(100.0 + i / 10, "Ruidosa" if i % 3 else "Rara", "x" * 10, "E" if i % 5 == 0 else "I"))
+        resumo = volume.resumo()
+        assert resumo["linhas"] == 30
+        assert resumo["tags"][0]["chave"] == "Ruidosa" and resumo["tags"][0]["linhas"] == 20
+        assert {p["chave"]: p["linhas"] for p in resumo["prioridades"]} == {"I": 24, "E": 6}
+        # Captura: média pelo período gravado (2,9 s)
+        assert resumo["linhas_s"] == pytest.approx(30 / 2.9)
+
+    def test_taxa_ao_vivo_no_inicio_usa_o_tempo_observado(self):
+        volume = LogVolumeStats(janela=10.0)
+        inicio = time.time()
+        for _ in range(20):
+            volume.append(entrada(0.0))
+        assert volume.resumo(agora=inicio + 2)["linhas_s"] == pytest.approx(10.0, rel=0.01)
+        # Depois de um silêncio maior que a janela, não sobra nada
+        assert volume.resumo(agora=inicio + 30)["linhas_s"] == 0.0
+
+    def test_top_k_limitado(self):
+        volume = LogVolumeStats(k=5)
+        volume.limpar(ao_vivo=False)
+        for i in range(100):
+            volume.append(entrada(float(i), f"tag{i % 50}"))
+        assert len(volume.resumo(n=50)["tags"]) <= 5
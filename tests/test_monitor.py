@@ -0,0 +1,189 @@
+import pytest
+
+pytest.importorskip("back.back")
+from back.back import (
+    CORRENTE_AMOSTRAS_MA, THROTTLE_CPU_LIMITADA, THROTTLE_CPU_TETO, THROTTLE_TEMPERATURA,
+    AdaptiveSampler, AlertEngine, AlertRule, DeviceMonitor, MonitorRecorder, MonitorSample, TimeSeriesBuffer,
+    carregar_gravacao, formatar_intervalo_gravacao, reduzir_lttb,
+)
+
+
+def amostra(t, **valores):
+    return MonitorSample(timestamp=t, **valores)
+
+
+class TestParseSample:
+    def test_secoes_basicas(self):
+        monitor = DeviceMonitor("adb")
+        lidas = set()
+        monitor._parse_sample("S cpu 100 0 100 800 0 0 0 0", 1.0, lidas)
+        assert "cpu" not in lidas  # sem leitura anterior não há delta
+        saida = "\n".join([
+            "U 1234.5 99.0",
+            "S cpu 150 0 150 900 0 0 0 0",
+            "M MemTotal: 4000000 kB MemAvailable: 1000000 kB",
+            "D /data 1000 600 400 60% /data",
+            "B level: 77",
+            "Z cpu-0 45000",
+            "Z bateria 38",
+        ])
+        lidas = set()
+        sample = monitor._parse_sample(saida, 2.0, lidas)
+        assert sample.cpu == pytest.approx(50.0)
+        assert sample.ram == pytest.approx(75.0)
+        assert sample.storage == pytest.approx(60.0)
+        assert sample.battery == 77
+        assert sample.temp_max == 45.0
+        assert {"cpu", "ram", "storage", "battery", "temp_max"} <= lidas
+
+    def test_secao_invalida_nao_interrompe(self):
+        sample = DeviceMonitor("adb")._parse_sample("M lixo\nB level: 50", 1.0)
+        assert sample.battery == 50
+
+    def test_corrente_em_ua_decidida_pela_potencia(self):
+        monitor = DeviceMonitor("adb")
+        lidas = set()
+        # -5000 pode ser µA ou mA: não é reportado
+        monitor._parse_sample("V -5000 4000000 300", 1.0, lidas)
+        assert "battery_current_ma" not in lidas
+        # 350 A a 4 V seria impossível em mA: a unidade é µA
+        assert monitor._parse_sample("V -350000 4000000 300", 2.0).battery_current_ma == -350.0
+        assert monitor._parse_sample("V -5000 4000000 300", 3.0).battery_current_ma == -5.0
+
+    def test_corrente_em_ma_so_depois_de_varias_leituras(self):
+        monitor = DeviceMonitor("adb")
+        for i in range(CORRENTE_AMOSTRAS_MA - 1):
+            lidas = set()
+            monitor._parse_sample("V -350 4000 300", float(i), lidas)
+            assert "battery_current_ma" not in lidas
+        sample = monitor._parse_sample("V -350 4000 300", 99.0)
+        assert sample.battery_current_ma == -350.0
+        assert sample.battery_voltage_mv == 4000.0
+        assert sample.battery_temp == 30.0
+
+    def test_throttling(self):
+        monitor = DeviceMonitor("adb")
+        # Teto abaixo do hardware já na primeira leitura
+        assert monitor._parse_sample("C policy0 1000 1800 2400", 1.0).throttling == THROTTLE_CPU_TETO
+        assert monitor._parse_sample("C policy0 1000 2400 2400", 2.0).throttling == 0
+        assert monitor._parse_sample("C policy0 1000 2300 2400", 3.0).throttling == THROTTLE_CPU_LIMITADA
+        assert monitor._parse_sample("Z cpu 95000", 4.0).throttling & THROTTLE_TEMPERATURA
+
+
+class TestTimeSeriesBuffer:
+    def test_circular(self):
+        buffer = TimeSeriesBuffer(capacity=4)
+        for i in range(6):
+            buffer.append(float(i), i * 10.0)
+        assert len(buffer) == 4
+        ts, vs = buffer.window()
+        assert list(ts) == [2.0, 3.0, 4.0, 5.0]
+        assert list(vs) == [20.0, 30.0, 40.0, 50.0]
+        assert buffer.first() == (2.0, 20.0)
+        assert buffer.last() == (5.0, 50.0)
+
+    def test_janela_e_estatisticas(self):
+        buffer = TimeSeriesBuffer(capacity=10)
+        for i in range(10):
+            buffer.append(float(i), float(i))
+        ts, _ = buffer.window(seconds=3)
+        assert list(ts) == [6.0, 7.0, 8.0, 9.0]
+        assert buffer.stats(seconds=3) == {"min": 6.0, "max": 9.0, "media": 7.5, "amostras": 4}
+        assert TimeSeriesBuffer(capacity=2).stats() is None
+
+    def test_lttb_preserva_extremos_e_pico(self):
+        ts = [float(i) for i in range(1000)]
+        vs = [0.0] * 1000
+        vs[500] = 100.0
+        pontos = reduzir_lttb(ts, vs, 50)
+        assert len(pontos) == 50
+        assert pontos[0] == (0.0, 0.0) and pontos[-1] == (999.0, 0.0)
+        assert (500.0, 100.0) in pontos
+        assert [t for t, _ in pontos] == sorted(t for t, _ in pontos)
+        assert reduzir_lttb(ts[:10], vs[:10], 50) == list(zip(ts[:10], vs[:10]))
+
+
+class TestGravacao:
+    @pytest.mark.parametrize("comprimir", [True, False])
+    def test_ida_e_volta(self, tmp_path, comprimir):
+        caminho = tmp_path / "sessao.admon"
+        gravador = MonitorRecorder(caminho, comprimir=comprimir, metadados={"serial": "abc", "intervalo": "auto"})
+        for i in range(300):
+            gravador.append(amostra(1000.0 + i, cpu=i % 100, battery=i % 7))
+        gravador.close()
+        metadados, colunas = carregar_gravacao(caminho)
+        assert metadados["amostras"] == 300
+        assert metadados["serial"] == "abc"
+        assert formatar_intervalo_gravacao(metadados) == "automático"
+        assert list(colunas["timestamp"][:3]) == [1000.0, 1001.0, 1002.0]
+        assert colunas["cpu"][299] == 299 % 100
+        assert colunas["battery"][13] == 13 % 7
+
+    def test_bloco_truncado_e_ignorado(self, tmp_path):
+        caminho = tmp_path / "sessao.admon"
+        gravador = MonitorRecorder(caminho, metadados={"intervalo": 0.5})
+        for i in range(300):
+            gravador.append(amostra(float(i)))
+        gravador.close()
+        caminho.write_bytes(caminho.read_bytes()[:-10])
+        metadados, colunas = carregar_gravacao(caminho)
+        # Só o primeiro bloco (240 amostras) está inteiro
+        assert metadados["amostras"] == len(colunas["cpu"]) == 240
+        assert formatar_intervalo_gravacao(metadados) == "0.5 s"
+
+    def test_arquivo_que_nao_e_gravacao(self, tmp_path):
+        caminho = tmp_path / "outro.admon"
+        caminho.write_bytes(b"nada a ver")
+        with pytest.raises(ValueError):
+            carregar_gravacao(caminho)
+
+
+class TestAdaptiveSampler:
+    def test_acelera_no_pico_e_desacelera_estavel(self):
+        agendador = AdaptiveSampler(amostras_estaveis=3)
+        assert agendador.proximo_intervalo(amostra(0, cpu=10)) == 1.0
+        assert agendador.proximo_intervalo(amostra(1, cpu=50)) == AdaptiveSampler.NIVEIS[0]
+        for i in range(3):
+            intervalo = agendador.proximo_intervalo(amostra(2 + i, cpu=50))
+        assert intervalo == AdaptiveSampler.NIVEIS[1]
+
+    def test_oculto_e_pausado(self):
+        agendador = AdaptiveSampler()
+        assert agendador.proximo_intervalo(amostra(0), visivel=False) == AdaptiveSampler.INTERVALO_OCULTO
+        assert agendador.proximo_intervalo(amostra(1), pausado=True) is None
+
+
+class TestAlertEngine:
+    def motor(self, regras):
+        disparos = []
+        return AlertEngine(regras, callback=disparos.append, log_path=None), disparos
+
+    def test_duracao_e_rearme(self):
+        motor, disparos = self.motor(["ram > 90 for 10s"])
+        motor.avaliar(amostra(0, ram=95))
+        assert not motor.avaliar(amostra(5, ram=95))
+        assert motor.avaliar(amostra(10, ram=95))
+        assert not motor.avaliar(amostra(20, ram=95))  # dispara uma vez por episódio
+        motor.avaliar(amostra(21, ram=50))
+        motor.avaliar(amostra(22, ram=95))
+        assert motor.avaliar(amostra(32, ram=95))
+        assert len(disparos) == motor.disparados == 2
+
+    def test_estado_por_dispositivo(self):
+        motor, _ = self.motor(["bateria < 20"])
+        assert motor.avaliar(amostra(0, battery=10), serial="a")
+        assert motor.avaliar(amostra(0, battery=10), serial="b")
+        assert not motor.avaliar(amostra(1, battery=10), serial="a")
+
+    def test_metrica_nao_lida_nao_e_comparada(self):
+        motor, _ = self.motor(["battery < 20"])
+        # battery=0 é o padrão de uma amostra sem a seção B, não uma leitura
+        assert not motor.avaliar(amostra(0), lidas={"cpu"})
+        assert motor.avaliar(amostra(1, battery=5), lidas={"battery"})
+
+    def test_regras_invalidas(self):
+        with pytest.raises(ValueError):
+            AlertRule.parse("ram maior que 90")
+        with pytest.raises(ValueError):
+            AlertRule.parse("inexistente > 1")
+        assert AlertRule.parse("temp >= 70 por 30s").metrica == "temp_max"